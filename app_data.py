@@ -0,0 +1,388 @@
+"""Capa de datos cacheada de la app (main.py) y su calentamiento.
+
+Vive fuera de main.py para que serve.py pueda importar las mismas funciones
+cacheadas (mismas claves de caché) y rellenarlas antes de que el servidor
+acepte sesiones. Las métricas en sí están en olist_analytics, sin dependencia
+de Streamlit; aquí solo se cachean por versión de las tablas y por filtros.
+"""
+from pathlib import Path
+
+import streamlit as st
+import pandas as pd
+
+from olist_analytics import (
+    cube, customers, delivery, diagnosis, encoding, facts, filters, geo, products, profiling, reviews, sellers, shared,
+    sketches, sql, storage, warmup,
+)
+from olist_analytics.time_index import time_slice
+
+# Las tablas en caché son compartidas por todas las sesiones y están congeladas
+# (olist_analytics.shared). Con copy-on-write, los cortes por sesión no copian
+# datos hasta que se escriben, y escribirlos nunca toca la tabla compartida.
+# Se activa aquí para que valga también para el calentamiento de serve.py.
+pd.set_option("mode.copy_on_write", True)
+
+DATA_DIR = Path(__file__).resolve().parent / "Olist_Data"
+ORDERS_CSV = 'olist_orders_dataset.csv'
+CUSTOMERS_CSV = 'olist_customers_dataset.csv'
+REVIEWS_CSV = 'olist_order_reviews_dataset.csv'
+ITEMS_CSV = 'olist_order_items_dataset.csv'
+SELLERS_CSV = 'olist_sellers_dataset.csv'
+PRODUCTS_CSV = 'olist_products_dataset.csv'
+TRANSLATION_CSV = 'product_category_name_translation.csv'
+PAYMENTS_CSV = 'olist_order_payments_dataset.csv'
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _tables_cached(table_keys):
+    # La clave incluye mtime y tamaño de cada tabla: si un CSV cambia en disco
+    # se vuelven a leer todas, porque comparten los diccionarios de IDs y
+    # dimensiones (ver olist_analytics.encoding).
+    # cache_resource comparte los DataFrames entre todas las sesiones; se
+    # congelan para que no se puedan modificar in-place.
+    # Cada tabla se lee desde el snapshot Arrow, que se regenera si el CSV ha cambiado.
+    tables = {}
+    for path, mtime_ns, size in table_keys:
+        with profiling.block(f"carga {Path(path).name}") as record:
+            tables[Path(path).name] = storage.load_table(path)
+            record.rows_out = len(tables[Path(path).name])
+    with profiling.block("codificación de IDs y dimensiones"):
+        return shared.freeze(encoding.encode_tables(tables))
+
+
+def _tabla(table_keys, filename):
+    return _tables_cached(table_keys)[filename]
+
+
+def table_key(filename):
+    path = DATA_DIR / filename
+    stat = path.stat()
+    return str(path), stat.st_mtime_ns, stat.st_size
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def order_facts_cached(table_keys):
+    orders, customers_ = _tabla(table_keys, ORDERS_CSV), _tabla(table_keys, CUSTOMERS_CSV)
+    with profiling.block("merge pedidos ⋈ clientes", rows_in=len(orders)) as record:
+        order_facts = facts.build_order_facts(orders, customers_)
+        record.rows_out = len(order_facts)
+    return shared.freeze(order_facts)
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _states_geojson_cached(path, mtime_ns):
+    return geo.load_states_geojson(path)
+
+
+def load_states_geojson():
+    # Si el fichero aparece o cambia en disco, la clave cambia y se vuelve a leer
+    path = DATA_DIR / geo.GEOJSON_FILENAME
+    mtime_ns = path.stat().st_mtime_ns if path.exists() else None
+    return _states_geojson_cached(str(path), mtime_ns)
+
+
+@st.cache_resource(show_spinner=False)
+def _sql_engine(data_dir):
+    return sql.DuckDBEngine(data_dir)
+
+
+# Con OLIST_ENGINE=duckdb, clientes por estado, resumen por ciudad, retrasos
+# (4.3 salvo causas e hipótesis), reseñas por estado y la sección 4.5 se
+# consultan en DuckDB sobre los ficheros (ver olist_analytics.sql); el resto
+# sigue en pandas.
+sql_engine = _sql_engine(str(DATA_DIR)) if sql.is_enabled() else None
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _order_cube_cached(table_keys):
+    order_facts = order_facts_cached(table_keys)
+    with profiling.block("cubo estado × ciudad × día", rows_in=len(order_facts)) as record:
+        order_cube = cube.build_order_cube(order_facts)
+        record.rows_out = len(order_cube)
+    return shared.freeze(order_cube)
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def new_customers_cached(table_keys):
+    first_purchases, first_purchases_by_state = customers.build_first_purchases(order_facts_cached(table_keys))
+    return shared.freeze((first_purchases, customers.build_daily_new_customers(first_purchases_by_state)))
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _customer_sketches_cached(table_keys, error):
+    order_facts = order_facts_cached(table_keys)
+    with profiling.block(f"sketches HLL (±{error:.0%})", rows_in=len(order_facts)) as record:
+        customer_sketches = sketches.build_customer_sketches(order_facts, error)
+        record.rows_out = len(customer_sketches['cells'])
+    return shared.freeze(customer_sketches)
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _review_index_cached(table_keys):
+    return shared.freeze(reviews.build_review_index(_tabla(table_keys, REVIEWS_CSV), order_facts_cached(table_keys)))
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _item_facts_cached(table_keys):
+    tables = [
+        _tabla(table_keys, filename)
+        for filename in (REVIEWS_CSV, ITEMS_CSV, SELLERS_CSV, PRODUCTS_CSV, TRANSLATION_CSV)
+    ]
+    with profiling.block("hechos de ítems y mapa pedido → reseñas", rows_in=len(tables[1])) as record:
+        item_facts = facts.build_item_facts(*tables)
+        record.rows_out = len(item_facts['items'])
+    return shared.freeze(item_facts)
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _review_items_cached(table_keys):
+    item_facts = _item_facts_cached(table_keys)
+    with profiling.block("reseñas × ítems desde los hechos de ítems", rows_in=len(item_facts['reviews'])) as record:
+        review_items = facts.expand_review_items(item_facts)
+        record.rows_out = len(review_items)
+    return shared.freeze(review_items)
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _order_drivers_cached(table_keys):
+    order_facts = order_facts_cached(table_keys)
+    with profiling.block("atributos de diagnóstico por pedido", rows_in=len(order_facts)) as record:
+        drivers = diagnosis.build_order_drivers(order_facts, _item_facts_cached(table_keys), _tabla(table_keys, PAYMENTS_CSV))
+        record.rows_out = len(drivers)
+    return shared.freeze(drivers)
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _seller_summary_cached(table_keys):
+    # Resumen por vendedor de df_5 compartido por el proceso: cada combinación
+    # de filtros solo recalcula los vendedores con filas que entran o salen
+    df = _review_items_cached(table_keys)
+    return sellers.SellerSummary(df, sellers.late_flags(df, order_facts_cached(table_keys)))
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _review_item_filters_cached(table_keys):
+    df = _review_items_cached(table_keys)
+    index = filters.build_filter_index(df)
+    return shared.freeze(index), filters.column_stats(df, index)
+
+
+# Versión de cada tabla (ruta, mtime, tamaño). Todas se cargan y codifican
+# juntas con diccionarios compartidos (ver _tables_cached), así que cualquier
+# resultado depende de todas: la tupla completa se pasa explícitamente a cada
+# constructor cacheado y forma parte de su clave.
+def current_table_keys():
+    return tuple(table_key(filename) for filename in (
+        ORDERS_CSV, CUSTOMERS_CSV, REVIEWS_CSV, ITEMS_CSV, SELLERS_CSV, PRODUCTS_CSV, TRANSLATION_CSV, PAYMENTS_CSV,
+    ))
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def rango_y_filtros(table_keys):
+    # Fechas de compra y límites de los filtros de productos y vendedores
+    # (sección 4.5). Con DuckDB salen de SQL y el arranque no carga las tablas
+    # en pandas; solo lo hacen las secciones que se calculan en pandas.
+    if sql_engine is not None:
+        first, last = sql_engine.purchase_range()
+        return pd.Timestamp(first), pd.Timestamp(last), sql_engine.filter_stats()
+    # Tabla de hechos de pedidos: pedidos ⋈ clientes con year, is_late,
+    # late_days, dispatch_time y delivery_days. Se construye una vez por
+    # proceso y todas las secciones parten de ella.
+    purchases = order_facts_cached(table_keys)['order_purchase_timestamp']
+    _, stats = _review_item_filters_cached(table_keys)
+    return purchases.min(), purchases.max(), stats
+
+
+# Predicados de la sección 4.5, la única que usa los filtros de la barra lateral
+def filtros_seleccionados(estados, score, price, freight, orders):
+    return (
+        filters.IsIn('seller_state', tuple(estados)),
+        filters.Between('review_score', *score),
+        filters.Between('Total prize', *price),
+        filters.Between('freight_value', *freight),
+        filters.SellerOrdersBetween(*orders),
+    )
+
+
+# ==== CONSULTAS POR SECCIÓN ====
+# Se memorizan por versión de las tablas y por los filtros que usa cada
+# sección, así que un cambio en la barra lateral solo recalcula las secciones
+# que lo usan. Sus resultados se decodifican (encoding.decode) antes de guardarse en caché,
+# para no arrastrar los diccionarios de IDs y dimensiones.
+def _pedidos_en_rango(table_keys, start, end):
+    # order_facts está ordenado por fecha de compra, así que el rango es un
+    # corte por posición (búsqueda binaria, sin copiar)
+    order_facts = order_facts_cached(table_keys)
+    with profiling.block("filtro fechas", rows_in=len(order_facts)) as record:
+        window = time_slice(order_facts, 'order_purchase_timestamp', start, end)
+        record.rows_out = len(window)
+    return window
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def clientes_por_estado(table_keys, start, end, error):
+    if sql_engine is not None:
+        return sql_engine.customers_by_state(start, end)
+    order_facts = order_facts_cached(table_keys)
+    if error is not None and sketches.worthwhile(order_facts, start, end):
+        # Estimación HyperLogLog: combina los sketches de los meses completos y
+        # solo lee los pedidos de los días sueltos de los extremos
+        return encoding.decode(sketches.distinct_customers(
+            _customer_sketches_cached(table_keys, error), order_facts, start, end
+        ))
+    return encoding.decode(customers.customers_by_state(_pedidos_en_rango(table_keys, start, end)))
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def clientes_por_ciudad(table_keys, start, end, state):
+    return encoding.decode(customers.customers_by_city(_pedidos_en_rango(table_keys, start, end), state))
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def resumen_ciudades(table_keys, start, end):
+    # Pedidos y tiempos de entrega salen del cubo estado × ciudad × día;
+    # solo los clientes distintos requieren los pedidos
+    if sql_engine is not None:
+        return sql_engine.city_summary(start, end)
+    cube_summary = cube.summarize_cube(_order_cube_cached(table_keys), start, end)
+    return encoding.decode(customers.city_summary(_pedidos_en_rango(table_keys, start, end), cube_summary))
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def retrasos_en_rango(table_keys, start, end):
+    # Retrasos dentro del rango de fechas (ver olist_analytics.delivery)
+    if sql_engine is not None:
+        return {
+            'late_orders': sql_engine.late_orders_by_city(start, end),
+            'late_over_time': sql_engine.late_orders_by_month(start, end),
+            'late_by_state': sql_engine.late_share_by_state(start, end),
+            'dispatch_means': sql_engine.dispatch_time_by_lateness(start, end),
+        }
+    filtered_df = _pedidos_en_rango(table_keys, start, end)
+    return {
+        'late_orders': encoding.decode(delivery.late_orders_by(filtered_df, "customer_city")),
+        'late_over_time': delivery.late_orders_by_month(filtered_df),
+        'late_by_state': encoding.decode(delivery.late_share_by_state(filtered_df)),
+        'dispatch_means': delivery.dispatch_time_by_lateness(filtered_df),
+    }
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def retrasos_por_vendedor(table_keys, start, end):
+    # Ítems de los pedidos del rango: solo los necesita la hipótesis de vendedores
+    order_items = facts.order_items(_item_facts_cached(table_keys), _pedidos_en_rango(table_keys, start, end))
+    return encoding.decode(delivery.late_orders_by_seller(order_items))
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def diagnostico_en_rango(table_keys, start, end):
+    # Causas de los retrasos del rango (ver olist_analytics.diagnosis): los
+    # atributos por pedido se calculan una vez; por rango, un corte y una
+    # agrupación por ciudad
+    drivers = time_slice(
+        _order_drivers_cached(table_keys), 'order_purchase_timestamp', start, end
+    )
+    return {name: encoding.decode(result) for name, result in diagnosis.diagnose(drivers).items()}
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def reviews_por_estado(table_keys, start, end):
+    # Sin pedidos con retraso, por día de la reseña: dos búsquedas y una resta
+    # por estado sobre el índice de sumas acumuladas
+    if sql_engine is not None:
+        return sql_engine.reviews_by_state(start, end)
+    return reviews.reviews_in_window(_review_index_cached(table_keys), start, end)
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def productos_vendedores(table_keys, predicates):
+    if sql_engine is not None:
+        # Todo en SQL sobre review_items filtrada: sin cargar las tablas en pandas
+        top_sellers_5 = sql_engine.top_sellers_by_score(predicates)
+        top_categories_5 = sql_engine.top_categories(predicates)
+        return {
+            'best_seller': top_sellers_5.head(1),
+            'top_category': top_categories_5,
+            'top_sellers': top_sellers_5,
+            'review_counts': sql_engine.review_score_distribution(predicates),
+            'top_categories': top_categories_5,
+            'seller_revenue': sql_engine.seller_revenue(predicates),
+            'shipping_cost': sql_engine.shipping_cost_by_category(predicates),
+        }
+
+    df_5 = _review_items_cached(table_keys)
+    filter_index, _ = _review_item_filters_cached(table_keys)
+    mask = filters.combined_mask(df_5, filter_index, predicates)
+    df_5 = df_5[mask]
+    with profiling.block("resumen por vendedor", rows_in=len(df_5)) as record:
+        seller_summary = _seller_summary_cached(table_keys).update(mask)
+        record.rows_out = len(seller_summary)
+    top_sellers_5 = sellers.top_k(seller_summary['review_score'], 10)
+    top_categories_5 = products.top_categories(df_5)
+    resumen = {
+        'best_seller': top_sellers_5.head(1),
+        'top_category': top_categories_5,
+        'top_sellers': top_sellers_5,
+        'review_counts': products.review_score_distribution(df_5),
+        'top_categories': top_categories_5,
+        'seller_revenue': sellers.top_k(seller_summary['Total prize'], 10),
+        'shipping_cost': products.shipping_cost_by_category(df_5),
+    }
+    return {name: encoding.decode(result) for name, result in resumen.items()}
+
+
+# ==== CALENTAMIENTO ====
+# Una vez por proceso (y por versión de los datos) se rellenan en segundo plano
+# las cachés de la vista por defecto y de los presets de OLIST_WARMUP (ver
+# olist_analytics.warmup). serve.py lo llama antes de arrancar el servidor:
+# rango_y_filtros (la carga en frío) se calcula en esa llamada y el resto de
+# pasos en un hilo. La vista por defecto va primero; si una sesión pide la
+# misma clave mientras se calcula, espera al resultado en lugar de repetirlo.
+@st.cache_resource(show_spinner=False, max_entries=1)
+def iniciar_calentamiento(table_keys, presets):
+    if not presets:
+        return warmup.Warmup([]).run()
+    first, last, stats = rango_y_filtros(table_keys)
+    windows = warmup.date_windows(first, last, presets)
+
+    def detalle_estados(start, end):
+        for state in clientes_por_estado(table_keys, start, end, None).index[:5]:
+            clientes_por_ciudad(table_keys, start, end, state)
+
+    def productos_por_defecto():
+        productos_vendedores(table_keys, filtros_seleccionados(
+            stats['seller_states'], stats['review_score'], stats['Total prize'],
+            stats['freight_value'], stats['seller_orders'],
+        ))
+
+    if sql_engine is not None:
+        # Solo las consultas que resuelve DuckDB: el resto cargaría las tablas en pandas
+        steps = []
+        for label, start, end in windows:
+            steps += [
+                (f"4.1 {label}", lambda s=start, e=end: clientes_por_estado(table_keys, s, e, None)),
+                (f"4.2 {label}", lambda s=start, e=end: resumen_ciudades(table_keys, s, e)),
+                (f"4.3 {label}", lambda s=start, e=end: retrasos_en_rango(table_keys, s, e)),
+                (f"4.4 {label}", lambda s=start, e=end: reviews_por_estado(table_keys, s, e)),
+            ]
+            if label == "completo":
+                steps.append(("4.5 filtros por defecto", productos_por_defecto))
+        return warmup.Warmup(steps).start()
+
+    steps = [
+        ("cubo", lambda: _order_cube_cached(table_keys)),
+        ("clientes nuevos", lambda: new_customers_cached(table_keys)),
+    ]
+    for label, start, end in windows:
+        steps += [
+            (f"4.1 {label}", lambda s=start, e=end: clientes_por_estado(table_keys, s, e, None)),
+            (f"4.2 {label}", lambda s=start, e=end: resumen_ciudades(table_keys, s, e)),
+            (f"4.3 {label}", lambda s=start, e=end: retrasos_en_rango(table_keys, s, e)),
+            (f"4.3 causas {label}", lambda s=start, e=end: diagnostico_en_rango(table_keys, s, e)),
+            (f"4.4 {label}", lambda s=start, e=end: reviews_por_estado(table_keys, s, e)),
+        ]
+        if label == "completo":
+            steps.append(("4.5 filtros por defecto", productos_por_defecto))
+            if "states" in presets:
+                steps.append(("4.1 top 5 estados", lambda s=start, e=end: detalle_estados(s, e)))
+    return warmup.Warmup(steps).start()
@@ -0,0 +1 @@
+"""Benchmarks del informe sobre datos sintéticos de Olist (ver ``benchmarks.run``)."""
@@ -0,0 +1,319 @@
+"""Mide cada etapa del informe sobre datos sintéticos a varias escalas.
+
+Para cada escala (por defecto 1x, 10x y 100x el tamaño real) genera los CSV
+con ``benchmarks.synthetic`` si no existen y ejecuta las mismas etapas que la
+app: carga, tablas de hechos, filtros de la barra lateral y los cálculos de
+cada sección. Informa del tiempo (mínimo de ``--repeat`` ejecuciones) y del
+pico de memoria de cada etapa, y lo compara con una línea base guardada::
+
+    python -m benchmarks.run                     # 1x, 10x y 100x
+    python -m benchmarks.run --scales 1 10       # solo algunas escalas
+    python -m benchmarks.run --save-baseline     # guarda la línea base
+
+El pico de memoria se mide con ``tracemalloc`` en una pasada aparte (cubre
+NumPy y pandas, no el pool de memoria de Arrow). Sale con código 1 si alguna
+etapa empeora más de ``--tolerance`` respecto a la línea base.
+"""
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks import synthetic
+from olist_analytics import (
+    cube, customers, delivery, diagnosis, facts, filters, products, report, reviews, sellers, sketches, storage, warmup,
+)
+from olist_analytics.time_index import time_slice
+
+BENCH_DIR = Path(__file__).resolve().parent
+DATA_DIR = BENCH_DIR / "data"
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+DEFAULT_SCALES = (1, 10, 100)
+DEFAULT_TOLERANCE = 0.25
+# Diferencias por debajo de esto se consideran ruido
+MIN_SECONDS_DELTA = 0.05
+MIN_MB_DELTA = 5.0
+
+
+def dataset_dir(scale):
+    path = DATA_DIR / f"x{scale:g}"
+    if not all((path / filename).exists() for filename in report.TABLE_FILES.values()):
+        print(f"generando datos sintéticos x{scale:g} en {path} ...", flush=True)
+        synthetic.generate(path, scale)
+    return path
+
+
+# ---- Etapas ----
+# Cada etapa recibe el contexto con los resultados de las anteriores y
+# devuelve un diccionario con los suyos. Deben poder repetirse.
+
+def stage_load_csv(ctx):
+    # Carga en frío: CSV -> snapshot Arrow
+    for filename in report.TABLE_FILES.values():
+        storage.snapshot_path(ctx['data_dir'] / filename).unlink(missing_ok=True)
+    return {'tables': report.load_tables(ctx['data_dir'])}
+
+
+def stage_load_snapshot(ctx):
+    return {'tables': report.load_tables(ctx['data_dir'])}
+
+
+def stage_order_facts(ctx):
+    tables = ctx['tables']
+    return {'order_facts': facts.build_order_facts(tables['orders'], tables['customers'])}
+
+
+def stage_order_cube(ctx):
+    return {'order_cube': cube.build_order_cube(ctx['order_facts'])}
+
+
+def stage_first_purchases(ctx):
+    first_purchases, by_state = customers.build_first_purchases(ctx['order_facts'])
+    return {
+        'first_purchases': first_purchases,
+        'daily_new_customers': customers.build_daily_new_customers(by_state),
+    }
+
+
+def stage_item_facts(ctx):
+    tables = ctx['tables']
+    return {'item_facts': facts.build_item_facts(
+        tables['reviews'], tables['items'], tables['sellers'], tables['products'],
+        tables['category_translation'],
+    )}
+
+
+def stage_order_drivers(ctx):
+    return {'order_drivers': diagnosis.build_order_drivers(
+        ctx['order_facts'], ctx['item_facts'], ctx['tables']['payments'],
+    )}
+
+
+def stage_review_items(ctx):
+    return {'review_items': facts.expand_review_items(ctx['item_facts'])}
+
+
+def stage_filter_index(ctx):
+    index = filters.build_filter_index(ctx['review_items'])
+    return {'filter_index': index, 'filter_stats': filters.column_stats(ctx['review_items'], index)}
+
+
+def stage_date_window(ctx):
+    order_facts = ctx['order_facts']
+    purchases = order_facts['order_purchase_timestamp']
+    # Días completos, como la barra lateral: el cubo y el índice de reseñas van por días
+    start, end = warmup.day_window(purchases.min(), purchases.max())
+    return {
+        'start': start,
+        'end': end,
+        'orders': time_slice(order_facts, 'order_purchase_timestamp', start, end),
+    }
+
+
+def stage_sidebar_filters(ctx):
+    # Filtros activos en todas las columnas, con rangos que sí recortan filas
+    stats = ctx['filter_stats']
+    low_price, high_price = stats['Total prize']
+    low_orders, high_orders = stats['seller_orders']
+    predicates = [
+        filters.IsIn('seller_state', tuple(stats['seller_states'][:10])),
+        filters.Between('review_score', 2, stats['review_score'][1]),
+        filters.Between('Total prize', low_price, low_price + (high_price - low_price) / 2),
+        filters.Between('freight_value', *stats['freight_value']),
+        filters.SellerOrdersBetween(low_orders + 1, high_orders),
+    ]
+    mask = filters.combined_mask(ctx['review_items'], ctx['filter_index'], predicates)
+    return {'filter_mask': mask, 'filtered_items': ctx['review_items'][mask]}
+
+
+def stage_section_4_1(ctx):
+    orders = ctx['orders']
+    by_state = customers.customers_by_state(orders)
+    state = by_state.index[0]
+    return {'section_4_1': (
+        by_state,
+        customers.count_new_customers(ctx['first_purchases'], ctx['start'], ctx['end']),
+        customers.customers_by_city(orders, state),
+        customers.new_customers_per_month(ctx['daily_new_customers'], state, ctx['start'], ctx['end']),
+    )}
+
+
+def stage_customer_sketches(ctx):
+    return {'customer_sketches': sketches.build_customer_sketches(ctx['order_facts'])}
+
+
+def stage_section_4_1_sketches(ctx):
+    # Clientes distintos aproximados por estado (comparar con el primer paso de section_4_1)
+    return {'section_4_1_sketches': sketches.distinct_customers(
+        ctx['customer_sketches'], ctx['order_facts'], ctx['start'], ctx['end']
+    )}
+
+
+def stage_section_4_2(ctx):
+    cube_summary = cube.summarize_cube(ctx['order_cube'], ctx['start'], ctx['end'])
+    return {'section_4_2': customers.city_summary(ctx['orders'], cube_summary)}
+
+
+def stage_section_4_3(ctx):
+    orders = ctx['orders']
+    return {'section_4_3': (
+        delivery.late_orders_by(orders, 'customer_city'),
+        delivery.late_orders_by_month(orders),
+        delivery.late_share_by_state(orders),
+        delivery.dispatch_time_by_lateness(orders),
+    )}
+
+
+def stage_section_4_3_products(ctx):
+    order_items = facts.order_items(ctx['item_facts'], ctx['orders'])
+    return {'section_4_3_products': (
+        delivery.late_percentage_by_category(order_items),
+        delivery.late_orders_by_seller(order_items),
+    )}
+
+
+def stage_section_4_3_causes(ctx):
+    drivers = time_slice(ctx['order_drivers'], 'order_purchase_timestamp', ctx['start'], ctx['end'])
+    return {'section_4_3_causes': diagnosis.diagnose(drivers)}
+
+
+def stage_review_index(ctx):
+    return {'review_index': reviews.build_review_index(ctx['tables']['reviews'], ctx['order_facts'])}
+
+
+def stage_section_4_4(ctx):
+    return {'section_4_4': reviews.reviews_in_window(ctx['review_index'], ctx['start'], ctx['end'])}
+
+
+def stage_section_4_5(ctx):
+    items = ctx['filtered_items']
+    summary = sellers.seller_summary(items)
+    return {'section_4_5': (
+        sellers.top_k(summary['review_score'], 10),
+        products.review_score_distribution(items),
+        products.top_categories(items),
+        sellers.top_k(summary['Total prize'], 10),
+        products.shipping_cost_by_category(items),
+    )}
+
+
+def stage_seller_summary_update(ctx):
+    # Resumen con todas las filas y después con los filtros de la barra
+    # lateral: la segunda llamada solo recalcula los vendedores que cambian
+    review_items = ctx['review_items']
+    summary = sellers.SellerSummary(review_items, sellers.late_flags(review_items, ctx['order_facts']))
+    summary.update(np.ones(len(review_items), dtype=bool))
+    return {'seller_summary_update': summary.update(ctx['filter_mask'])}
+
+
+STAGES = [
+    ('load_csv', stage_load_csv),
+    ('load_snapshot', stage_load_snapshot),
+    ('order_facts', stage_order_facts),
+    ('order_cube', stage_order_cube),
+    ('first_purchases', stage_first_purchases),
+    ('review_index', stage_review_index),
+    ('item_facts', stage_item_facts),
+    ('order_drivers', stage_order_drivers),
+    ('review_items', stage_review_items),
+    ('filter_index', stage_filter_index),
+    ('date_window', stage_date_window),
+    ('sidebar_filters', stage_sidebar_filters),
+    ('section_4_1', stage_section_4_1),
+    ('section_4_2', stage_section_4_2),
+    ('customer_sketches', stage_customer_sketches),
+    ('section_4_1_sketches', stage_section_4_1_sketches),
+    ('section_4_3', stage_section_4_3),
+    ('section_4_3_products', stage_section_4_3_products),
+    ('section_4_3_causes', stage_section_4_3_causes),
+    ('section_4_4', stage_section_4_4),
+    ('section_4_5', stage_section_4_5),
+    ('seller_summary_update', stage_seller_summary_update),
+]
+
+
+def measure(stage, ctx, repeat=1):
+    """``(resultado, segundos, pico_mb)`` de una etapa."""
+    seconds = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        result = stage(ctx)
+        seconds = min(seconds, time.perf_counter() - t0)
+        del result
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = stage(ctx)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak / 2**20
+
+
+def run_scale(scale, repeat=1):
+    ctx = {'data_dir': dataset_dir(scale)}
+    results = {}
+    for name, stage in STAGES:
+        output, seconds, peak_mb = measure(stage, ctx, repeat)
+        ctx.update(output)
+        results[name] = {'seconds': round(seconds, 4), 'peak_mb': round(peak_mb, 1)}
+        print(f"  {name:<22} {seconds:9.3f} s {peak_mb:10.1f} MB", flush=True)
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Lista de ``(escala, etapa, métrica, antes, ahora)`` que empeoran."""
+    regressions = []
+    for scale, stages in results.items():
+        for name, current in stages.items():
+            previous = baseline.get(scale, {}).get(name)
+            if previous is None:
+                continue
+            for metric, noise in (('seconds', MIN_SECONDS_DELTA), ('peak_mb', MIN_MB_DELTA)):
+                before, now = previous[metric], current[metric]
+                if now > before * (1 + tolerance) and now - before > noise:
+                    regressions.append((scale, name, metric, before, now))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=float, nargs='+', default=list(DEFAULT_SCALES))
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    results = {}
+    for scale in args.scales:
+        print(f"escala x{scale:g}", flush=True)
+        results[f"x{scale:g}"] = run_scale(scale, args.repeat)
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    if args.save_baseline:
+        baseline.update(results)
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"línea base guardada en {args.baseline}")
+        return 0
+
+    if not baseline:
+        print(f"sin línea base ({args.baseline}); usa --save-baseline para crearla")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for scale, name, metric, before, now in regressions:
+        print(f"REGRESIÓN {scale} {name} {metric}: {before} -> {now}")
+    if not regressions:
+        print("sin regresiones respecto a la línea base")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
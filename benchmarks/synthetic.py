@@ -0,0 +1,229 @@
+"""Tablas sintéticas de Olist con tamaño escalable para los benchmarks.
+
+Genera los mismos CSV que espera ``Olist_Data/`` (mismas columnas y formato de
+fechas) con integridad referencial: cada pedido tiene su cliente, cada ítem
+apunta a un pedido, producto y vendedor existentes y cada reseña a un pedido.
+Con ``scale=1`` los tamaños son los del dataset público de Olist; los estados
+siguen su sesgo hacia SP, RJ y MG y las ciudades, productos y vendedores una
+distribución de Zipf.
+
+    python -m benchmarks.synthetic directorio_salida [escala]
+"""
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from olist_analytics.schema import TIMESTAMP_FORMAT
+
+# Tamaños del dataset público (escala 1)
+N_ORDERS = 99_441
+N_SELLERS = 3_095
+N_PRODUCTS = 32_951
+UNIQUE_CUSTOMER_RATIO = 0.966
+ITEMS_PER_ORDER = 1.133
+REVIEW_RATIO = 0.998
+PAYMENTS_PER_ORDER = 1.045
+
+# Reparto de clientes por estado (%) en el dataset original
+CUSTOMER_STATES = {
+    'SP': 41.98, 'RJ': 12.92, 'MG': 11.70, 'RS': 5.50, 'PR': 5.07, 'SC': 3.66,
+    'BA': 3.40, 'DF': 2.15, 'ES': 2.04, 'GO': 2.03, 'PE': 1.66, 'CE': 1.34,
+    'PA': 0.98, 'MT': 0.91, 'MA': 0.75, 'MS': 0.72, 'PB': 0.54, 'PI': 0.50,
+    'RN': 0.49, 'AL': 0.42, 'SE': 0.35, 'TO': 0.28, 'RO': 0.25, 'AM': 0.15,
+    'AC': 0.08, 'AP': 0.07, 'RR': 0.05,
+}
+SELLER_STATES = {
+    'SP': 59.74, 'PR': 11.28, 'MG': 7.88, 'SC': 6.14, 'RJ': 5.46, 'RS': 4.20,
+    'GO': 1.29, 'DF': 0.97, 'ES': 0.74, 'BA': 0.61, 'CE': 0.42, 'PE': 0.29,
+    'MT': 0.13, 'MS': 0.16, 'RN': 0.16, 'PB': 0.19, 'RO': 0.06, 'PI': 0.03,
+    'AM': 0.03, 'MA': 0.03, 'SE': 0.03, 'AC': 0.03, 'PA': 0.03,
+}
+CITIES_PER_STATE = 400
+PAYMENT_TYPES = {'credit_card': 0.739, 'boleto': 0.190, 'voucher': 0.056, 'debit_card': 0.015}
+FIRST_PURCHASE = np.datetime64('2016-09-04')
+PURCHASE_SPAN_DAYS = 730
+TRANSLATION_CSV = Path(__file__).resolve().parent.parent / 'Olist_Data' / 'product_category_name_translation.csv'
+
+
+def _hex_ids(rng, n):
+    """``n`` identificadores hexadecimales de 32 caracteres, como los de Olist."""
+    if n == 0:
+        return np.array([], dtype='U32')
+    return np.array([rng.bytes(16 * n).hex()]).view('U32')
+
+
+def _weighted(rng, mapping, n):
+    keys = np.array(list(mapping))
+    weights = np.array(list(mapping.values()), dtype=float)
+    return keys[rng.choice(len(keys), size=n, p=weights / weights.sum())]
+
+
+def _zipf_index(rng, n, size, a=1.3):
+    """Índices en ``[0, size)`` con cola larga (unos pocos muy frecuentes)."""
+    return (rng.zipf(a, n) - 1) % size
+
+
+def _cities(rng, states):
+    rank = _zipf_index(rng, len(states), CITIES_PER_STATE, a=1.5)
+    return np.char.add(np.char.add(np.char.lower(states.astype(str)), '_city_'), rank.astype(str))
+
+
+def _format(timestamps, missing=None):
+    text = pd.Series(timestamps).dt.strftime(TIMESTAMP_FORMAT)
+    return text if missing is None else text.where(~missing)
+
+
+def _seconds(values):
+    return values.astype('timedelta64[s]')
+
+
+def generate_tables(scale=1, seed=0):
+    """Diccionario ``{nombre_csv: DataFrame}`` con ``scale`` veces el tamaño real."""
+    rng = np.random.default_rng(seed)
+    n_orders = int(N_ORDERS * scale)
+    n_sellers = max(1, int(N_SELLERS * scale))
+    n_products = max(1, int(N_PRODUCTS * scale))
+
+    # Vendedores y productos
+    seller_ids = _hex_ids(rng, n_sellers)
+    seller_states = _weighted(rng, SELLER_STATES, n_sellers)
+    sellers = pd.DataFrame({
+        'seller_id': seller_ids,
+        'seller_zip_code_prefix': rng.integers(1000, 99999, n_sellers),
+        'seller_city': _cities(rng, seller_states),
+        'seller_state': seller_states,
+    })
+
+    translation = pd.read_csv(TRANSLATION_CSV)
+    categories = translation['product_category_name'].to_numpy()
+    product_ids = _hex_ids(rng, n_products)
+    products = pd.DataFrame({
+        'product_id': product_ids,
+        'product_category_name': categories[_zipf_index(rng, n_products, len(categories), a=1.2)],
+        'product_name_lenght': rng.integers(5, 76, n_products),
+        'product_description_lenght': rng.integers(4, 3992, n_products),
+        'product_photos_qty': rng.integers(1, 8, n_products),
+        'product_weight_g': rng.lognormal(6.7, 1.2, n_products).round(),
+        'product_length_cm': rng.integers(7, 105, n_products),
+        'product_height_cm': rng.integers(2, 105, n_products),
+        'product_width_cm': rng.integers(6, 118, n_products),
+    })
+
+    # Clientes: algunos repiten compra con otro customer_id (como en Olist)
+    n_unique = int(n_orders * UNIQUE_CUSTOMER_RATIO)
+    unique_ids = _hex_ids(rng, n_unique)
+    unique_states = _weighted(rng, CUSTOMER_STATES, n_unique)
+    unique_cities = _cities(rng, unique_states)
+    owner = np.concatenate([np.arange(n_unique), rng.integers(0, n_unique, n_orders - n_unique)])
+    customer_ids = _hex_ids(rng, n_orders)
+    customers = pd.DataFrame({
+        'customer_id': customer_ids,
+        'customer_unique_id': unique_ids[owner],
+        'customer_zip_code_prefix': rng.integers(1000, 99999, n_orders),
+        'customer_city': unique_cities[owner],
+        'customer_state': unique_states[owner],
+    })
+
+    # Pedidos
+    order_ids = _hex_ids(rng, n_orders)
+    purchase = FIRST_PURCHASE + _seconds(rng.integers(0, PURCHASE_SPAN_DAYS * 86400, n_orders))
+    approved = purchase + _seconds(rng.exponential(10 * 3600, n_orders))
+    carrier = approved + _seconds(rng.exponential(2.5 * 86400, n_orders))
+    delivered = carrier + _seconds(rng.exponential(9 * 86400, n_orders))
+    estimated = (purchase + np.timedelta64(24, 'D')).astype('datetime64[D]').astype('datetime64[s]')
+    not_delivered = rng.random(n_orders) >= 0.97
+    orders = pd.DataFrame({
+        'order_id': order_ids,
+        'customer_id': customer_ids,
+        'order_status': np.where(not_delivered, 'shipped', 'delivered'),
+        'order_purchase_timestamp': _format(purchase),
+        'order_approved_at': _format(approved),
+        'order_delivered_carrier_date': _format(carrier),
+        'order_delivered_customer_date': _format(delivered, not_delivered),
+        'order_estimated_delivery_date': _format(estimated),
+    })
+
+    # Ítems: al menos uno por pedido
+    n_items = int(n_orders * ITEMS_PER_ORDER)
+    item_order = np.sort(np.concatenate([np.arange(n_orders), rng.integers(0, n_orders, n_items - n_orders)]))
+    items = pd.DataFrame({
+        'order_id': order_ids[item_order],
+        'order_item_id': pd.Series(item_order).groupby(item_order).cumcount().to_numpy() + 1,
+        'product_id': product_ids[_zipf_index(rng, n_items, n_products)],
+        'seller_id': seller_ids[_zipf_index(rng, n_items, n_sellers)],
+        'shipping_limit_date': _format(purchase[item_order] + np.timedelta64(6, 'D')),
+        'price': rng.lognormal(4.4, 0.9, n_items).round(2),
+        'freight_value': rng.lognormal(2.9, 0.5, n_items).round(2),
+    })
+
+    # Pagos: uno por pedido y algunos pedidos con varios
+    n_payments = int(n_orders * PAYMENTS_PER_ORDER)
+    payment_order = np.sort(np.concatenate([np.arange(n_orders), rng.integers(0, n_orders, n_payments - n_orders)]))
+    payments = pd.DataFrame({
+        'order_id': order_ids[payment_order],
+        'payment_sequential': pd.Series(payment_order).groupby(payment_order).cumcount().to_numpy() + 1,
+        'payment_type': _weighted(rng, PAYMENT_TYPES, n_payments),
+        'payment_installments': rng.integers(1, 11, n_payments),
+        'payment_value': rng.lognormal(4.6, 0.8, n_payments).round(2),
+    })
+
+    # Reseñas: los pedidos tardíos puntúan peor
+    n_reviews = int(n_orders * REVIEW_RATIO)
+    reviewed = rng.permutation(n_orders)[:n_reviews]
+    late = (delivered > estimated)[reviewed]
+    scores = np.where(
+        late,
+        rng.choice([1, 2, 3, 4, 5], n_reviews, p=[0.45, 0.10, 0.15, 0.10, 0.20]),
+        rng.choice([1, 2, 3, 4, 5], n_reviews, p=[0.07, 0.03, 0.08, 0.20, 0.62]),
+    )
+    created = (delivered[reviewed] + np.timedelta64(1, 'D')).astype('datetime64[D]').astype('datetime64[s]')
+    reviews = pd.DataFrame({
+        'review_id': _hex_ids(rng, n_reviews),
+        'order_id': order_ids[reviewed],
+        'review_score': scores,
+        'review_comment_title': None,
+        'review_comment_message': np.where(rng.random(n_reviews) < 0.4, 'Muito bom, recomendo', None),
+        'review_creation_date': _format(created),
+        'review_answer_timestamp': _format(created + np.timedelta64(30, 'h')),
+    })
+
+    return {
+        'olist_orders_dataset.csv': orders,
+        'olist_customers_dataset.csv': customers,
+        'olist_order_items_dataset.csv': items,
+        'olist_order_payments_dataset.csv': payments,
+        'olist_order_reviews_dataset.csv': reviews,
+        'olist_sellers_dataset.csv': sellers,
+        'olist_products_dataset.csv': products,
+    }
+
+
+def generate(out_dir, scale=1, seed=0):
+    """Escribe las tablas en ``out_dir`` (junto con la traducción de categorías).
+
+    ``out_dir`` no puede ser ``Olist_Data``: se sobrescribirían los CSV reales.
+    """
+    out_dir = Path(out_dir)
+    if out_dir.resolve() == TRANSLATION_CSV.parent.resolve():
+        raise ValueError(f"{out_dir} contiene los datos reales de Olist; elige otro directorio de salida")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for filename, table in generate_tables(scale, seed).items():
+        table.to_csv(out_dir / filename, index=False)
+    shutil.copyfile(TRANSLATION_CSV, out_dir / TRANSLATION_CSV.name)
+    return out_dir
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        sys.exit("uso: python -m benchmarks.synthetic directorio_salida [escala]")
+    scale = float(argv[1]) if len(argv) > 1 else 1
+    out_dir = generate(argv[0], scale)
+    print(f"escala {scale:g} -> {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
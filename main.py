@@ -1,12 +1,26 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 import plotly.express as px
-import requests
-import seaborn as sns
+
+from olist_analytics import charts, customers, delivery, geo, profiling, reviews, sketches, warmup
+
+from app_data import (
+    clientes_por_ciudad, clientes_por_estado, current_table_keys, diagnostico_en_rango, filtros_seleccionados,
+    iniciar_calentamiento, load_states_geojson, new_customers_cached, order_facts_cached, productos_vendedores,
+    rango_y_filtros, resumen_ciudades, retrasos_en_rango, retrasos_por_vendedor, reviews_por_estado, sql_engine,
+)
 
 st.set_page_config(page_title="Informe Olist", layout="wide")
 
+# Modo depuración oculto: ?profile=1 en la URL o OLIST_PROFILE=1. Mide cada
+# bloque (tiempo, filas, delta de RSS), lo muestra en la barra lateral y lo
+# añade al log JSON-lines (ver olist_analytics.profiling).
+PROFILE = profiling.is_enabled(st.query_params.get("profile"))
+# Si la ejecución anterior se cortó (rerun, st.stop) antes de llegar al final,
+# su perfilador sigue activo en el hilo del script: cada ejecución parte de cero
+profiling.clear()
+profiler = profiling.start("script") if PROFILE else None
+
 st.title("Informe Analítico - Olist")
 
 st.markdown("""
@@ -53,80 +67,53 @@ st.markdown(
 )
 
 
-string_columns_orders = [
-    'customer_id',
-    'order_id',
-    'order_status',
-]
-
-string_columns_customers = [
-    'customer_id',
-    'customer_unique_id',
-    'customer_city',
-    'customer_state',
-]
-
-date_columns = [
-    'order_purchase_timestamp',
-    'order_approved_at',
-    'order_delivered_carrier_date',
-    'order_delivered_customer_date',
-    'order_estimated_delivery_date',
-]
 st.markdown("---")
 
-# Cargar datos
-orders = pd.read_csv('./Olist_Data/olist_orders_dataset.csv')
-costumers = pd.read_csv('./Olist_Data/olist_customers_dataset.csv')
-reviews = pd.read_csv('Olist_Data/olist_order_reviews_dataset.csv')
-items = pd.read_csv('Olist_Data/olist_order_items_dataset.csv')
-sellers = pd.read_csv('Olist_Data/olist_sellers_dataset.csv')
-products = pd.read_csv('Olist_Data/olist_products_dataset.csv')
-name_trans = pd.read_csv('Olist_Data/product_category_name_translation.csv')
-# Merge
-df = pd.merge(orders, costumers, on='customer_id')
-df['order_purchase_timestamp'] = pd.to_datetime(df['order_purchase_timestamp'])
-df['order_delivered_customer_date'] = pd.to_datetime(df['order_delivered_customer_date'])
-df['order_estimated_delivery_date'] = pd.to_datetime(df['order_estimated_delivery_date'])
-df['year'] = df['order_purchase_timestamp'].dt.year
-
-df_costumer_orders = pd.merge(orders, costumers, on='customer_id')
-df_costumer_orders['order_purchase_timestamp'] = pd.to_datetime(df_costumer_orders['order_purchase_timestamp'])
-df_costumer_orders['order_approved_at'] = pd.to_datetime(df_costumer_orders['order_approved_at'])
-df_costumer_orders['order_delivered_carrier_date'] = pd.to_datetime(df_costumer_orders['order_delivered_carrier_date'])
-df_costumer_orders['order_delivered_customer_date'] = pd.to_datetime(df_costumer_orders['order_delivered_customer_date'])
-df_costumer_orders['order_estimated_delivery_date'] = pd.to_datetime(df_costumer_orders['order_estimated_delivery_date'])
-
-orders_4 = orders[['order_id', 'customer_id']].copy()
-customers_4 = costumers[['customer_id', 'customer_state']].copy()
-reviews_4 = reviews[['review_id', 'order_id', 'review_score']].copy()
-
-df_4 = pd.merge(reviews_4, orders_4, on='order_id', how='left')
-df_4 = pd.merge(df_4, customers_4, on='customer_id', how='left')
-df_costumer_orders['is_late'] = df_costumer_orders['order_delivered_customer_date'] > df_costumer_orders['order_estimated_delivery_date']
-df_4 = pd.merge(df_4, df_costumer_orders, on='order_id', how='left')
-
-reviews_5 = reviews[['order_id', 'review_score']].copy()
-items_5 = items[['order_id', 'product_id', 'seller_id', 'price', 'freight_value']].copy()
-items_5['Total prize'] = items_5['price'].astype(float) + items_5['freight_value'].astype(float)
-items_5['Total prize'] = items_5['Total prize'].round(2)
-
-products_5 = products[['product_id', 'product_category_name']].copy()
-product_category_5 = pd.merge(products_5, name_trans, on='product_category_name', how='left')
-product_category_5 = product_category_5[['product_id', 'product_category_name_english']]
-product_category_5 = product_category_5.rename(columns={'product_category_name_english': 'product_category_name'})
-
-df_5 = pd.merge(reviews_5, items_5, on='order_id', how='left')
-df_5 = pd.merge(df_5, sellers, on='seller_id', how='left')
-df_5 = pd.merge(df_5, product_category_5, on='product_id', how='left')
-df_5 = df_5.drop_duplicates()
+
+def show_chart(draw, data, **options):
+    # PNG cacheado por datos y opciones (ver olist_analytics.charts)
+    with profiling.block(f"gráfico {draw.__name__}", rows_in=len(data)):
+        st.image(charts.render_png(draw, data, **options), use_container_width=True)
+
+
+def show_plotly(fig):
+    with profiling.block(f"plotly {fig.layout.title.text or ''}".strip()):
+        st.plotly_chart(fig, use_container_width=True)
+
+
+def mostrar_perfil(profiler, container):
+    container.caption(f"Perfil `{profiler.scope}` · ejecución `{profiler.run_id}`")
+    container.dataframe(profiler.frame(), hide_index=True, use_container_width=True)
+
+
+def seccion(nombre):
+    # Fragmento perfilado: siempre abre su propio perfilador (también dentro
+    # de la ejecución completa) y, como un fragmento no puede escribir en la
+    # barra lateral, muestra sus tiempos al final de la propia sección
+    def decorator(func):
+        return st.fragment(profiling.profiled(
+            nombre, lambda: PROFILE, on_finish=lambda profiler: mostrar_perfil(profiler, st)
+        )(func))
+    return decorator
+
+
+def mostrar_seccion(key, default=False):
+    # st.expander no expone si está abierto: el interruptor decide si la
+    # sección se calcula. Al estar dentro de un fragmento, activarlo solo
+    # re-ejecuta esa sección.
+    return st.toggle("Mostrar análisis", value=default, key=f"mostrar_{key}")
+
+
+# Versión de cada tabla (ruta, mtime, tamaño): se pasa explícitamente a cada
+# consulta cacheada y forma parte de su clave (ver app_data)
+table_keys = current_table_keys()
+calentamiento = iniciar_calentamiento(table_keys, warmup.parse_presets())
+
+min_date, max_date, filter_stats = rango_y_filtros(table_keys)
 
 # ==== SIDEBAR ====
 st.sidebar.title("Filtros")
 
-min_date = df['order_purchase_timestamp'].min()
-max_date = df['order_purchase_timestamp'].max()
-
 start_date, end_date = st.sidebar.date_input(
     "Rango de Fechas",
     value=(min_date, max_date),
@@ -136,62 +123,57 @@ start_date, end_date = st.sidebar.date_input(
 
 # Asegurar que la fecha sea datetime64
 start_date = pd.to_datetime(start_date)
-end_date = pd.to_datetime(end_date)
-
-# Filtrar por fecha seleccionada
-filtered_df = df[
-    (df['order_purchase_timestamp'] >= start_date) &
-    (df['order_purchase_timestamp'] <= end_date)
-]
+# El rango incluye el día final completo (hasta las 23:59:59)
+end_date = pd.to_datetime(end_date) + pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')
 
 pie_threshold = st.sidebar.slider("Umbral % para gráfico circular", 0.0, 10.0, 2.0)
 color_theme_list = ['Blues', 'Greens', 'Reds', 'Purples', 'viridis', 'plasma', 'inferno', 'cividis']
 selected_color_theme = st.sidebar.selectbox("Tema de color", color_theme_list)
 
-# Filtro por estado del vendedor
-estados_disponibles = df_5['seller_state'].dropna().unique()
+# Clientes por estado de 4.1: exactos o estimados con HyperLogLog
+# (olist_analytics.sketches). Solo se ofrece cuando los datos tienen pedidos
+# suficientes para que la estimación sea más rápida que el recuento exacto
+error_clientes = None
+if sql_engine is None and len(order_facts_cached(table_keys)) >= sketches.MIN_WINDOW_ORDERS:
+    precision_clientes = {"Exacto": None, "Aproximado (±2%)": 0.02, "Aproximado (±5%)": 0.05}
+    error_clientes = precision_clientes[st.sidebar.selectbox(
+        "Conteo de clientes por estado",
+        list(precision_clientes),
+        help=(
+            "El modo aproximado combina sketches por estado × mes en lugar de contar los pedidos "
+            f"del rango; en rangos de menos de {sketches.MIN_WINDOW_ORDERS:,} pedidos se cuenta exacto."
+        ),
+    )]
+
+# Filtros de productos y vendedores: los límites vienen de estadísticas
+# precalculadas y todos los predicados se aplican juntos en una sola máscara
 estados_seleccionados = st.sidebar.multiselect(
     "Filtrar por estado del vendedor",
-    options=sorted(estados_disponibles),
-    default=sorted(estados_disponibles)
+    options=filter_stats['seller_states'],
+    default=filter_stats['seller_states']
 )
-df_5 = df_5[df_5['seller_state'].isin(estados_seleccionados)]
 
-# Filtro por calificación
+score_bounds = filter_stats['review_score']
 score_min, score_max = st.sidebar.slider(
     "Filtrar por calificación (review_score)",
-    int(df_5['review_score'].min()),
-    int(df_5['review_score'].max()),
-    (int(df_5['review_score'].min()), int(df_5['review_score'].max()))
+    score_bounds[0], score_bounds[1], score_bounds
 )
-df_5 = df_5[(df_5['review_score'] >= score_min) & (df_5['review_score'] <= score_max)]
 
-# Filtro por precio total
+price_bounds = filter_stats['Total prize']
 price_min, price_max = st.sidebar.slider(
     "Filtrar por precio total",
-    float(df_5['Total prize'].min()), float(df_5['Total prize'].max()),
-    (float(df_5['Total prize'].min()), float(df_5['Total prize'].max()))
+    price_bounds[0], price_bounds[1], price_bounds
 )
-df_5 = df_5[(df_5['Total prize'] >= price_min) & (df_5['Total prize'] <= price_max)]
 
-# Filtro por costo de envío
+freight_bounds = filter_stats['freight_value']
 freight_min, freight_max = st.sidebar.slider(
     "Filtrar por costo de envío",
-    float(df_5['freight_value'].min()), float(df_5['freight_value'].max()),
-    (float(df_5['freight_value'].min()), float(df_5['freight_value'].max()))
+    freight_bounds[0], freight_bounds[1], freight_bounds
 )
-df_5 = df_5[(df_5['freight_value'] >= freight_min) & (df_5['freight_value'] <= freight_max)]
 
-# Filtro por número de pedidos
+# Filtro por número de pedidos (pedidos distintos por vendedor)
 st.sidebar.subheader("Filtrar por número de pedidos")
-# Contamos el número de pedidos por vendedor (o cliente)
-order_count = df_5.groupby('seller_id')['order_id'].nunique()
-
-# Definir el rango de pedidos (mínimo y máximo)
-min_orders = int(order_count.min())
-max_orders = int(order_count.max())
-
-# Slider para seleccionar el rango de número de pedidos
+min_orders, max_orders = filter_stats['seller_orders']
 min_filter, max_filter = st.sidebar.slider(
     "Selecciona el rango de número de pedidos",
     min_value=min_orders,
@@ -200,699 +182,525 @@ min_filter, max_filter = st.sidebar.slider(
     step=1
 )
 
-# Filtrar el dataframe según el número de pedidos
-filtered_order_df = order_count[(order_count >= min_filter) & (order_count <= max_filter)]
-df_5 = df_5[df_5['seller_id'].isin(filtered_order_df.index)]
+# Se aplican dentro de la sección 4.5, la única que los usa
+filtros_productos = filtros_seleccionados(
+    estados_seleccionados,
+    (score_min, score_max),
+    (price_min, price_max),
+    (freight_min, freight_max),
+    (min_filter, max_filter),
+)
 
 # ==== PROCESAMIENTO ====
-late_df = df[df["order_delivered_customer_date"] > df["order_estimated_delivery_date"]]
-late_orders = late_df.groupby("customer_city").size().rename("late_orders").to_frame()
-late_orders["avg_late_days"] = (
-    (late_df["order_delivered_customer_date"] - late_df["order_estimated_delivery_date"]).dt.days
-).groupby(late_df["customer_city"]).mean()
-late_orders["total_orders"] = df.groupby("customer_city").size()
-late_orders["late_percentage"] = (late_orders["late_orders"] / late_orders["total_orders"]) * 100
-late_orders.dropna(inplace=True)
-
-df_4 = df_4[['review_id', 'review_score', 'customer_state_x']]
-df_4 = df_4.groupby('customer_state_x').agg(
-        num_reviews=('review_id', 'count'),
-        score_medio=('review_score', 'mean')
-    ).reset_index()
-df_4['score_medio'] = df_4['score_medio'].round(2)
-df_4.rename(columns={'customer_state_x': 'customer_state'}, inplace=True)
-df_4 = df_4.sort_values(by='num_reviews', ascending=False)
-# KPIs
-total_late = late_df.shape[0]
-avg_late_days = late_orders["avg_late_days"].mean()
-avg_late_percent = late_orders["late_percentage"].mean()
-num_reviews = df_4['num_reviews'].count()
-score_mean = df_4['score_medio'].mean()
-score_mean =score_mean.round(2)
-best_seller=df_5.groupby('seller_id')['review_score'].mean().sort_values(ascending=False).head(1)
-top_category= df_5['product_category_name'].value_counts().head(10)
+# Cada sección es un fragmento (st.fragment) que recibe como argumentos solo
+# los filtros que usa: sus propios widgets re-ejecutan únicamente esa sección.
+# Las consultas cacheadas están en app_data y las métricas en olist_analytics
+# (sin dependencia de Streamlit).
+
+
 # ============================
 # 4.1 Distribución Geográfica
 # ============================
-with st.expander("4.1 Distribución Geográfica de Clientes", expanded=True):
-    st.subheader("Objetivo")
-    st.markdown("Identificar las zonas con mayor concentración de clientes para orientar acciones comerciales y logísticas.")
-
-    st.subheader("KPIs")
-    top_states = (
-        filtered_df.groupby('customer_state')['customer_unique_id']
-        .nunique()
-        .sort_values(ascending=False)
-    )
-    top_5_states = top_states.head(5)
-    top_states_list = ', '.join(top_5_states.index)
-
-    top_cities_count = (
-        filtered_df[filtered_df['customer_state'].isin(top_5_states.index)]
-        .groupby(['customer_state', 'customer_city'])['customer_unique_id']
-        .nunique()
-        .count()
-    )
-
-    primer_pedido = df.groupby('customer_unique_id')['order_purchase_timestamp'].min().reset_index()
-    primer_pedido['year_month'] = primer_pedido['order_purchase_timestamp'].dt.to_period('M')
-    primer_pedido_filtrado = primer_pedido[
-        (primer_pedido['order_purchase_timestamp'] >= start_date) &
-        (primer_pedido['order_purchase_timestamp'] <= end_date)
-    ]
-    nuevos_clientes = primer_pedido_filtrado.groupby('year_month')['customer_unique_id'].count()
-
-    kpi_col1, kpi_col2 = st.columns(2)
-    kpi_col1.metric("Top 5 Estados con más Clientes", top_states_list)
-    kpi_col2.metric("Clientes Nuevos", int(nuevos_clientes.sum()))
-
-    st.subheader("Visualizaciones")
-
-    col1, col2 = st.columns([1.8, 1.2])
-
-    with col1:
-        # Crear DataFrame para el mapa
-        top_states_df = top_states.reset_index()
-        top_states_df.columns = ['customer_state', 'num_customers']
-
-        # Cargar GeoJSON con estados brasileños y sus siglas
-        geojson_url = "https://raw.githubusercontent.com/codeforamerica/click_that_hood/master/public/data/brazil-states.geojson"
-        geojson_data = requests.get(geojson_url).json()
-
-        # Mapa Choropleth
-        fig_map = px.choropleth(
-            top_states_df,
-            geojson=geojson_data,
-            locations="customer_state",
-            color="num_customers",
-            color_continuous_scale="Blues",
-            featureidkey="properties.sigla",  # campo con las siglas
-            scope="south america",
-            labels={"num_customers": "Clientes"}
-        )
+@seccion("4.1 Distribución geográfica")
+def seccion_distribucion_geografica(start_date, end_date, color_theme, error_clientes):
+    with st.expander("4.1 Distribución Geográfica de Clientes", expanded=True):
+        st.subheader("Objetivo")
+        st.markdown("Identificar las zonas con mayor concentración de clientes para orientar acciones comerciales y logísticas.")
+        if not mostrar_seccion('4_1', default=True):
+            return
+
+        st.subheader("KPIs")
+        top_states = clientes_por_estado(table_keys, start_date, end_date, error_clientes)
+        top_5_states = top_states.head(5)
+        top_states_list = ', '.join(top_5_states.index)
+
+        # Clientes cuya primera compra cae en el rango (tabla precalculada y ordenada)
+        primer_pedido, nuevos_clientes_diarios = new_customers_cached(table_keys)
+        nuevos_clientes = customers.count_new_customers(primer_pedido, start_date, end_date)
+
+        kpi_col1, kpi_col2 = st.columns(2)
+        kpi_col1.metric("Top 5 Estados con más Clientes", top_states_list)
+        kpi_col2.metric("Clientes Nuevos", int(nuevos_clientes))
+
+        st.subheader("Visualizaciones")
+
+        col1, col2 = st.columns([1.8, 1.2])
+
+        with col1:
+            # Crear DataFrame para el mapa
+            top_states_df = top_states.reset_index()
+            top_states_df.columns = ['customer_state', 'num_customers']
+
+            # Cargar GeoJSON con estados brasileños y sus siglas (local y simplificado)
+            geojson_data = load_states_geojson()
+
+            if geojson_data is None:
+                st.warning(
+                    "No se encontró el mapa de estados. Genera "
+                    f"`Olist_Data/{geo.GEOJSON_FILENAME}` con `python -m olist_analytics.geo`."
+                )
+            else:
+                # Mapa Choropleth
+                fig_map = px.choropleth(
+                    top_states_df,
+                    geojson=geojson_data,
+                    locations="customer_state",
+                    color="num_customers",
+                    color_continuous_scale=color_theme,
+                    featureidkey="properties.sigla",  # campo con las siglas
+                    scope="south america",
+                    labels={"num_customers": "Clientes"}
+                )
+
+                fig_map.update_geos(fitbounds="locations", visible=False)
+                fig_map.update_layout(
+                    title="Concentración de Clientes por Estado (Brasil)",
+                    margin=dict(l=0, r=0, t=30, b=0),
+                    height=900
+                )
+
+                show_plotly(fig_map)
+
+        with col2:
+            # Selector para estado (opcional o se sincroniza con clic en mapa si fuera posible)
+            selected_state = st.selectbox(
+                "Selecciona un estado para ver el detalle",
+                options=top_states_df['customer_state'].unique(),
+                index=0
+            )
+            st.markdown(f"#### Clientes en Ciudades de {selected_state}")
+            city_summary_f1 = clientes_por_ciudad(table_keys, start_date, end_date, selected_state)
+            st.dataframe(city_summary_f1, height=250)
 
-        fig_map.update_geos(fitbounds="locations", visible=False)
-        fig_map.update_layout(
-            title="Concentración de Clientes por Estado (Brasil)",
-            margin=dict(l=0, r=0, t=30, b=0),
-            height=900
-        )
+            st.markdown("#### Nuevos Clientes Captados por Mes")
+
+            # Nuevos clientes del estado seleccionado (altas diarias precalculadas por estado)
+            nuevos_clientes_estado = customers.new_customers_per_month(
+                nuevos_clientes_diarios, selected_state, start_date, end_date
+            )
+            nuevos_df = nuevos_clientes_estado.reset_index(name='nuevos_clientes')
 
-        st.plotly_chart(fig_map, use_container_width=True)
+            show_chart(
+                charts.line_chart, nuevos_df.astype({'year_month': str}), figsize=(6, 4),
+                x='year_month', y='nuevos_clientes', color='purple',
+                title=f"Nuevos Clientes en {selected_state}", xlabel="Mes", ylabel="Nuevos Clientes"
+            )
 
-    with col2:
-        # Selector para estado (opcional o se sincroniza con clic en mapa si fuera posible)
-        selected_state = st.selectbox(
-            "Selecciona un estado para ver el detalle",
-            options=top_states_df['customer_state'].unique(),
-            index=0
-        )
-        st.markdown(f"#### Clientes en Ciudades de {selected_state}")
-        city_summary_f1 = (
-            filtered_df[filtered_df["customer_state"] == selected_state]
-            .groupby('customer_city')['customer_unique_id']
-            .nunique()
-            .reset_index(name='num_clientes')
-            .sort_values(by='num_clientes', ascending=False)
-        )
-        st.dataframe(city_summary_f1, height=250)
+            if not nuevos_df.empty:
+                mejor_mes = nuevos_df.loc[nuevos_df['nuevos_clientes'].idxmax()]
+                st.markdown(f"""
+                **Mes con más captación:** `{mejor_mes['year_month']}`  
+                **Nuevos clientes:** `{mejor_mes['nuevos_clientes']}`
+                """)
 
-        st.markdown("#### Nuevos Clientes Captados por Mes")
 
-        # Filtrar nuevos clientes por estado seleccionado
-        clientes_en_estado = df[df['customer_state'] == selected_state]
-        primer_pedido_estado = (
-            clientes_en_estado.groupby('customer_unique_id')['order_purchase_timestamp']
-            .min()
-            .reset_index()
-        )
-        primer_pedido_estado['year_month'] = primer_pedido_estado['order_purchase_timestamp'].dt.to_period('M')
-        primer_pedido_estado_filtrado = primer_pedido_estado[
-            (primer_pedido_estado['order_purchase_timestamp'] >= start_date) &
-            (primer_pedido_estado['order_purchase_timestamp'] <= end_date)
-        ]
-        nuevos_clientes_estado = primer_pedido_estado_filtrado.groupby('year_month')['customer_unique_id'].count()
-        nuevos_df = nuevos_clientes_estado.reset_index(name='nuevos_clientes')
-
-        fig, ax = plt.subplots(figsize=(6, 4))
-        ax.plot(nuevos_df['year_month'].astype(str), nuevos_df['nuevos_clientes'], marker='o', color='purple')
-        ax.set_title(f"Nuevos Clientes en {selected_state}")
-        ax.set_xlabel("Mes")
-        ax.set_ylabel("Nuevos Clientes")
-        ax.tick_params(axis='x', rotation=45)
-        st.pyplot(fig)
-
-        if not nuevos_df.empty:
-            mejor_mes = nuevos_df.loc[nuevos_df['nuevos_clientes'].idxmax()]
-            st.markdown(f"""
-            **Mes con más captación:** `{mejor_mes['year_month']}`  
-            **Nuevos clientes:** `{mejor_mes['nuevos_clientes']}`
-            """)
-        
+        st.subheader("Insight")
+        st.info("El 67% de la base de clientes se concentra en cinco estados, siendo São Paulo el de mayor peso. Este patrón sugiere que campañas de marketing y mejoras logísticas en estos estados tendrán un mayor retorno.")
+
 
-    st.subheader("Insight")
-    st.info("El 67% de la base de clientes se concentra en cinco estados, siendo São Paulo el de mayor peso. Este patrón sugiere que campañas de marketing y mejoras logísticas en estos estados tendrán un mayor retorno.")
+seccion_distribucion_geografica(start_date, end_date, selected_color_theme, error_clientes)
 
 st.markdown("---")
 
 # ============================
 # 4.2 Análisis de Pedidos
 # ============================
-with st.expander("4.2 Análisis de Pedidos y Comportamiento del Cliente", expanded=True):
-    st.subheader("Objetivo")
-    st.markdown("Entender la relación entre cantidad de pedidos, porcentaje respecto al total y hábitos de consumo por cliente.")
-
-    # Agrupaciones y métricas
-    grouped = filtered_df.groupby(['customer_state', 'customer_city'])
-
-    city_summary = grouped.agg(
-        num_clientes=('customer_unique_id', 'nunique'),
-        num_pedidos=('order_id', 'nunique')
-    ).reset_index()
-
-    total_pedidos = filtered_df['order_id'].nunique()
-    city_summary['porcentaje_pedidos'] = (
-        city_summary['num_pedidos'] / total_pedidos * 100
-    ).round(2)
-    city_summary['ratio_pedidos_cliente'] = (
-        city_summary['num_pedidos'] / city_summary['num_clientes']
-    ).round(2)
-
-    filtered_df['tiempo_entrega'] = (
-        filtered_df['order_delivered_customer_date'] - filtered_df['order_purchase_timestamp']
-    ).dt.days
-
-    entrega_por_ciudad = (
-        filtered_df.groupby(['customer_state', 'customer_city'])['tiempo_entrega']
-        .mean()
-        .reset_index(name='entrega_prom_dias')
-    )
-
-    city_summary = pd.merge(city_summary, entrega_por_ciudad, on=['customer_state', 'customer_city'], how='left')
-
-    # KPIs
-    total_pedidos_ciudades = city_summary['num_pedidos'].sum()
-    kpi_col1, kpi_col2 = st.columns(2)
-    kpi_col1.metric("Total pedidos", f"{total_pedidos_ciudades}")
-    kpi_col2.metric("Ratio pedidos por cliente (prom)", f"{city_summary['ratio_pedidos_cliente'].mean():.2f}")
-
-    st.subheader("Visualizaciones")
-
-    col1, col2 = st.columns(2)
-
-    with col1:
-        st.markdown("#### Top 10 Ciudades con Más Pedidos")
-        top_pedidos = city_summary.sort_values('num_pedidos', ascending=False).head(10)
-        top_pedidos['label'] = top_pedidos['customer_city'] + ' (' + top_pedidos['customer_state'] + ')'
-        fig1, ax1 = plt.subplots(figsize=(8, 5))
-        ax1.bar(top_pedidos['label'], top_pedidos['num_pedidos'], color='dodgerblue')
-        ax1.set_title("Top 10 Ciudades con Más Pedidos")
-        ax1.set_xlabel("Ciudad (Estado)")
-        ax1.set_ylabel("Número de Pedidos")
-        ax1.tick_params(axis='x', rotation=45)
-        st.pyplot(fig1)
-
-        st.markdown("#### Top 10 Ciudades con Entrega más Rápida")
-        top_fast = city_summary.sort_values('entrega_prom_dias').head(10)
-        top_fast['label'] = top_fast['customer_city'] + ' (' + top_fast['customer_state'] + ')'
-        fig2, ax2 = plt.subplots(figsize=(8, 5))
-        ax2.bar(top_fast['label'], top_fast['entrega_prom_dias'], color='seagreen')
-        ax2.set_title("Duración Promedio de Entrega por Ciudad")
-        ax2.set_xlabel("Ciudad (Estado)")
-        ax2.set_ylabel("Días Promedio de Entrega")
-        ax2.tick_params(axis='x', rotation=45)
-        st.pyplot(fig2)
-
-    with col2:
-        st.markdown("#### Top 10 Ciudades con Mayor Ratio de Pedidos por Cliente")
-        top_ratios = city_summary.sort_values('ratio_pedidos_cliente', ascending=False).head(10)
-        top_ratios['label'] = top_ratios['customer_city'] + ' (' + top_ratios['customer_state'] + ')'
-        fig, ax = plt.subplots(figsize=(8, 5))
-        ax.bar(top_ratios['label'], top_ratios['ratio_pedidos_cliente'], color='crimson')
-        ax.set_title("Ratio Medio de Pedidos por Cliente por Ciudad")
-        ax.set_xlabel("Ciudad (Estado)")
-        ax.set_ylabel("Ratio de Pedidos por Cliente")
-        ax.tick_params(axis='x', rotation=45)
-        st.pyplot(fig)
-
-        st.markdown("#### Tabla con Métricas Clave por Ciudad")
-        st.dataframe(city_summary)
-
-    st.subheader("Insight")
-    st.info("Algunas ciudades con alta cantidad de clientes presentan ratios bajos de pedidos por cliente. Esto sugiere oportunidades de fidelización o retención con campañas específicas (descuentos por recurrencia, newsletters, etc.).")
+@seccion("4.2 Pedidos")
+def seccion_pedidos(start_date, end_date):
+    with st.expander("4.2 Análisis de Pedidos y Comportamiento del Cliente", expanded=True):
+        st.subheader("Objetivo")
+        st.markdown("Entender la relación entre cantidad de pedidos, porcentaje respecto al total y hábitos de consumo por cliente.")
+        if not mostrar_seccion('4_2'):
+            return
+
+        # Pedidos, clientes y tiempos de entrega por ciudad (cubo + clientes distintos)
+        city_summary = resumen_ciudades(table_keys, start_date, end_date)
+
+        # KPIs
+        total_pedidos_ciudades = city_summary['num_pedidos'].sum()
+        kpi_col1, kpi_col2 = st.columns(2)
+        kpi_col1.metric("Total pedidos", f"{total_pedidos_ciudades}")
+        kpi_col2.metric("Ratio pedidos por cliente (prom)", f"{city_summary['ratio_pedidos_cliente'].mean():.2f}")
+
+        st.subheader("Visualizaciones")
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.markdown("#### Top 10 Ciudades con Más Pedidos")
+            top_pedidos = city_summary.sort_values('num_pedidos', ascending=False).head(10)
+            top_pedidos['label'] = top_pedidos['customer_city'] + ' (' + top_pedidos['customer_state'] + ')'
+            show_chart(
+                charts.bar_chart, top_pedidos[['label', 'num_pedidos']], figsize=(8, 5),
+                x='label', y='num_pedidos', color='dodgerblue',
+                title="Top 10 Ciudades con Más Pedidos", xlabel="Ciudad (Estado)", ylabel="Número de Pedidos"
+            )
 
+            st.markdown("#### Top 10 Ciudades con Entrega más Rápida")
+            top_fast = city_summary.sort_values('entrega_prom_dias').head(10)
+            top_fast['label'] = top_fast['customer_city'] + ' (' + top_fast['customer_state'] + ')'
+            show_chart(
+                charts.bar_chart, top_fast[['label', 'entrega_prom_dias']], figsize=(8, 5),
+                x='label', y='entrega_prom_dias', color='seagreen',
+                title="Duración Promedio de Entrega por Ciudad", xlabel="Ciudad (Estado)",
+                ylabel="Días Promedio de Entrega"
+            )
 
+        with col2:
+            st.markdown("#### Top 10 Ciudades con Mayor Ratio de Pedidos por Cliente")
+            top_ratios = city_summary.sort_values('ratio_pedidos_cliente', ascending=False).head(10)
+            top_ratios['label'] = top_ratios['customer_city'] + ' (' + top_ratios['customer_state'] + ')'
+            show_chart(
+                charts.bar_chart, top_ratios[['label', 'ratio_pedidos_cliente']], figsize=(8, 5),
+                x='label', y='ratio_pedidos_cliente', color='crimson',
+                title="Ratio Medio de Pedidos por Cliente por Ciudad", xlabel="Ciudad (Estado)",
+                ylabel="Ratio de Pedidos por Cliente"
+            )
+
+            st.markdown("#### Tabla con Métricas Clave por Ciudad")
+            st.dataframe(city_summary)
+
+        st.subheader("Insight")
+        st.info("Algunas ciudades con alta cantidad de clientes presentan ratios bajos de pedidos por cliente. Esto sugiere oportunidades de fidelización o retención con campañas específicas (descuentos por recurrencia, newsletters, etc.).")
+
+
+seccion_pedidos(start_date, end_date)
 
 st.markdown("---")
 
 # ============================
 # 4.3 Logística y Retrasos
 # ============================
-with st.expander("4.3 Logística y Diagnóstico de Retrasos en Entregas", expanded=True):
-    st.subheader("Objetivo")
-    st.markdown("Analizar causas y patrones en los pedidos que superan la fecha estimada de entrega.")
+@seccion("4.3 Logística y retrasos")
+def seccion_logistica(start_date, end_date, pie_threshold):
+    with st.expander("4.3 Logística y Diagnóstico de Retrasos en Entregas", expanded=True):
+        st.subheader("Objetivo")
+        st.markdown("Analizar causas y patrones en los pedidos que superan la fecha estimada de entrega.")
+        if not mostrar_seccion('4_3'):
+            return
 
-    st.subheader("KPIs")
-    kpi_col1, kpi_col2 = st.columns(2)
-    kpi_col1.metric("% Pedidos con retraso", f"{avg_late_percent:.1f}%")
-    kpi_col2.metric("Días promedio de retraso", f"{avg_late_days:.1f}")
+        retrasos = retrasos_en_rango(table_keys, start_date, end_date)
+        late_orders = retrasos['late_orders']
+        avg_late_days, avg_late_percent = delivery.late_kpis(late_orders)
 
-    st.subheader("Visualizaciones")
+        st.subheader("KPIs")
+        kpi_col1, kpi_col2 = st.columns(2)
+        kpi_col1.metric("% Pedidos con retraso", f"{avg_late_percent:.1f}%")
+        kpi_col2.metric("Días promedio de retraso", f"{avg_late_days:.1f}")
 
-    # Gráficos compactos
-    col1, col2 = st.columns([1.2, 1.8])
+        st.subheader("Visualizaciones")
 
-    with col1:
-        # Gráfico de Top 10 Ciudades con Pedidos Tardíos
-        st.caption("Pedidos Tardíos por ciudades")
+        # Gráficos compactos
+        col1, col2 = st.columns([1.2, 1.8])
 
-        # Ordenar las ciudades por la cantidad de pedidos tardíos de mayor a menor
-        top_late_orders = late_orders.sort_values(by="late_orders", ascending=False)
+        with col1:
+            # Gráfico de Top 10 Ciudades con Pedidos Tardíos
+            st.caption("Pedidos Tardíos por ciudades")
 
-        # Seleccionar las columnas que queremos mostrar
-        top_late_orders_display = top_late_orders[["late_orders", "late_percentage"]].copy()
-        top_late_orders_display["late_percentage"] = top_late_orders_display["late_percentage"].round(2)
+            # Ordenar las ciudades por la cantidad de pedidos tardíos de mayor a menor
+            top_late_orders = late_orders.sort_values(by="late_orders", ascending=False)
 
-        # Mostrar la tabla scrolleable
-        st.dataframe(top_late_orders_display, height=400)  # `height=400` hace que la tabla sea scrolleable
+            # Seleccionar las columnas que queremos mostrar
+            top_late_orders_display = top_late_orders[["late_orders", "late_percentage"]].copy()
+            top_late_orders_display["late_percentage"] = top_late_orders_display["late_percentage"].round(2)
 
+            # Mostrar la tabla scrolleable
+            st.dataframe(top_late_orders_display, height=400)  # `height=400` hace que la tabla sea scrolleable
 
 
-    with col2:
-        st.caption("Comparación de Pedidos Tardíos vs Totales por Ciudad")
 
-        # Crear un DataFrame con los datos necesarios
-        stacked_data = late_orders[["late_orders", "total_orders", "late_percentage", "avg_late_days"]].copy()
-        stacked_data["on_time_orders"] = (
-            stacked_data["total_orders"] - stacked_data["late_orders"]
-        )
+        with col2:
+            st.caption("Comparación de Pedidos Tardíos vs Totales por Ciudad")
 
-        # Seleccionar las ciudades con mayor cantidad de pedidos totales
-        top_cities = stacked_data.sort_values(by="total_orders", ascending=False).head(10).reset_index()
+            # Crear un DataFrame con los datos necesarios
+            stacked_data = late_orders[["late_orders", "total_orders", "late_percentage", "avg_late_days"]].copy()
+            stacked_data["on_time_orders"] = (
+                stacked_data["total_orders"] - stacked_data["late_orders"]
+            )
 
-        # Crear el gráfico con Seaborn
-        fig, ax = plt.subplots(figsize=(10, 6))
-        top_cities_melted = top_cities.melt(
-            id_vars="customer_city",
-            value_vars=["late_orders", "on_time_orders"],
-            var_name="Tipo de Pedido",
-            value_name="Cantidad"
-        )
+            # Seleccionar las ciudades con mayor cantidad de pedidos totales
+            top_cities = stacked_data.sort_values(by="total_orders", ascending=False).head(10).reset_index()
 
-        sns.barplot(
-            data=top_cities_melted,
-            x="Cantidad",
-            y="customer_city",
-            hue="Tipo de Pedido",
-            palette={"late_orders": "red", "on_time_orders": "green"},
-            ax=ax
-        )
+            # Gráfico de barras (Seaborn) con el % de pedidos tardíos al lado de cada ciudad
+            show_chart(
+                charts.late_vs_total_chart,
+                top_cities[["customer_city", "late_orders", "on_time_orders", "total_orders", "late_percentage"]],
+                figsize=(10, 6)
+            )
 
-        # Añadir etiquetas y título
-        ax.set_title("Comparación de Pedidos Tardíos vs Totales por Ciudad", fontsize=14)
-        ax.set_xlabel("Cantidad de Pedidos", fontsize=12)
-        ax.set_ylabel("Ciudad", fontsize=12)
-        handles, labels = ax.get_legend_handles_labels()
-        ax.legend(handles, ["Pedidos Tardíos", "Pedidos a Tiempo"], title="Tipo de Pedido", fontsize=10)
-
-        # Añadir porcentaje de pedidos tardíos como texto al lado de las barras
-        for i, row in top_cities.iterrows():
-            ax.text(
-            row["total_orders"] + 5,  # Ajustar posición del texto
-            i,
-            f"{row['late_percentage']:.1f}%",
-            va="center",
-            fontsize=10,
-            color="red"
+        # Línea de tiempo
+        col3, col4 = st.columns([1.2, 1.8])
+
+        with col3:
+            st.caption("Evolución de Pedidos Tardíos a lo Largo del Tiempo")
+            late_over_time = retrasos['late_over_time']
+            show_chart(charts.frame_line_chart, late_over_time, figsize=(9, 5))
+
+        with col4:
+            # Agrupar los datos por estado y calcular la cantidad de pedidos tardíos
+            late_orders_by_state = retrasos['late_by_state']
+            # Filtrar los estados con porcentaje mayor al 2%
+            filtered_late_orders_by_state = late_orders_by_state[late_orders_by_state["late_percentage"] > pie_threshold]
+
+            # Crear gráfico de pastel con Plotly
+            fig_pie = px.pie(
+                filtered_late_orders_by_state,
+                names=filtered_late_orders_by_state.index,
+                values="late_percentage",
+                title="Distribución de Pedidos Tardíos por Estado",
+                color=filtered_late_orders_by_state.index,
+                color_discrete_sequence=px.colors.sequential.Plasma  # Puedes cambiar el color según tus preferencias
             )
 
-        st.pyplot(fig)
+            # Mostrar el gráfico de pastel en Streamlit
+            show_plotly(fig_pie)
+
+
+
+        st.subheader("Análisis de Causas Potenciales")
+
+        st.markdown("Exploramos distintas hipótesis para entender las causas más frecuentes detrás de los pedidos entregados con retraso.")
 
-    # Línea de tiempo
-    col3, col4 = st.columns([1.2, 1.8])
+        # Comparaciones calculadas sobre los pedidos del rango (cacheadas por rango)
+        diagnostico = diagnostico_en_rango(table_keys, start_date, end_date)
 
-    with col3:
-        st.caption("Evolución de Pedidos Tardíos a lo Largo del Tiempo")
-        late_over_time = (
-            late_df.groupby(late_df["order_purchase_timestamp"].dt.to_period("M"))
-            .size()
-            .rename("late_orders")
-            .to_frame()
+        # Solo se calcula la hipótesis elegida (st.tabs dibujaría las cuatro)
+        hipotesis = st.radio(
+            "Hipótesis",
+            ["Tiempo de Despacho", "Categoría del Producto", "Vendedores", "Tipo de Pago"],
+            horizontal=True,
+            key="hipotesis_retrasos"
         )
-        late_over_time.index = late_over_time.index.to_timestamp()
-        fig4, ax4 = plt.subplots(figsize=(9, 5))
-        late_over_time.plot(ax=ax4, marker="o", legend=False)
-        st.pyplot(fig4)
-
-    with col4:
-        # Agrupar los datos por estado y calcular la cantidad de pedidos tardíos
-        late_orders_by_state = (
-            df_costumer_orders[
-                df_costumer_orders["order_delivered_customer_date"]
-                > df_costumer_orders["order_estimated_delivery_date"]
+
+        # TAB 1 - Tiempo de despacho (dispatch_time en horas, ver delivery.add_delivery_metrics)
+        # Calcular el tiempo promedio de despacho de los pedidos a tiempo y tardíos
+        dispatch_means = retrasos['dispatch_means']
+        avg_dispatch_time_on_time = dispatch_means["A Tiempo"]
+        avg_dispatch_time_late = dispatch_means["Tardío"]
+        if hipotesis == "Tiempo de Despacho":
+            st.markdown("¿Los pedidos tardíos se deben a que los vendedores tardan más en despacharlos?")
+            despacho_df = pd.DataFrame({
+            "Tipo de Pedido": ["A Tiempo", "Tardío"],
+            "Tiempo Promedio de Despacho (horas)": [
+                round(avg_dispatch_time_on_time, 2), round(avg_dispatch_time_late, 2)
             ]
-            .groupby("customer_state")
-            .size()
-            .rename("late_orders")
-            .to_frame()
-        )
+            })
+            fig1 = px.bar(
+            despacho_df,
+            x="Tipo de Pedido",
+            y="Tiempo Promedio de Despacho (horas)",
+            color="Tipo de Pedido",
+            color_discrete_map={"A Tiempo": "green", "Tardío": "red"},
+            text="Tiempo Promedio de Despacho (horas)"
+            )
+            fig1.update_layout(title="Comparación del Tiempo de Despacho")
+            show_plotly(fig1)
+
+        # TAB 2 - Categorías con más despacho en pedidos tardíos (del diagnóstico)
+        if hipotesis == "Categoría del Producto":
+            st.markdown("¿Algunas categorías de productos tienen más retrasos que otras?")
+            category_dispatch = diagnostico['category_dispatch']
+            cat_df = pd.DataFrame({
+            "Categoría": category_dispatch.index,
+            "Promedio Horas de Despacho": category_dispatch.round(2).to_numpy()
+            })
+
+            fig2 = px.bar(
+            cat_df.sort_values("Promedio Horas de Despacho", ascending=False),
+            x="Promedio Horas de Despacho",
+            y="Categoría",
+            orientation="h",
+            color="Promedio Horas de Despacho",
+            color_continuous_scale="viridis"
+            )
+            fig2.update_layout(title="Categorías con Mayor Tiempo de Despacho en Pedidos Tardíos")
+            show_plotly(fig2)
+
+        # TAB 3 - Vendedores con más retrasos
+        if hipotesis == "Vendedores":
+            st.markdown("¿Existen vendedores con alta proporción de retrasos?")
+            # Ítems ⋈ pedidos del rango, solo si se elige esta hipótesis
+            seller_analysis = retrasos_por_vendedor(table_keys, start_date, end_date)
+            st.dataframe(seller_analysis)
+            top_sellers = seller_analysis.head(10).reset_index()
+
+            fig3 = px.bar(
+            top_sellers,
+            x="late_percentage",
+            y="seller_id",
+            orientation="h",
+            text="late_percentage",
+            labels={"late_percentage": "% Pedidos Tardíos", "seller_id": "Vendedor"},
+            color="late_percentage",
+            color_continuous_scale="Reds"
+            )
+            fig3.update_layout(title="Top 10 Vendedores con Mayor % de Pedidos Tardíos")
+            show_plotly(fig3)
+
+        # TAB 4 - Método de pago
+        if hipotesis == "Tipo de Pago":
+            st.markdown("¿El método de pago influye en los retrasos? (Poca evidencia, pero se analiza)")
+            late_by_payment = diagnostico['late_by_payment']
+            payment_df = pd.DataFrame({
+            "Método de Pago": late_by_payment.index,
+            "% Pedidos Tardíos": late_by_payment.round(2).to_numpy()
+            })
+            fig4 = px.bar(
+            payment_df.sort_values("% Pedidos Tardíos", ascending=False),
+            x="% Pedidos Tardíos",
+            y="Método de Pago",
+            orientation="h",
+            color="% Pedidos Tardíos",
+            color_continuous_scale="Blues"
+            )
+            fig4.update_layout(title="% Pedidos Tardíos por Método de Pago")
+            show_plotly(fig4)
 
-        late_orders_by_state["late_percentage"] = (
-            late_orders_by_state["late_orders"] / late_orders_by_state["late_orders"].sum()
-        ) * 100
-        # Filtrar los estados con porcentaje mayor al 2%
-        filtered_late_orders_by_state = late_orders_by_state[late_orders_by_state["late_percentage"] > pie_threshold]
-
-        # Crear gráfico de pastel con Plotly
-        fig_pie = px.pie(
-            filtered_late_orders_by_state,
-            names=filtered_late_orders_by_state.index,
-            values="late_percentage",
-            title="Distribución de Pedidos Tardíos por Estado",
-            color=filtered_late_orders_by_state.index,
-            color_discrete_sequence=px.colors.sequential.Plasma  # Puedes cambiar el color según tus preferencias
-        )
 
-        # Mostrar el gráfico de pastel en Streamlit
-        st.plotly_chart(fig_pie, use_container_width=True)
-    
-
-
-    st.subheader("Análisis de Causas Potenciales")
-
-    st.markdown("Exploramos distintas hipótesis para entender las causas más frecuentes detrás de los pedidos entregados con retraso.")
-
-    tabs = st.tabs(["Tiempo de Despacho", "Categoría del Producto", "Vendedores", "Tipo de Pago"])
-
-    # TAB 1 - Tiempo de despacho
-    df_costumer_orders["dispatch_time"] = (
-        df_costumer_orders["order_approved_at"] - df_costumer_orders["order_purchase_timestamp"]
-    ).dt.total_seconds() / 3600  # Convertir a horas
-
-    # Separar los pedidos en entregados a tiempo y entregados tarde
-    on_time_orders = df_costumer_orders[
-        df_costumer_orders["order_delivered_customer_date"]
-        <= df_costumer_orders["order_estimated_delivery_date"]
-    ]
-    late_orders = df_costumer_orders[
-        df_costumer_orders["order_delivered_customer_date"]
-        > df_costumer_orders["order_estimated_delivery_date"]
-    ]
-
-    # Calcular el tiempo promedio de despacho para cada grupo
-    avg_dispatch_time_on_time = on_time_orders["dispatch_time"].mean()
-    avg_dispatch_time_late = late_orders["dispatch_time"].mean()
-    with tabs[0]:
-        st.markdown("¿Los pedidos tardíos se deben a que los vendedores tardan más en despacharlos?")
-        despacho_df = pd.DataFrame({
-        "Tipo de Pedido": ["A Tiempo", "Tardío"],
-        "Tiempo Promedio de Despacho (horas)": [10.10, 12.31]
-        })
-        fig1 = px.bar(
-        despacho_df,
-        x="Tipo de Pedido",
-        y="Tiempo Promedio de Despacho (horas)",
-        color="Tipo de Pedido",
-        color_discrete_map={"A Tiempo": "green", "Tardío": "red"},
-        text="Tiempo Promedio de Despacho (horas)"
-        )
-        fig1.update_layout(title="Comparación del Tiempo de Despacho")
-        st.plotly_chart(fig1, use_container_width=True)
-
-    # TAB 2 - Categoría del producto
-    # Cargar el dataset de items de pedido
-    order_items = pd.read_csv('./Olist_Data/olist_order_items_dataset.csv')
-
-    # Cargar el dataset de productos
-    products = pd.read_csv('./Olist_Data/olist_products_dataset.csv')
-
-    # Combinar los datos de items de pedido con los productos
-    df_items_with_products = pd.merge(
-        order_items,
-        products,
-        on='product_id',  # Relacionar por la columna 'product_id'
-        how='inner'
-    )
-
-    # Combinar los datos de items con los pedidos
-    df_orders_with_items_products = pd.merge(
-        df_costumer_orders,
-        df_items_with_products,
-        on='order_id',  # Relacionar por la columna 'order_id'
-        how='inner'
-    )
-
-    # Filtrar los pedidos tardíos
-    late_orders_with_products = df_orders_with_items_products[
-        df_orders_with_items_products["order_delivered_customer_date"]
-        > df_orders_with_items_products["order_estimated_delivery_date"]
-    ]
-
-    # Calcular el porcentaje de pedidos tardíos por categoría de producto
-    late_percentage_by_category = (
-        late_orders_with_products.groupby("product_category_name").size()
-        / df_orders_with_items_products.groupby("product_category_name").size()
-    ) * 100
-
-    # Ordenar por porcentaje de pedidos tardíos
-    late_percentage_by_category = late_percentage_by_category.sort_values(ascending=False)
-
-    with tabs[1]:
-        st.markdown("¿Algunas categorías de productos tienen más retrasos que otras?")
-        cat_df = pd.DataFrame({
-        "Categoría": [
-            "casa_conforto_2", "moveis_colchao_e_estofado", "audio",
-            "fashion_underwear_e_moda_praia", "artigos_de_natal"
-        ],
-        "Promedio Horas de Despacho": [
-            16.67, 13.16, 12.64, 12.21, 11.76
-        ]
-        })
-
-        fig2 = px.bar(
-        cat_df.sort_values("Promedio Horas de Despacho", ascending=False),
-        x="Promedio Horas de Despacho",
-        y="Categoría",
-        orientation="h",
-        color="Promedio Horas de Despacho",
-        color_continuous_scale="viridis"
-        )
-        fig2.update_layout(title="Categorías con Mayor Tiempo de Despacho en Pedidos Tardíos")
-        st.plotly_chart(fig2, use_container_width=True)
-
-    # TAB 3 - Vendedores con más retrasos
-    # Calcular el número de pedidos tardíos por vendedor
-    late_orders_by_seller = (
-        late_orders_with_products.groupby("seller_id").size().rename("late_orders").to_frame()
-    )
-
-    # Calcular el número total de pedidos por vendedor
-    total_orders_by_seller = (
-        df_orders_with_items_products.groupby("seller_id").size().rename("total_orders").to_frame()
-    )
-
-    # Combinar los datos de pedidos tardíos y totales
-    seller_analysis = late_orders_by_seller.join(total_orders_by_seller, how="inner")
-
-    # Calcular el porcentaje de pedidos tardíos por vendedor
-    seller_analysis["late_percentage"] = (seller_analysis["late_orders"] / seller_analysis["total_orders"]) * 100
-
-    # Ordenar por porcentaje de pedidos tardíos
-    seller_analysis = seller_analysis.sort_values(by="late_percentage", ascending=False)
-
-    # Mostrar los resultados
-    seller_analysis
-    with tabs[2]:
-        st.markdown("¿Existen vendedores con alta proporción de retrasos?")
-        top_sellers = seller_analysis.head(10).reset_index()
-
-        fig3 = px.bar(
-        top_sellers,
-        x="late_percentage",
-        y="seller_id",
-        orientation="h",
-        text="late_percentage",
-        labels={"late_percentage": "% Pedidos Tardíos", "seller_id": "Vendedor"},
-        color="late_percentage",
-        color_continuous_scale="Reds"
+        st.markdown("#### Causa más probable por ciudad")
+        st.caption(
+            "Para cada factor se estima cuántos pedidos tardíos explica: pedidos expuestos × "
+            "(% de retraso de los expuestos − % de los no expuestos)."
         )
-        fig3.update_layout(title="Top 10 Vendedores con Mayor % de Pedidos Tardíos")
-        st.plotly_chart(fig3, use_container_width=True)
-
-    # TAB 4 - Método de pago
-    with tabs[3]:
-        st.markdown("¿El método de pago influye en los retrasos? (Poca evidencia, pero se analiza)")
-        payment_df = pd.DataFrame({
-        "Método de Pago": ["boleto", "credit_card", "debit_card", "voucher"],
-        "% Pedidos Tardíos": [8.61, 7.72, 7.72, 6.44]
-        })
-        fig4 = px.bar(
-        payment_df.sort_values("% Pedidos Tardíos", ascending=False),
-        x="% Pedidos Tardíos",
-        y="Método de Pago",
-        orientation="h",
-        color="% Pedidos Tardíos",
-        color_continuous_scale="Blues"
-        )
-        fig4.update_layout(title="% Pedidos Tardíos por Método de Pago")
-        st.plotly_chart(fig4, use_container_width=True)
+        st.dataframe(diagnostico['causes_by_city'], height=400)
+
+        causes = diagnostico['causes']
+        st.subheader("Insight")
+        if len(causes) and causes.iloc[0] > 0:
+            st.info(f"""
+            En el rango seleccionado, la causa que más retrasos explica es **{causes.index[0]}** (unos {causes.iloc[0]:.0f} pedidos tardíos), seguida de {causes.index[1]} ({causes.iloc[1]:.0f}).  
+            En promedio, los pedidos entregados a tiempo fueron despachados {avg_dispatch_time_late - avg_dispatch_time_on_time:.1f} horas antes que los que se entregaron con retraso.
+            """)
+        else:
+            st.info("No hay suficientes pedidos tardíos en el rango seleccionado para atribuirles una causa.")
 
 
-    st.subheader("Insight")
-    st.info("""
-    El análisis revela que la principal causa de retrasos en las entregas está asociada a demoras en el despacho por parte de los vendedores.  
-    En promedio, los pedidos entregados a tiempo fueron despachados 2.2 horas antes que los que se entregaron con retraso.
-   """)
-        
-        
+seccion_logistica(start_date, end_date, pie_threshold)
+
 st.markdown("---")
 
 
 # ============================
 # 4.4 Reputación y Opinión
 # ============================
-with st.expander("4.4 Reputación y Opinión del Cliente (excluye pedidos con retraso)", expanded=True):
-    st.subheader("Objetivo")
-    st.markdown("Evaluar la percepción de los clientes filtrando factores negativos como la demora.")
-
-    st.subheader("KPIs")
-    kpi_col1, kpi_col2, kpi_col3 = st.columns(3)
-    kpi_col1.metric("Número de reviews", num_reviews)
-    kpi_col2.metric("Puntuación promedio", score_mean)
-
-    st.subheader("Visualizaciones")
-    # --- Gráfico 1: Número de reviews ---
-    st.caption("Número de reviews por estado")
-
-    fig1, ax1 = plt.subplots(figsize=(10, 6))
-    bars = ax1.bar(df_4['customer_state'], df_4['num_reviews'], color='cornflowerblue', edgecolor='black')
-    ax1.set_title('Número de reviews por estado', fontsize=14)
-    ax1.set_xlabel('Estado', fontsize=12)
-    ax1.set_ylabel('Número de reviews', fontsize=12)
-    ax1.tick_params(axis='x', rotation=45)
-    ax1.grid(axis='y', linestyle='--', alpha=0.5)
-    for bar in bars:
-        height = bar.get_height()
-        ax1.text(bar.get_x() + bar.get_width() / 2, height + 5, f'{height}', ha='center', va='bottom', fontsize=8)
-    st.pyplot(fig1)
-
-    # --- Gráfico 2: Score medio ---
-    st.caption("Score medio por estado")
-
-    fig2, ax2 = plt.subplots(figsize=(10, 6))
-    bars2 = ax2.bar(df_4['customer_state'], df_4['score_medio'], color='mediumseagreen', edgecolor='black')
-    ax2.set_title('Puntuación media de reviews por estado', fontsize=14)
-    ax2.set_xlabel('Estado', fontsize=12)
-    ax2.set_ylabel('Score medio', fontsize=12)
-    ax2.set_ylim(0, 5)
-    ax2.tick_params(axis='x', rotation=45)
-    ax2.grid(axis='y', linestyle='--', alpha=0.5)
-    for bar in bars2:
-        height = bar.get_height()
-        ax2.text(bar.get_x() + bar.get_width() / 2, height + 0.05, f'{height:.2f}', ha='center', va='bottom', fontsize=8)
-    st.pyplot(fig2)
-
-    # --- Tabla final ---
-    st.markdown("## Tabla de reviews y puntuación media por estado")
-    st.dataframe(df_4)
-    st.subheader("Insight")
-    st.info("Los estados con mejor logística tienden a tener mejores puntuaciones. Aislar el impacto del retraso permite evaluar de forma más precisa la satisfacción con el producto y servicio.")
+@seccion("4.4 Reputación")
+def seccion_reputacion(start_date, end_date):
+    with st.expander("4.4 Reputación y Opinión del Cliente (excluye pedidos con retraso)", expanded=True):
+        st.subheader("Objetivo")
+        st.markdown("Evaluar la percepción de los clientes filtrando factores negativos como la demora.")
+        if not mostrar_seccion('4_4'):
+            return
+
+        df_4 = reviews_por_estado(table_keys, start_date, end_date)
+        num_reviews, score_mean = reviews.review_kpis(df_4)
+
+        st.subheader("KPIs")
+        kpi_col1, kpi_col2, kpi_col3 = st.columns(3)
+        kpi_col1.metric("Número de reviews", num_reviews)
+        kpi_col2.metric("Puntuación promedio", score_mean)
+
+        st.subheader("Visualizaciones")
+        # --- Gráfico 1: Número de reviews ---
+        st.caption("Número de reviews por estado")
+
+        show_chart(
+            charts.labeled_bar_chart, df_4[['customer_state', 'num_reviews']], figsize=(10, 6),
+            x='customer_state', y='num_reviews', color='cornflowerblue',
+            title='Número de reviews por estado', xlabel='Estado', ylabel='Número de reviews'
+        )
 
+        # --- Gráfico 2: Score medio ---
+        st.caption("Score medio por estado")
+
+        show_chart(
+            charts.labeled_bar_chart, df_4[['customer_state', 'score_medio']], figsize=(10, 6),
+            x='customer_state', y='score_medio', color='mediumseagreen',
+            title='Puntuación media de reviews por estado', xlabel='Estado', ylabel='Score medio',
+            label_format='{:.2f}', label_offset=0.05, ylim=(0, 5)
+        )
+
+        # --- Tabla final ---
+        st.markdown("## Tabla de reviews y puntuación media por estado")
+        st.dataframe(df_4)
+        st.subheader("Insight")
+        st.info("Los estados con mejor logística tienden a tener mejores puntuaciones. Aislar el impacto del retraso permite evaluar de forma más precisa la satisfacción con el producto y servicio.")
+
+
+seccion_reputacion(start_date, end_date)
 
 st.markdown("---")
 
 # ============================
 # 4.5 Productos y Vendedores
 # ============================
-with st.expander("4.5 Productos y Vendedores", expanded=True):
-    st.subheader("Objetivo")
-    st.markdown("Identificar qué productos y vendedores tienen mayor impacto en las ventas y en la satisfacción del cliente.")
-    st.subheader("KPIs")
-    kpi_col1, kpi_col2, kpi_col3 = st.columns(3)
-    kpi_col1.metric("Mejor vendedor", best_seller.index[0])
-    kpi_col2.metric("Categoria mas vendida", top_category.index[0])
-    # -----------------------------
-    # Gráficos
-    # -----------------------------
-    col1, col2 = st.columns(2)
-
-    # 1. Vendedores mejor valorados
-    with col1:
-        st.subheader("Vendedores mejor valorados (Top 10)")
-        top_sellers_5 = df_5.groupby('seller_id')['review_score'].mean().sort_values(ascending=False).head(10)
-        top_sellers_5.index = top_sellers_5.index.str[:10] + "..."
-        fig1, ax1 = plt.subplots()
-        top_sellers_5.plot(kind='bar', ax=ax1, color='skyblue')
-        ax1.set_ylabel('Puntuación Promedio')
-        ax1.set_xlabel('')
-        ax1.set_title('')
-        st.pyplot(fig1)
-
-    # 2. Distribución de calificaciones (Donut)
-    with col2:
-        st.subheader("Distribución de Calificaciones")
-        review_counts_5 = df_5['review_score'].value_counts().sort_index()
-        colors_5 = sns.color_palette('pastel')[0:5]
-        labels_5 = [str(int(score)) for score in review_counts_5.index]
-
-        fig5, ax5 = plt.subplots()
-        wedges, texts, autotexts = ax5.pie(
-            review_counts_5,
-            labels=labels_5,
-            autopct='%1.1f%%',
-            startangle=90,
-            colors =colors_5,
-            wedgeprops=dict(width=0.4),
-            textprops=dict(color="black", fontsize=12)
-        )
-
-        for autotext in autotexts:
-            autotext.set_fontsize(11)
-            autotext.set_weight("bold")
-
-        ax5.set_title('', fontsize=14)
-        st.pyplot(fig5)
-
-    col3, col4, col5 = st.columns(3)
-
-    # 3. Categorías de productos más compradas
-    with col3:
-        st.subheader("Categoría más compradas (Top 10)")
-        top_categories_5 = df_5['product_category_name'].value_counts().head(10)
-        top_categories_5.index = top_categories_5.index.str[:15] + "..."
-        fig2, ax2 = plt.subplots()
-        top_categories_5.plot(kind='bar', ax=ax2, color='lightgreen')
-        ax2.set_ylabel('Cantidad')
-        ax2.set_xlabel('')
-        ax2.set_title('')
-        st.pyplot(fig2)
-
-    # 4. Ingresos por vendedor
-    with col4:
-        st.subheader("Ingresos por vendedor (Top 10)")
-        seller_revenue_5 = df_5.groupby('seller_id')['Total prize'].sum().sort_values(ascending=False).head(10)
-        seller_revenue_5.index = seller_revenue_5.index.str[:10] + "..."
-        fig3, ax3 = plt.subplots()
-        seller_revenue_5.plot(kind='bar', ax=ax3, color='gold')
-        ax3.set_ylabel('Ingresos')
-        ax3.set_xlabel('')
-        ax3.set_title('')
-        st.pyplot(fig3)
-
-    # 5. Costo medio de envío por categoría
-    with col5:
-        st.subheader("Coste medio de envío por categoría (Top 10)")
-        shipping_cost_5 = df_5.groupby('product_category_name')['freight_value'].mean().sort_values(ascending=False).head(10)
-        shipping_cost_5.index = shipping_cost_5.index.str[:15] + "..."
-        fig4, ax4 = plt.subplots()
-        shipping_cost_5.plot(kind='bar', ax=ax4, color='salmon')
-        ax4.set_ylabel('Costo Promedio')
-        ax4.set_xlabel('')
-        ax4.set_title('')
-        st.pyplot(fig4)
-
-    st.subheader("Insight")
-    st.info("Las categorías de 'bed_bath_table', 'health_beauty' y 'sports_leisure' concentran gran parte del volumen.")
-
-   
-
+@seccion("4.5 Productos y vendedores")
+def seccion_productos_vendedores(filtros):
+    with st.expander("4.5 Productos y Vendedores", expanded=True):
+        st.subheader("Objetivo")
+        st.markdown("Identificar qué productos y vendedores tienen mayor impacto en las ventas y en la satisfacción del cliente.")
+        if not mostrar_seccion('4_5'):
+            return
+        resumen = productos_vendedores(table_keys, filtros)
+
+        st.subheader("KPIs")
+        kpi_col1, kpi_col2, kpi_col3 = st.columns(3)
+        kpi_col1.metric("Mejor vendedor", resumen['best_seller'].index[0])
+        kpi_col2.metric("Categoria mas vendida", resumen['top_category'].index[0])
+        # -----------------------------
+        # Gráficos
+        # -----------------------------
+        col1, col2 = st.columns(2)
+
+        # 1. Vendedores mejor valorados
+        with col1:
+            st.subheader("Vendedores mejor valorados (Top 10)")
+            top_sellers_5 = resumen['top_sellers'].copy()
+            top_sellers_5.index = top_sellers_5.index.str[:10] + "..."
+            show_chart(charts.series_bar_chart, top_sellers_5, color='skyblue', ylabel='Puntuación Promedio')
+
+        # 2. Distribución de calificaciones (Donut)
+        with col2:
+            st.subheader("Distribución de Calificaciones")
+            review_counts_5 = resumen['review_counts']
+            show_chart(charts.donut_chart, review_counts_5)
+
+        col3, col4, col5 = st.columns(3)
+
+        # 3. Categorías de productos más compradas
+        with col3:
+            st.subheader("Categoría más compradas (Top 10)")
+            top_categories_5 = resumen['top_categories'].copy()
+            top_categories_5.index = top_categories_5.index.str[:15] + "..."
+            show_chart(charts.series_bar_chart, top_categories_5, color='lightgreen', ylabel='Cantidad')
+
+        # 4. Ingresos por vendedor
+        with col4:
+            st.subheader("Ingresos por vendedor (Top 10)")
+            seller_revenue_5 = resumen['seller_revenue'].copy()
+            seller_revenue_5.index = seller_revenue_5.index.str[:10] + "..."
+            show_chart(charts.series_bar_chart, seller_revenue_5, color='gold', ylabel='Ingresos')
+
+        # 5. Costo medio de envío por categoría
+        with col5:
+            st.subheader("Coste medio de envío por categoría (Top 10)")
+            shipping_cost_5 = resumen['shipping_cost'].copy()
+            shipping_cost_5.index = shipping_cost_5.index.str[:15] + "..."
+            show_chart(charts.series_bar_chart, shipping_cost_5, color='salmon', ylabel='Costo Promedio')
+
+        st.subheader("Insight")
+        st.info("Las categorías de 'bed_bath_table', 'health_beauty' y 'sports_leisure' concentran gran parte del volumen.")
+
+
+seccion_productos_vendedores(filtros_productos)
+
+# ==== PERFIL ====
+if profiler is not None:
+    profiling.finish(profiler)
+    with st.sidebar.expander("Perfil de la ejecución", expanded=True):
+        mostrar_perfil(profiler, st)
+        st.caption(f"Añadido a `{profiling.log_path()}`")
+        if not calentamiento.done:
+            st.caption(f"Calentamiento de cachés en curso ({len(calentamiento.timings)}/{len(calentamiento.steps)} pasos)")
+        else:
+            st.caption(f"Calentamiento de cachés: {calentamiento.seconds:.1f} s")
+            st.dataframe(calentamiento.frame(), hide_index=True, use_container_width=True)
@@ -0,0 +1 @@
+"""Lógica de datos y métricas del informe Olist, independiente de Streamlit."""
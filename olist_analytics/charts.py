@@ -0,0 +1,184 @@
+"""Renderizado de gráficos Matplotlib a PNG con caché LRU acotada en memoria.
+
+Cada gráfico se identifica por la función que lo dibuja, un hash de sus
+datos y sus opciones. Si la combinación ya se dibujó, se devuelven los bytes
+del PNG sin tocar Matplotlib. Las figuras se crean con
+``matplotlib.figure.Figure`` (fuera del registro de ``pyplot``) y se limpian
+siempre tras exportarlas, así que no se acumulan en un servidor de larga
+duración.
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import seaborn as sns
+from matplotlib.figure import Figure
+
+DEFAULT_FIGSIZE = (6.4, 4.8)
+DPI = 200
+# Presupuesto de memoria de la caché de imágenes (bytes de PNG)
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+class PNGCache:
+    """LRU de bytes de PNG limitada por tamaño total, segura entre hilos."""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            png = self._entries.get(key)
+            if png is not None:
+                self._entries.move_to_end(key)
+            return png
+
+    def put(self, key, png):
+        if len(png) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._entries[key] = png
+            self.size += len(png)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+png_cache = PNGCache()
+
+
+def _data_digest(data):
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        digest = hashlib.sha1(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+        names = list(data.columns) if isinstance(data, pd.DataFrame) else [data.name]
+        digest.update(repr(names).encode())
+        return digest.hexdigest()
+    return hashlib.sha1(repr(data).encode()).hexdigest()
+
+
+def chart_key(draw, data, options):
+    text = repr((draw.__module__, draw.__qualname__, _data_digest(data), sorted(options.items())))
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def render_png(draw, data, figsize=DEFAULT_FIGSIZE, **options):
+    """Devuelve el PNG del gráfico ``draw(ax, data, **options)``, cacheado."""
+    key = chart_key(draw, data, {**options, 'figsize': figsize})
+    png = png_cache.get(key)
+    if png is not None:
+        return png
+
+    fig = Figure(figsize=figsize)
+    try:
+        draw(fig.subplots(), data, **options)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=DPI, bbox_inches='tight')
+        png = buffer.getvalue()
+    finally:
+        fig.clear()
+    png_cache.put(key, png)
+    return png
+
+
+# ---- Funciones de dibujo ----
+
+def bar_chart(ax, data, x, y, color, title='', xlabel='', ylabel='', rotation=45):
+    ax.bar(data[x], data[y], color=color)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.tick_params(axis='x', rotation=rotation)
+
+
+def series_bar_chart(ax, data, color, ylabel=''):
+    data.plot(kind='bar', ax=ax, color=color)
+    ax.set_ylabel(ylabel)
+    ax.set_xlabel('')
+    ax.set_title('')
+
+
+def labeled_bar_chart(ax, data, x, y, color, title, xlabel, ylabel, label_format='{}',
+                      label_offset=5, ylim=None):
+    bars = ax.bar(data[x], data[y], color=color, edgecolor='black')
+    ax.set_title(title, fontsize=14)
+    ax.set_xlabel(xlabel, fontsize=12)
+    ax.set_ylabel(ylabel, fontsize=12)
+    if ylim is not None:
+        ax.set_ylim(*ylim)
+    ax.tick_params(axis='x', rotation=45)
+    ax.grid(axis='y', linestyle='--', alpha=0.5)
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width() / 2, height + label_offset, label_format.format(height),
+                ha='center', va='bottom', fontsize=8)
+
+
+def line_chart(ax, data, x, y, color, title='', xlabel='', ylabel=''):
+    ax.plot(data[x].astype(str), data[y], marker='o', color=color)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.tick_params(axis='x', rotation=45)
+
+
+def frame_line_chart(ax, data):
+    data.plot(ax=ax, marker='o', legend=False)
+
+
+def late_vs_total_chart(ax, data):
+    """Barras de pedidos tardíos vs a tiempo por ciudad con el % tardío al lado."""
+    melted = data.melt(
+        id_vars='customer_city',
+        value_vars=['late_orders', 'on_time_orders'],
+        var_name='Tipo de Pedido',
+        value_name='Cantidad'
+    )
+    sns.barplot(
+        data=melted,
+        x='Cantidad',
+        y='customer_city',
+        hue='Tipo de Pedido',
+        palette={'late_orders': 'red', 'on_time_orders': 'green'},
+        ax=ax
+    )
+    ax.set_title('Comparación de Pedidos Tardíos vs Totales por Ciudad', fontsize=14)
+    ax.set_xlabel('Cantidad de Pedidos', fontsize=12)
+    ax.set_ylabel('Ciudad', fontsize=12)
+    handles, _ = ax.get_legend_handles_labels()
+    ax.legend(handles, ['Pedidos Tardíos', 'Pedidos a Tiempo'], title='Tipo de Pedido', fontsize=10)
+    for i, row in data.iterrows():
+        ax.text(row['total_orders'] + 5, i, f"{row['late_percentage']:.1f}%", va='center', fontsize=10, color='red')
+
+
+def donut_chart(ax, data):
+    colors = sns.color_palette('pastel')[0:5]
+    labels = [str(int(score)) for score in data.index]
+    _, _, autotexts = ax.pie(
+        data,
+        labels=labels,
+        autopct='%1.1f%%',
+        startangle=90,
+        colors=colors,
+        wedgeprops=dict(width=0.4),
+        textprops=dict(color='black', fontsize=12)
+    )
+    for autotext in autotexts:
+        autotext.set_fontsize(11)
+        autotext.set_weight('bold')
+    ax.set_title('', fontsize=14)
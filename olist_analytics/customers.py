@@ -0,0 +1,102 @@
+"""Clientes por estado y ciudad, primera compra de cada cliente y altas por estado."""
+import pandas as pd
+
+from olist_analytics.time_index import time_bounds, time_slice
+
+FIRST_PURCHASE_COLUMNS = ['customer_unique_id', 'customer_state', 'order_purchase_timestamp']
+
+
+def build_first_purchases(order_facts):
+    """Primera compra por cliente y por (cliente, estado).
+
+    ``order_facts`` está ordenado por fecha de compra, así que la primera
+    aparición de cada clave es su compra más antigua y ambos resultados
+    siguen ordenados por fecha. Devuelve ``(first_purchases,
+    first_purchases_by_state)``.
+    """
+    by_state = (
+        order_facts[FIRST_PURCHASE_COLUMNS]
+        .drop_duplicates(['customer_unique_id', 'customer_state'])
+        .reset_index(drop=True)
+    )
+    overall = by_state.drop_duplicates('customer_unique_id').reset_index(drop=True)
+    return overall, by_state
+
+
+def build_daily_new_customers(first_purchases_by_state):
+    """Clientes nuevos por día para cada estado: ``{estado: DataFrame}``.
+
+    Cada DataFrame tiene las columnas ``day`` y ``nuevos_clientes`` y está
+    ordenado por ``day``.
+    """
+    day = first_purchases_by_state['order_purchase_timestamp'].dt.normalize().rename('day')
+    daily = first_purchases_by_state.groupby(['customer_state', day], sort=True, observed=True).size()
+    return {
+        state: frame.droplevel('customer_state').reset_index(name='nuevos_clientes')
+        for state, frame in daily.groupby(level='customer_state', observed=True)
+    }
+
+
+def count_new_customers(first_purchases, start, end):
+    """Número de clientes cuya primera compra cae en ``[start, end]``."""
+    lo, hi = time_bounds(first_purchases, 'order_purchase_timestamp', start, end)
+    return hi - lo
+
+
+def new_customers_per_month(daily_new_customers, state, start, end):
+    """Serie mensual (``year_month``) de clientes nuevos del estado en el rango."""
+    daily = daily_new_customers.get(state)
+    if daily is None:
+        return pd.Series(dtype='int64', name='nuevos_clientes', index=pd.PeriodIndex([], freq='M', name='year_month'))
+    window = time_slice(daily, 'day', start, end)
+    return window.groupby(window['day'].dt.to_period('M').rename('year_month'))['nuevos_clientes'].sum()
+
+
+def customers_by_state(orders):
+    """Clientes distintos por estado, de mayor a menor."""
+    return (
+        orders.groupby('customer_state', observed=True)['customer_unique_id']
+        .nunique()
+        .sort_values(ascending=False)
+    )
+
+
+def customers_by_city(orders, state):
+    """Clientes distintos por ciudad del estado ``state`` (``customer_city``, ``num_clientes``)."""
+    return (
+        orders[orders['customer_state'] == state]
+        .groupby('customer_city', observed=True)['customer_unique_id']
+        .nunique()
+        .reset_index(name='num_clientes')
+        .sort_values(by='num_clientes', ascending=False)
+    )
+
+
+def city_summary(orders, cube_summary):
+    """Métricas por ciudad de la sección 4.2.
+
+    ``cube_summary`` es ``cube.summarize_cube`` sobre el mismo rango que
+    ``orders``: de él salen pedidos y días de entrega; de ``orders`` solo los
+    clientes distintos. Columnas: ``customer_state``, ``customer_city``,
+    ``num_clientes``, ``num_pedidos``, ``porcentaje_pedidos``,
+    ``ratio_pedidos_cliente`` y ``entrega_prom_dias``.
+    """
+    clientes_por_ciudad = (
+        orders.groupby(['customer_state', 'customer_city'], observed=True)['customer_unique_id']
+        .nunique()
+        .reset_index(name='num_clientes')
+    )
+    summary = pd.merge(
+        clientes_por_ciudad,
+        cube_summary[['customer_state', 'customer_city', 'num_pedidos', 'entrega_prom_dias']],
+        on=['customer_state', 'customer_city'],
+        how='left'
+    )
+
+    total_pedidos = summary['num_pedidos'].sum()
+    summary['porcentaje_pedidos'] = (summary['num_pedidos'] / total_pedidos * 100).round(2)
+    summary['ratio_pedidos_cliente'] = (summary['num_pedidos'] / summary['num_clientes']).round(2)
+    return summary[[
+        'customer_state', 'customer_city', 'num_clientes', 'num_pedidos',
+        'porcentaje_pedidos', 'ratio_pedidos_cliente', 'entrega_prom_dias',
+    ]]
@@ -0,0 +1,112 @@
+"""Métricas de entrega por pedido y agregados de retrasos por ventana de fechas.
+
+Las métricas por pedido se calculan una vez al construir la tabla de hechos
+(``add_delivery_metrics``). Los agregados reciben cualquier subconjunto de esa
+tabla, normalmente el corte del rango de fechas de la barra lateral.
+"""
+import pandas as pd
+
+from olist_analytics import sellers as seller_metrics
+
+
+def add_delivery_metrics(orders):
+    """Añade a una tabla de pedidos las métricas de entrega.
+
+    - ``is_late``: entregado después de la fecha estimada.
+    - ``late_days``: días entre la fecha estimada y la entrega (negativo si
+      llegó antes; NaN si no se ha entregado).
+    - ``dispatch_time``: horas entre la compra y la aprobación del pedido.
+    - ``handoff_time``: horas entre la aprobación y la entrega al transportista.
+    - ``delivery_days``: días entre la compra y la entrega al cliente.
+    """
+    purchase = orders['order_purchase_timestamp']
+    approved = orders['order_approved_at']
+    delivered = orders['order_delivered_customer_date']
+    estimated = orders['order_estimated_delivery_date']
+
+    return orders.assign(
+        is_late=delivered > estimated,
+        late_days=(delivered - estimated).dt.days,
+        dispatch_time=(approved - purchase).dt.total_seconds() / 3600,
+        handoff_time=(orders['order_delivered_carrier_date'] - approved).dt.total_seconds() / 3600,
+        delivery_days=(delivered - purchase).dt.days,
+    )
+
+
+def late_orders_by(orders, key):
+    """Pedidos tardíos por ``key`` en una sola agrupación.
+
+    Columnas: ``late_orders``, ``avg_late_days`` (solo pedidos tardíos),
+    ``total_orders`` y ``late_percentage``. Solo incluye grupos con algún
+    pedido tardío.
+    """
+    summary = (
+        orders
+        .assign(late_days_late=orders['late_days'].where(orders['is_late']))
+        .groupby(key, observed=True)
+        .agg(
+            late_orders=('is_late', 'sum'),
+            avg_late_days=('late_days_late', 'mean'),
+            total_orders=('order_id', 'size'),
+        )
+    )
+    summary = summary[summary['late_orders'] > 0].copy()
+    summary['late_percentage'] = (summary['late_orders'] / summary['total_orders']) * 100
+    return summary
+
+
+def late_orders_by_month(orders):
+    """Pedidos tardíos por mes de compra, indexados por el inicio de cada mes."""
+    late = orders[orders['is_late']]
+    by_month = (
+        late.groupby(late['order_purchase_timestamp'].dt.to_period('M'))
+        .size()
+        .rename('late_orders')
+        .to_frame()
+    )
+    by_month.index = by_month.index.to_timestamp()
+    return by_month
+
+
+def late_share_by_state(orders):
+    """Pedidos tardíos por estado y su porcentaje sobre el total de tardíos."""
+    by_state = orders[orders['is_late']].groupby('customer_state', observed=True).size().rename('late_orders').to_frame()
+    by_state['late_percentage'] = (by_state['late_orders'] / by_state['late_orders'].sum()) * 100
+    return by_state
+
+
+def dispatch_time_by_lateness(orders):
+    """Horas medias de despacho de los pedidos entregados a tiempo y con retraso."""
+    delivered = orders[orders['order_delivered_customer_date'].notna()]
+    means = delivered.groupby('is_late')['dispatch_time'].mean()
+    return pd.Series({
+        'A Tiempo': means.get(False, float('nan')),
+        'Tardío': means.get(True, float('nan')),
+    }, name='dispatch_time')
+
+
+def late_kpis(late_orders):
+    """``(avg_late_days, avg_late_percent)``: medias por grupo de ``late_orders_by``."""
+    return late_orders['avg_late_days'].mean(), late_orders['late_percentage'].mean()
+
+
+def late_percentage_by_category(order_items):
+    """% de ítems tardíos por ``product_category_name``, de mayor a menor."""
+    late = order_items[order_items['is_late']]
+    percentage = (
+        late.groupby('product_category_name', observed=True).size()
+        / order_items.groupby('product_category_name', observed=True).size()
+    ) * 100
+    return percentage.sort_values(ascending=False)
+
+
+def late_orders_by_seller(order_items):
+    """Ítems tardíos y totales por vendedor con ``late_percentage``.
+
+    Solo vendedores con algún ítem tardío, de mayor a menor porcentaje.
+    """
+    summary = seller_metrics.seller_summary(order_items)
+    sellers = pd.DataFrame({'late_orders': summary['late_rows'], 'total_orders': summary['rows']})
+    sellers = sellers[sellers['late_orders'] > 0]
+    sellers['late_percentage'] = summary['late_share'] * 100
+    return sellers.sort_values(by='late_percentage', ascending=False)
@@ -0,0 +1,203 @@
+"""Diagnóstico de las causas de los retrasos (sección 4.3, "Análisis de Causas Potenciales").
+
+``build_order_drivers`` junta una vez por proceso, en una fila por pedido,
+todo lo que puede explicar un retraso: tiempo de cada etapa de la entrega,
+plazo estimado, vendedor y categoría del primer ítem y método de pago
+principal. Está ordenada como ``order_facts``, así que cada rango de fechas
+es un ``time_slice``.
+
+``diagnose`` marca en cada pedido del rango los factores de riesgo (etapas
+más lentas que el percentil 75 de los pedidos a tiempo, plazo estimado más
+corto que su percentil 25, y vendedores, categorías o métodos de pago cuyo
+porcentaje de retrasos supera en ``RISK_RATIO`` veces al del rango) y, con
+una sola agrupación por ciudad, estima cuántos pedidos tardíos explica cada
+factor: ``expuestos × (tasa de retraso expuestos − tasa no expuestos)``. La
+causa más probable de cada ciudad es el factor que más retrasos explica.
+"""
+import numpy as np
+import pandas as pd
+
+from olist_analytics.facts import dimension_keys, take_positions
+
+FACTORS = {
+    'dispatch': 'Despacho lento (compra → aprobación)',
+    'handoff': 'Entrega lenta al transportista',
+    'transit': 'Transporte lento',
+    'tight_estimate': 'Plazo estimado corto',
+    'seller': 'Vendedor con muchos retrasos',
+    'category': 'Categoría con muchos retrasos',
+    'payment': 'Método de pago con más retrasos',
+}
+SLOW_QUANTILE = 0.75
+RISK_RATIO = 1.5
+MIN_GROUP_ORDERS = 20
+
+DRIVER_COLUMNS = [
+    'order_id',
+    'order_purchase_timestamp',
+    'customer_state',
+    'customer_city',
+    'is_late',
+    'dispatch_time',
+    'handoff_time',
+]
+
+
+def _primary_payments(payments):
+    """Pago de mayor importe de cada pedido."""
+    return (
+        payments.sort_values(['order_id', 'payment_value'], ascending=[True, False], kind='stable')
+        .drop_duplicates('order_id')
+    )
+
+
+def build_order_drivers(order_facts, item_facts, payments=None):
+    """Una fila por pedido entregado de ``order_facts`` con los atributos del diagnóstico.
+
+    Añade ``transit_days`` (transportista → cliente), ``estimated_days``
+    (compra → fecha estimada), ``seller_id`` y ``product_category_name`` del
+    primer ítem (ver ``facts.build_item_facts``) y ``payment_type`` del pago
+    principal (NaN sin tabla de pagos). Mantiene el orden por fecha de compra.
+    """
+    delivered = order_facts[order_facts['order_delivered_customer_date'].notna()]
+    drivers = delivered[DRIVER_COLUMNS].reset_index(drop=True)
+    purchase = delivered['order_purchase_timestamp']
+    drivers['transit_days'] = (
+        (delivered['order_delivered_customer_date'] - delivered['order_delivered_carrier_date'])
+        .dt.total_seconds().to_numpy() / 86400
+    )
+    drivers['estimated_days'] = (
+        (delivered['order_estimated_delivery_date'] - purchase).dt.total_seconds().to_numpy() / 86400
+    )
+
+    keys = dimension_keys(delivered['order_id'], item_facts['orders'])
+    offsets = item_facts['item_offsets']
+    has_items = (keys >= 0) & (np.diff(offsets)[np.maximum(keys, 0)] > 0)
+    first_items = np.where(has_items, offsets[np.maximum(keys, 0)], -1)
+    items = item_facts['items']
+    product_keys = np.append(items['product_key'].to_numpy(), -1)[first_items]
+    drivers['seller_id'] = take_positions(items['seller_id'], first_items)
+    drivers['product_category_name'] = take_positions(item_facts['products']['product_category_name'], product_keys)
+
+    if payments is None:
+        drivers['payment_type'] = np.nan
+    else:
+        primary = _primary_payments(payments)
+        positions = dimension_keys(delivered['order_id'], pd.Index(primary['order_id']))
+        drivers['payment_type'] = take_positions(primary['payment_type'], positions)
+    return drivers
+
+
+def _risky(keys, is_late, overall_rate):
+    """True en las filas cuyo grupo de ``keys`` tiene ``RISK_RATIO`` veces más retrasos que el rango."""
+    groups = pd.DataFrame({'key': keys, 'late': is_late}).groupby('key', observed=True)['late'].agg(['mean', 'size'])
+    risky = groups.index[(groups['size'] >= MIN_GROUP_ORDERS) & (groups['mean'] >= RISK_RATIO * overall_rate)]
+    return keys.isin(risky).to_numpy()
+
+
+def exposures(drivers):
+    """Factores de riesgo por pedido de ``drivers``: un DataFrame booleano con columnas ``FACTORS``."""
+    is_late = drivers['is_late'].to_numpy(dtype=bool)
+    on_time = drivers[~is_late]
+    slow = on_time[['dispatch_time', 'handoff_time', 'transit_days']].quantile(SLOW_QUANTILE)
+    short = on_time['estimated_days'].quantile(1 - SLOW_QUANTILE)
+    overall_rate = is_late.mean() if len(drivers) else 0.0
+    return pd.DataFrame({
+        'dispatch': (drivers['dispatch_time'] > slow['dispatch_time']).to_numpy(),
+        'handoff': (drivers['handoff_time'] > slow['handoff_time']).to_numpy(),
+        'transit': (drivers['transit_days'] > slow['transit_days']).to_numpy(),
+        'tight_estimate': (drivers['estimated_days'] < short).to_numpy(),
+        'seller': _risky(drivers['seller_id'], is_late, overall_rate),
+        'category': _risky(drivers['product_category_name'], is_late, overall_rate),
+        'payment': _risky(drivers['payment_type'], is_late, overall_rate),
+    })
+
+
+def _counts(drivers, flags):
+    late = drivers['is_late'].to_numpy(dtype=bool)
+    counts = {'total': np.ones(len(drivers), dtype=np.int64), 'late': late.astype(np.int64)}
+    for factor in FACTORS:
+        exposed = flags[factor].to_numpy()
+        counts[factor] = exposed.astype(np.int64)
+        counts[f"{factor}_late"] = (exposed & late).astype(np.int64)
+    return pd.DataFrame(counts)
+
+
+def explained_late_orders(counts):
+    """Pedidos tardíos explicados por factor a partir de los conteos de ``diagnose``.
+
+    ``expuestos × (tasa expuestos − tasa no expuestos)``, nunca negativo.
+    Si todos los pedidos de un grupo están expuestos, la tasa de referencia
+    es la de los no expuestos de todo el rango.
+    """
+    total, late = counts['total'].to_numpy()[:, None], counts['late'].to_numpy()[:, None]
+    exposed = counts[list(FACTORS)].to_numpy(dtype=float)
+    exposed_late = counts[[f"{f}_late" for f in FACTORS]].to_numpy(dtype=float)
+    unexposed, unexposed_late = total - exposed, late - exposed_late
+    reference = np.divide(
+        unexposed_late.sum(axis=0), unexposed.sum(axis=0),
+        out=np.zeros(len(FACTORS)), where=unexposed.sum(axis=0) > 0,
+    )
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rate_exposed = np.where(exposed > 0, exposed_late / exposed, 0.0)
+        rate_unexposed = np.where(unexposed > 0, unexposed_late / unexposed, reference)
+    explained = np.clip(exposed * (rate_exposed - rate_unexposed), 0, None)
+    return pd.DataFrame(explained, index=counts.index, columns=list(FACTORS.values()))
+
+
+def causes_by_city(drivers, flags, min_late=5):
+    """Causa más probable de los retrasos de cada ciudad con al menos ``min_late`` pedidos tardíos.
+
+    Columnas: ``late_orders``, ``total_orders``, ``causa_principal``,
+    ``retrasos_explicados`` y ``segunda_causa``; de más a menos tardíos.
+    """
+    counts = _counts(drivers, flags).groupby(drivers['customer_city'].array, observed=True).sum()
+    counts = counts[counts['late'] >= min_late].rename_axis('customer_city')
+    explained = explained_late_orders(counts)
+    ranking = np.argsort(-explained.to_numpy(), axis=1, kind='stable')
+    labels = np.array(list(FACTORS.values()))
+    result = pd.DataFrame({
+        'late_orders': counts['late'],
+        'total_orders': counts['total'],
+        'causa_principal': labels[ranking[:, 0]],
+        'retrasos_explicados': np.take_along_axis(explained.to_numpy(), ranking[:, :1], axis=1)[:, 0].round(1),
+        'segunda_causa': labels[ranking[:, 1]],
+    }, index=counts.index)
+    result.loc[result['retrasos_explicados'] <= 0, ['causa_principal', 'segunda_causa']] = 'Sin causa dominante'
+    return result.sort_values(['late_orders', 'total_orders'], ascending=False)
+
+
+def late_percentage_by(drivers, key):
+    """% de pedidos tardíos por ``key``, de mayor a menor."""
+    return (
+        drivers.groupby(key, observed=True)['is_late'].mean().mul(100)
+        .rename('late_percentage').sort_values(ascending=False)
+    )
+
+
+def diagnose(drivers, min_late=5, n=5):
+    """Comparaciones de la sección 4.3 para los pedidos de ``drivers`` (un rango de fechas).
+
+    - ``causes``: pedidos tardíos explicados por cada factor en todo el rango.
+    - ``causes_by_city``: ver ``causes_by_city``.
+    - ``stage_means``: media de cada etapa (horas o días) de los pedidos a
+      tiempo y con retraso.
+    - ``category_dispatch``: las ``n`` categorías con mayor tiempo medio de
+      despacho en pedidos tardíos.
+    - ``late_by_payment``: % de pedidos tardíos por método de pago.
+    """
+    flags = exposures(drivers)
+    totals = _counts(drivers, flags).sum().to_frame().T
+    late = drivers[drivers['is_late']]
+    stages = ['dispatch_time', 'handoff_time', 'transit_days', 'estimated_days']
+    stage_means = drivers.groupby('is_late')[stages].mean().rename(index={False: 'A Tiempo', True: 'Tardío'})
+    return {
+        'causes': explained_late_orders(totals).iloc[0].sort_values(ascending=False).rename('retrasos_explicados'),
+        'causes_by_city': causes_by_city(drivers, flags, min_late),
+        'stage_means': stage_means,
+        'category_dispatch': (
+            late.groupby('product_category_name', observed=True)['dispatch_time'].mean()
+            .sort_values(ascending=False).head(n)
+        ),
+        'late_by_payment': late_percentage_by(drivers, 'payment_type'),
+    }
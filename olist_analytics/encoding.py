@@ -0,0 +1,78 @@
+"""Representación compacta en memoria: IDs y dimensiones como categóricas compartidas.
+
+Los IDs de Olist (hashes hexadecimales de 32 caracteres) y las dimensiones de
+baja cardinalidad se guardan como ``pd.Categorical`` con un mismo diccionario
+por columna en todas las tablas. Cada valor ocupa un código entero (int16 o
+int32) en lugar de un objeto Python, y como los dtypes coinciden entre
+tablas, merges, ``groupby`` y ``nunique`` trabajan sobre esos códigos.
+
+Los agregados que agrupan por estas columnas deben usar ``observed=True``.
+Antes de mostrar un resultado se pasa por ``decode``.
+"""
+import pandas as pd
+
+ID_COLUMNS = (
+    'order_id',
+    'customer_id',
+    'customer_unique_id',
+    'product_id',
+    'seller_id',
+    'review_id',
+)
+DIMENSION_COLUMNS = (
+    'order_status',
+    'customer_city',
+    'customer_state',
+    'seller_city',
+    'seller_state',
+    'product_category_name',
+    'product_category_name_english',
+)
+ENCODED_COLUMNS = ID_COLUMNS + DIMENSION_COLUMNS
+
+
+def shared_dtypes(tables):
+    """Un ``CategoricalDtype`` por columna con la unión ordenada de sus valores en ``tables``."""
+    values = {}
+    for df in tables.values():
+        for column in ENCODED_COLUMNS:
+            if column in df.columns:
+                values.setdefault(column, []).append(pd.Index(df[column].dropna().unique(), dtype=object))
+    return {
+        column: pd.CategoricalDtype(indexes[0].append(indexes[1:]).unique().sort_values())
+        for column, indexes in values.items()
+    }
+
+
+def encode_tables(tables):
+    """Copia de ``{nombre: DataFrame}`` con las columnas de ``ENCODED_COLUMNS`` codificadas."""
+    dtypes = shared_dtypes(tables)
+    return {
+        name: df.astype({column: dtypes[column] for column in df.columns if column in dtypes})
+        for name, df in tables.items()
+    }
+
+
+def decode(data):
+    """``data`` con sus columnas e índice categóricos convertidos a valores normales.
+
+    Los resultados agregados son pequeños; decodificarlos evita arrastrar el
+    diccionario completo a cachés, tablas y gráficos.
+    """
+    if isinstance(data, pd.DataFrame):
+        categorical = [c for c, dtype in data.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+        if categorical:
+            data = data.astype({c: data[c].cat.categories.dtype for c in categorical})
+    elif isinstance(data, pd.Series):
+        if isinstance(data.dtype, pd.CategoricalDtype):
+            data = data.astype(data.cat.categories.dtype)
+    else:
+        return data
+    if isinstance(data.index, pd.CategoricalIndex):
+        data = data.set_axis(data.index.astype(data.index.categories.dtype))
+    elif isinstance(data.index, pd.MultiIndex):
+        data = data.set_axis(data.index.set_levels([
+            level.astype(level.categories.dtype) if isinstance(level, pd.CategoricalIndex) else level
+            for level in data.index.levels
+        ]))
+    return data
@@ -0,0 +1,213 @@
+"""Tablas de hechos materializadas a partir de las tablas base de Olist.
+
+``build_item_facts`` es el esquema en estrella de los ítems: una tabla de
+hechos por ítem con claves enteras (posiciones) a las dimensiones de pedido,
+producto/categoría y vendedor, y el mapa pedido → reseñas ya calculado. Las
+secciones 4.3 (``order_items``) y 4.5 (``expand_review_items``) se leen de
+esa estructura sin volver a unir las tablas base.
+"""
+import numpy as np
+import pandas as pd
+
+from olist_analytics.delivery import add_delivery_metrics
+from olist_analytics.time_index import sort_by_time
+
+ITEM_COLUMNS = ['order_item_id', 'product_id', 'seller_id', 'price', 'freight_value']
+
+
+def build_order_facts(orders, customers):
+    """Une pedidos y clientes una sola vez y añade las columnas derivadas.
+
+    Una fila por pedido con los datos del cliente, ``year`` y las métricas de
+    entrega de ``delivery.add_delivery_metrics``, ordenada por
+    ``order_purchase_timestamp`` (ver ``time_index.time_slice``).
+    """
+    facts = pd.merge(orders, customers, on='customer_id')
+    facts['year'] = facts['order_purchase_timestamp'].dt.year.astype('int16')
+    facts = add_delivery_metrics(facts)
+    return sort_by_time(facts, 'order_purchase_timestamp')
+
+
+def dimension_keys(values, dimension):
+    """Posición de cada valor de ``values`` en el Index ``dimension`` (-1 si no está).
+
+    Con una columna categórica cada categoría se busca una sola vez y las
+    filas se resuelven con sus códigos.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        positions = np.append(dimension.get_indexer(values.cat.categories), -1)
+        return positions[values.cat.codes.to_numpy()]
+    return dimension.get_indexer(values)
+
+
+def _offsets(sorted_keys, n):
+    """Inicio de cada clave ``0..n-1`` en ``sorted_keys`` (más el final): rango ``offsets[k]:offsets[k+1]``."""
+    return np.concatenate([[0], np.cumsum(np.bincount(sorted_keys, minlength=n))])
+
+
+def _ranges(starts, counts):
+    """Concatena los rangos ``starts[i]:starts[i]+counts[i]``; devuelve ``(i, posición)`` por fila."""
+    owners = np.repeat(np.arange(len(counts)), counts)
+    within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owners, starts[owners] + within
+
+
+def _first_of_runs(frame):
+    """True en la primera fila de cada tramo de filas iguales consecutivas (NaN igual a NaN)."""
+    changed = np.zeros(max(len(frame) - 1, 0), dtype=bool)
+    for column in frame.columns:
+        values = frame[column].to_numpy()
+        same = values[1:] == values[:-1]
+        if values.dtype.kind == 'f':
+            same |= np.isnan(values[1:]) & np.isnan(values[:-1])
+        changed |= ~same
+    return np.concatenate([[len(frame) > 0], changed])[:len(frame)]
+
+
+def _codes(values):
+    """Código entero por valor (categórica o no) para ordenar y comparar filas."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy()
+    return pd.factorize(values)[0]
+
+
+def take_positions(column, positions):
+    """Valores de ``column`` en ``positions`` con NaN donde la posición es -1.
+
+    Las categóricas (y demás ExtensionArray) conservan su dtype; las columnas
+    NumPy pasan como ndarray, que es lo que acepta ``pd.api.extensions.take``.
+    """
+    if isinstance(column.dtype, pd.api.extensions.ExtensionDtype):
+        values = column.array
+    else:
+        values = column.to_numpy()
+    return pd.api.extensions.take(values, positions, allow_fill=True)
+
+
+def build_item_facts(reviews, items, sellers, products, category_translation):
+    """Ítems con claves enteras a sus dimensiones y el mapa pedido → reseñas.
+
+    Devuelve un diccionario con:
+
+    - ``orders``: Index de ``order_id`` (pedidos con ítems o reseñas); la
+      clave de pedido es la posición en este Index.
+    - ``products``: una fila por producto con ``product_category_name`` y
+      ``product_category_name_english``.
+    - ``sellers``: una fila por vendedor (la tabla ``sellers``).
+    - ``items``: una fila por ítem ordenada por pedido, con ``order_key``,
+      ``product_key``, ``seller_key`` (-1 si falta la dimensión), las
+      columnas de ``ITEM_COLUMNS`` y ``distinct_line``, True en la primera
+      aparición de cada (pedido, producto, vendedor, precio, envío).
+    - ``item_offsets``: los ítems del pedido ``k`` son
+      ``items[item_offsets[k]:item_offsets[k + 1]]``.
+    - ``reviews``: pares distintos (``order_key``, ``review_score``) ordenados
+      por pedido, con ``review_offsets`` igual que ``item_offsets``.
+
+    Los duplicados se marcan ordenando claves enteras e importes, sin
+    ``drop_duplicates`` sobre filas completas.
+    """
+    orders = pd.Index(pd.concat([items['order_id'], reviews['order_id']]).dropna().unique(), name='order_id')
+    product_dim = pd.merge(
+        products[['product_id', 'product_category_name']].drop_duplicates('product_id'),
+        category_translation,
+        on='product_category_name',
+        how='left',
+    ).reset_index(drop=True)
+    seller_dim = sellers.drop_duplicates('seller_id').reset_index(drop=True)
+
+    item_facts = items[ITEM_COLUMNS].reset_index(drop=True)
+    item_facts.insert(0, 'order_key', dimension_keys(items['order_id'], orders))
+    item_facts.insert(1, 'product_key', dimension_keys(items['product_id'], pd.Index(product_dim['product_id'])))
+    item_facts.insert(2, 'seller_key', dimension_keys(items['seller_id'], pd.Index(seller_dim['seller_id'])))
+    item_facts = item_facts[item_facts['order_key'] >= 0]
+    line = pd.DataFrame({
+        'order_key': item_facts['order_key'].to_numpy(),
+        'product_id': _codes(item_facts['product_id']),
+        'seller_id': _codes(item_facts['seller_id']),
+        'price': item_facts['price'].to_numpy(),
+        'freight_value': item_facts['freight_value'].to_numpy(),
+    })
+    order = np.lexsort([line[c].to_numpy() for c in reversed(line.columns)])
+    item_facts = item_facts.iloc[order].reset_index(drop=True)
+    item_facts['distinct_line'] = _first_of_runs(line.iloc[order])
+
+    review_pairs = pd.DataFrame({
+        'order_key': dimension_keys(reviews['order_id'], orders),
+        'review_score': reviews['review_score'].to_numpy(),
+    })
+    review_pairs = review_pairs[review_pairs['order_key'] >= 0]
+    review_pairs = review_pairs.iloc[np.lexsort([review_pairs['review_score'], review_pairs['order_key']])]
+    review_pairs = review_pairs[_first_of_runs(review_pairs)].reset_index(drop=True)
+
+    return {
+        'orders': orders,
+        'products': product_dim,
+        'sellers': seller_dim,
+        'items': item_facts,
+        'item_offsets': _offsets(item_facts['order_key'].to_numpy(), len(orders)),
+        'reviews': review_pairs,
+        'review_offsets': _offsets(review_pairs['order_key'].to_numpy(), len(orders)),
+    }
+
+
+def expand_review_items(item_facts):
+    """Reseñas × ítems × vendedores × categorías (``df_5`` en ``main.py``).
+
+    Una fila por puntuación distinta de cada pedido y cada ítem distinto del
+    pedido (o una sin ítem si el pedido no tiene), las mismas filas que el
+    merge de las tablas base seguido de ``drop_duplicates``. Añade ``Total
+    prize`` (precio + envío) y usa el nombre de categoría en inglés como
+    ``product_category_name``.
+    """
+    lines = item_facts['items'][item_facts['items']['distinct_line']]
+    line_offsets = _offsets(lines['order_key'].to_numpy(), len(item_facts['orders']))
+    line_counts = np.diff(line_offsets)
+
+    review_pairs = item_facts['reviews']
+    pair_orders = review_pairs['order_key'].to_numpy()
+    pairs, line_rows = _ranges(line_offsets[pair_orders], np.maximum(line_counts[pair_orders], 1))
+    line_rows = np.where(line_counts[pair_orders[pairs]] > 0, line_rows, -1)
+
+    product_keys = np.append(lines['product_key'].to_numpy(), -1)[line_rows]
+    seller_keys = np.append(lines['seller_key'].to_numpy(), -1)[line_rows]
+    seller_dim = item_facts['sellers']
+
+    df = pd.DataFrame({
+        'order_id': item_facts['orders'][pair_orders[pairs]],
+        'review_score': review_pairs['review_score'].to_numpy()[pairs],
+        'product_id': take_positions(lines['product_id'], line_rows),
+        'seller_id': take_positions(lines['seller_id'], line_rows),
+        'price': take_positions(lines['price'], line_rows),
+        'freight_value': take_positions(lines['freight_value'], line_rows),
+    })
+    df['Total prize'] = (df['price'].astype(float) + df['freight_value'].astype(float)).round(2)
+    for column in seller_dim.columns.drop('seller_id'):
+        df[column] = take_positions(seller_dim[column], seller_keys)
+    df['product_category_name'] = take_positions(item_facts['products']['product_category_name_english'], product_keys)
+    return df
+
+
+def order_items(item_facts, orders):
+    """Pedidos de ``orders`` ⋈ sus ítems ⋈ productos: una fila por ítem.
+
+    Los ítems de cada pedido son un rango contiguo de ``items``, así que no
+    hay merge: se buscan las claves de los pedidos y se leen sus rangos.
+    ``product_category_name`` es el nombre en portugués; los ítems sin
+    producto conocido se descartan, como en el inner join.
+    """
+    keys = dimension_keys(orders['order_id'], item_facts['orders'])
+    offsets = item_facts['item_offsets']
+    counts = np.where(keys >= 0, np.diff(offsets)[np.maximum(keys, 0)], 0)
+    order_rows, item_rows = _ranges(offsets[np.maximum(keys, 0)], counts)
+
+    item_facts_rows = item_facts['items']
+    product_keys = item_facts_rows['product_key'].to_numpy()[item_rows]
+    known = product_keys >= 0
+    order_rows, item_rows, product_keys = order_rows[known], item_rows[known], product_keys[known]
+
+    result = orders.iloc[order_rows].reset_index(drop=True)
+    picked = item_facts_rows.iloc[item_rows].reset_index(drop=True)
+    for column in ITEM_COLUMNS:
+        result[column] = picked[column]
+    result['product_category_name'] = take_positions(item_facts['products']['product_category_name'], product_keys)
+    return result
@@ -0,0 +1,114 @@
+"""Filtros de la barra lateral para la tabla de reseñas × ítems (``df_5``).
+
+Los filtros se declaran como una lista de predicados y se combinan en una
+única máscara booleana, de modo que la tabla se recorre una vez y se copia
+una sola vez al final. Los límites de los sliders salen de estadísticas
+precalculadas, no de la tabla ya filtrada.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from olist_analytics import profiling
+
+
+@dataclass(frozen=True)
+class IsIn:
+    column: str
+    values: tuple
+    aggregate = False
+
+    def mask(self, df, index, row_mask):
+        return df[self.column].isin(self.values).to_numpy()
+
+
+@dataclass(frozen=True)
+class Between:
+    column: str
+    low: float
+    high: float
+    aggregate = False
+
+    def mask(self, df, index, row_mask):
+        values = df[self.column].to_numpy()
+        return (values >= self.low) & (values <= self.high)
+
+
+@dataclass(frozen=True)
+class SellerOrdersBetween:
+    """Vendedores con entre ``low`` y ``high`` pedidos distintos.
+
+    Se evalúa sobre las filas que superan el resto de filtros, igual que si
+    se agrupara la tabla ya filtrada por ``seller_id``.
+    """
+    low: int
+    high: int
+    aggregate = True
+
+    def mask(self, df, index, row_mask):
+        counts = seller_order_counts(index, row_mask)
+        keep = (counts >= self.low) & (counts <= self.high)
+        codes = index['seller_codes']
+        # Código -1: filas sin vendedor, nunca pasan el filtro
+        return np.where(codes >= 0, keep[codes], False)
+
+
+# Cualquiera de los predicados de la barra lateral
+Predicate = IsIn | Between | SellerOrdersBetween
+
+
+def build_filter_index(df):
+    """Códigos enteros de vendedor y pedido para contar pedidos por vendedor sin agrupar."""
+    seller_codes, sellers = pd.factorize(df['seller_id'])
+    order_codes, orders = pd.factorize(df['order_id'])
+    return {
+        'seller_codes': seller_codes,
+        'order_codes': order_codes,
+        'n_sellers': len(sellers),
+        'n_orders': len(orders),
+    }
+
+
+def seller_order_counts(index, row_mask=None):
+    """Pedidos distintos por código de vendedor entre las filas de ``row_mask``."""
+    seller_codes = index['seller_codes']
+    order_codes = index['order_codes']
+    valid = (seller_codes >= 0) & (order_codes >= 0)
+    if row_mask is not None:
+        valid &= row_mask
+    pairs = np.unique(seller_codes[valid].astype(np.int64) * index['n_orders'] + order_codes[valid])
+    return np.bincount(pairs // index['n_orders'], minlength=index['n_sellers'])
+
+
+def column_stats(df, index):
+    """Opciones y límites de los filtros calculados una vez sobre la tabla completa."""
+    counts = seller_order_counts(index)
+    counts = counts[counts > 0]
+    return {
+        'seller_states': sorted(df['seller_state'].dropna().unique()),
+        'review_score': (int(df['review_score'].min()), int(df['review_score'].max())),
+        'Total prize': (float(df['Total prize'].min()), float(df['Total prize'].max())),
+        'freight_value': (float(df['freight_value'].min()), float(df['freight_value'].max())),
+        'seller_orders': (int(counts.min()), int(counts.max())),
+    }
+
+
+def combined_mask(df, index, predicates):
+    """Combina los predicados en una sola máscara.
+
+    Los predicados por fila se evalúan primero; los agregados (p. ej.
+    ``SellerOrdersBetween``) reciben la máscara resultante.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for predicate in sorted(predicates, key=lambda p: p.aggregate):
+        column = getattr(predicate, 'column', 'pedidos por vendedor')
+        with profiling.block(f"filtro {column}", rows_in=len(df)) as record:
+            mask &= predicate.mask(df, index, mask)
+            if record.active:
+                record.rows_out = int(mask.sum())
+    return mask
+
+
+def apply_filters(df, index, predicates):
+    return df[combined_mask(df, index, predicates)]
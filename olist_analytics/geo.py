@@ -0,0 +1,125 @@
+"""GeoJSON de los estados de Brasil para el mapa de la sección 4.1.
+
+El fichero se guarda ya simplificado en ``Olist_Data/brazil-states.geojson``
+y la app solo lo lee de disco: nunca descarga nada. Para (re)generarlo::
+
+    python -m olist_analytics.geo [tolerancia_en_grados]
+"""
+import json
+import sys
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+GEOJSON_URL = "https://raw.githubusercontent.com/codeforamerica/click_that_hood/master/public/data/brazil-states.geojson"
+GEOJSON_FILENAME = "brazil-states.geojson"
+# ~1 km: suficiente para un mapa de todo el país a unos cientos de píxeles
+DEFAULT_TOLERANCE = 0.01
+COORD_DECIMALS = 3
+KEEP_PROPERTIES = ("sigla", "name")
+
+
+def _simplify_line(points, tolerance):
+    """Douglas-Peucker iterativo sobre un array (n, 2) de coordenadas."""
+    points = np.asarray(points, dtype=float)
+    if len(points) < 3:
+        return points
+
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end <= start + 1:
+            continue
+        a, b = points[start], points[end]
+        inner = points[start + 1:end]
+        dx, dy = b - a
+        norm = np.hypot(dx, dy)
+        if norm == 0:
+            dist = np.hypot(inner[:, 0] - a[0], inner[:, 1] - a[1])
+        else:
+            dist = np.abs(dx * (inner[:, 1] - a[1]) - dy * (inner[:, 0] - a[0])) / norm
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance:
+            split = start + 1 + i
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return points[keep]
+
+
+def _simplify_ring(ring, tolerance):
+    simplified = _simplify_line(ring, tolerance)
+    # Un anillo necesita al menos 4 puntos (el último repite el primero)
+    if len(simplified) < 4:
+        simplified = np.asarray(ring, dtype=float)
+    return np.round(simplified, COORD_DECIMALS).tolist()
+
+
+def _simplify_geometry(geometry, tolerance):
+    if geometry["type"] == "Polygon":
+        coordinates = [_simplify_ring(ring, tolerance) for ring in geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        coordinates = [
+            [_simplify_ring(ring, tolerance) for ring in polygon]
+            for polygon in geometry["coordinates"]
+        ]
+    else:
+        return geometry
+    return {"type": geometry["type"], "coordinates": coordinates}
+
+
+def simplify_geojson(data, tolerance=DEFAULT_TOLERANCE):
+    """Simplifica las geometrías y deja solo las propiedades que usa el mapa."""
+    features = []
+    for feature in data["features"]:
+        properties = feature.get("properties") or {}
+        features.append({
+            "type": "Feature",
+            "properties": {k: properties[k] for k in KEEP_PROPERTIES if k in properties},
+            "geometry": _simplify_geometry(feature["geometry"], tolerance),
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def fetch_states_geojson(timeout=10):
+    # Solo lo usa el generador; la app no necesita red ni ``requests``
+    import requests
+
+    response = requests.get(GEOJSON_URL, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+
+def write_states_geojson(path, tolerance=DEFAULT_TOLERANCE, timeout=10):
+    data = simplify_geojson(fetch_states_geojson(timeout=timeout), tolerance)
+    path = Path(path)
+    path.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+    return data
+
+
+def load_states_geojson(path):
+    """Lee el GeoJSON local; si no existe avisa y devuelve ``None``.
+
+    No descarga nada: el fichero se genera con ``python -m olist_analytics.geo``.
+    """
+    path = Path(path)
+    if not path.exists():
+        warnings.warn(f"No existe {path}; genéralo con `python -m olist_analytics.geo`.", stacklevel=2)
+        return None
+    with path.open(encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    tolerance = float(argv[0]) if argv else DEFAULT_TOLERANCE
+    path = Path(__file__).resolve().parent.parent / "Olist_Data" / GEOJSON_FILENAME
+    data = write_states_geojson(path, tolerance)
+    print(f"{len(data['features'])} estados -> {path} ({path.stat().st_size / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
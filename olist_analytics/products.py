@@ -0,0 +1,40 @@
+"""Rankings de productos y vendedores (sección 4.5).
+
+Todas las funciones reciben la tabla reseñas × ítems de
+``facts.expand_review_items``, normalmente ya filtrada con
+``filters.apply_filters``. Los rankings de vendedores salen del resumen de
+``olist_analytics.sellers``.
+"""
+from olist_analytics import sellers
+
+
+def top_sellers_by_score(review_items, n=10):
+    """Vendedores con mayor puntuación media de reseñas."""
+    return sellers.top_k(sellers.seller_summary(review_items)['review_score'], n)
+
+
+def review_score_distribution(review_items):
+    """Número de filas por ``review_score``, ordenado por puntuación."""
+    return review_items['review_score'].value_counts().sort_index()
+
+
+def top_categories(review_items, n=10):
+    """Categorías con más ítems vendidos."""
+    counts = review_items['product_category_name'].value_counts()
+    # En una categórica value_counts incluye también las categorías sin filas
+    return counts[counts > 0].head(n)
+
+
+def seller_revenue(review_items, n=10):
+    """Vendedores con más ingresos (suma de ``Total prize``)."""
+    return sellers.top_k(sellers.seller_summary(review_items)['Total prize'], n)
+
+
+def shipping_cost_by_category(review_items, n=10):
+    """Categorías con mayor coste medio de envío."""
+    return (
+        review_items.groupby('product_category_name', observed=True)['freight_value']
+        .mean()
+        .sort_values(ascending=False)
+        .head(n)
+    )
@@ -0,0 +1,172 @@
+"""Perfilado opcional por bloque: tiempo, filas de entrada/salida y delta de RSS.
+
+Desactivado por defecto. Se activa con la variable de entorno
+``OLIST_PROFILE=1`` o, en la app, con ``?profile=1`` en la URL. Cada
+ejecución (script completo o fragmento) abre un ``Profiler`` con ``start``
+y lo cierra con ``finish`` en un ``finally``; el código instrumentado usa
+``block(nombre)``, que no hace nada si no hay un perfilador activo. Los bloques se añaden a un log JSON-lines
+(``OLIST_PROFILE_LOG``, por defecto ``olist_profile.jsonl``).
+"""
+import contextvars
+import functools
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pandas as pd
+
+ENV_VAR = "OLIST_PROFILE"
+LOG_ENV_VAR = "OLIST_PROFILE_LOG"
+DEFAULT_LOG = "olist_profile.jsonl"
+_TRUE = {"1", "true", "yes", "on"}
+
+_active = contextvars.ContextVar("olist_profiler", default=None)
+
+
+def is_enabled(flag=None):
+    """True si ``flag`` (p. ej. el query param) o ``OLIST_PROFILE`` lo activan."""
+    values = (flag, os.environ.get(ENV_VAR))
+    return any(str(value).strip().lower() in _TRUE for value in values if value is not None)
+
+
+def log_path():
+    return os.environ.get(LOG_ENV_VAR, DEFAULT_LOG)
+
+
+def rss_mb():
+    """Memoria residente actual del proceso en MB (NaN si no se puede leer)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        return float("nan")
+
+
+class Block:
+    """Medidas de un bloque. ``rows_out`` lo rellena el código instrumentado."""
+    __slots__ = ("name", "depth", "rows_in", "rows_out", "seconds", "rss_delta_mb", "active")
+
+    def __init__(self, name, depth=0, rows_in=None, active=True):
+        self.name = name
+        self.depth = depth
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.seconds = None
+        self.rss_delta_mb = None
+        self.active = active
+
+    def as_dict(self):
+        return {
+            "block": self.name,
+            "depth": self.depth,
+            "seconds": self.seconds,
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "rss_delta_mb": self.rss_delta_mb,
+        }
+
+
+class Profiler:
+    def __init__(self, scope):
+        self.scope = scope
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self.blocks = []
+        self._depth = 0
+        self._token = None
+
+    @contextmanager
+    def block(self, name, rows_in=None):
+        record = Block(name, self._depth, rows_in)
+        self.blocks.append(record)
+        self._depth += 1
+        rss_before = rss_mb()
+        t0 = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.seconds = round(time.perf_counter() - t0, 4)
+            record.rss_delta_mb = round(rss_mb() - rss_before, 2)
+            self._depth -= 1
+
+    def frame(self):
+        frame = pd.DataFrame([record.as_dict() for record in self.blocks])
+        if not frame.empty:
+            frame["block"] = frame["depth"].map(lambda depth: "  " * depth) + frame["block"]
+        return frame.drop(columns="depth", errors="ignore")
+
+    def write_jsonl(self, path):
+        with open(path, "a", encoding="utf-8") as f:
+            for record in self.blocks:
+                line = {"run": self.run_id, "scope": self.scope, "started": self.started, **record.as_dict()}
+                f.write(json.dumps(line, ensure_ascii=False, default=str) + "\n")
+
+
+def start(scope):
+    """Crea el perfilador de esta ejecución y lo deja activo en el contexto actual.
+
+    Hay que cerrarlo con ``finish`` en un ``finally``: si la ejecución se
+    corta antes, seguiría activo para la siguiente.
+    """
+    profiler = Profiler(scope)
+    profiler._token = _active.set(profiler)
+    return profiler
+
+
+def finish(profiler, path=None):
+    """Desactiva ``profiler`` (vuelve el que estaba activo antes) y añade sus bloques al log."""
+    if profiler._token is not None:
+        _active.reset(profiler._token)
+        profiler._token = None
+    profiler.write_jsonl(path or log_path())
+
+
+def clear():
+    """Deja el contexto sin perfilador activo, p. ej. uno de una ejecución que se cortó."""
+    _active.set(None)
+
+
+def current():
+    return _active.get()
+
+
+def block(name, rows_in=None):
+    """Bloque del perfilador activo; si no hay ninguno no mide nada."""
+    profiler = _active.get()
+    if profiler is None:
+        return _null_block(name, rows_in)
+    return profiler.block(name, rows_in)
+
+
+@contextmanager
+def _null_block(name, rows_in):
+    yield Block(name, rows_in=rows_in, active=False)
+
+
+def profiled(name, enabled, on_finish=None):
+    """Decorador: mide la función con un perfilador propio ``name``.
+
+    Si ``enabled()`` es cierto abre siempre uno nuevo, aunque haya otro activo
+    (p. ej. el de una ejecución anterior que se cortó), y lo cierra aunque la
+    función se interrumpa. Si termina, se lo pasa a ``on_finish``.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled():
+                return func(*args, **kwargs)
+            profiler = start(name)
+            try:
+                with profiler.block(name):
+                    result = func(*args, **kwargs)
+            finally:
+                finish(profiler)
+            if on_finish is not None:
+                on_finish(profiler)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,176 @@
+"""Informe completo sin Streamlit: carga de tablas y métricas de cada sección.
+
+``build_report`` devuelve los mismos DataFrames que dibuja ``main.py``, así que
+se puede precalcular fuera de la app, usar desde otros procesos o perfilar::
+
+    python -m olist_analytics.report directorio_salida [inicio] [fin]
+
+Con ``OLIST_ENGINE=duckdb`` el informe se limita a las consultas de
+``olist_analytics.sql``, que no cargan las tablas en memoria.
+"""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from olist_analytics import (
+    cube, customers, delivery, diagnosis, encoding, facts, filters, products, reviews, sellers, sql, storage, warmup,
+)
+from olist_analytics.time_index import time_slice
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "Olist_Data"
+TABLE_FILES = {
+    'orders': 'olist_orders_dataset.csv',
+    'customers': 'olist_customers_dataset.csv',
+    'reviews': 'olist_order_reviews_dataset.csv',
+    'items': 'olist_order_items_dataset.csv',
+    'payments': 'olist_order_payments_dataset.csv',
+    'sellers': 'olist_sellers_dataset.csv',
+    'products': 'olist_products_dataset.csv',
+    'category_translation': 'product_category_name_translation.csv',
+}
+
+
+def load_tables(data_dir: str | Path = DATA_DIR) -> dict[str, pd.DataFrame]:
+    """Tablas base por nombre corto (ver ``TABLE_FILES``), desde los snapshots Arrow.
+
+    IDs y dimensiones quedan codificados con diccionarios compartidos
+    (ver ``olist_analytics.encoding``).
+    """
+    data_dir = Path(data_dir)
+    return encoding.encode_tables({
+        name: storage.load_table(data_dir / filename) for name, filename in TABLE_FILES.items()
+    })
+
+
+def build_derived(tables: dict[str, pd.DataFrame]) -> dict[str, object]:
+    """Tablas derivadas que no dependen de filtros (las que la app cachea por proceso en ``app_data``)."""
+    order_facts = facts.build_order_facts(tables['orders'], tables['customers'])
+    first_purchases, first_purchases_by_state = customers.build_first_purchases(order_facts)
+    derived = {
+        'order_facts': order_facts,
+        'order_cube': cube.build_order_cube(order_facts),
+        'first_purchases': first_purchases,
+        'daily_new_customers': customers.build_daily_new_customers(first_purchases_by_state),
+        'review_index': reviews.build_review_index(tables['reviews'], order_facts),
+    }
+    derived['item_facts'] = facts.build_item_facts(
+        tables['reviews'], tables['items'], tables['sellers'], tables['products'],
+        tables['category_translation'],
+    )
+    derived['review_items'] = facts.expand_review_items(derived['item_facts'])
+    derived['order_drivers'] = diagnosis.build_order_drivers(order_facts, derived['item_facts'], tables['payments'])
+    return derived
+
+
+def build_report(
+    tables: dict[str, pd.DataFrame],
+    derived: dict[str, object],
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    state: str | None = None,
+    predicates: tuple[filters.Predicate, ...] = (),
+) -> dict[str, pd.DataFrame | pd.Series]:
+    """Métricas de las secciones 4.1-4.5 para el rango ``[start, end]``.
+
+    ``state`` es el estado del detalle de la sección 4.1 (por defecto, el de
+    más clientes) y ``predicates`` los filtros de ``olist_analytics.filters``
+    para la sección 4.5. Devuelve un diccionario de DataFrames/Series.
+    """
+    orders = time_slice(derived['order_facts'], 'order_purchase_timestamp', start, end)
+
+    clientes_por_estado = customers.customers_by_state(orders)
+    if state is None and len(clientes_por_estado):
+        state = clientes_por_estado.index[0]
+
+    late_orders = delivery.late_orders_by(orders, 'customer_city')
+    order_items = facts.order_items(derived['item_facts'], orders)
+
+    review_items = derived['review_items']
+    if predicates:
+        review_items = filters.apply_filters(review_items, filters.build_filter_index(review_items), predicates)
+    seller_summary = sellers.seller_summary(review_items)
+
+    return {
+        # 4.1
+        'clientes_por_estado': clientes_por_estado,
+        'clientes_por_ciudad': customers.customers_by_city(orders, state),
+        'nuevos_clientes_por_mes': customers.new_customers_per_month(
+            derived['daily_new_customers'], state, start, end
+        ),
+        # 4.2
+        'city_summary': customers.city_summary(orders, cube.summarize_cube(derived['order_cube'], start, end)),
+        # 4.3
+        'late_orders': late_orders,
+        'late_over_time': delivery.late_orders_by_month(orders),
+        'late_by_state': delivery.late_share_by_state(orders),
+        'dispatch_means': delivery.dispatch_time_by_lateness(orders),
+        'late_percentage_by_category': delivery.late_percentage_by_category(order_items),
+        'seller_analysis': delivery.late_orders_by_seller(order_items),
+        **diagnosis.diagnose(time_slice(derived['order_drivers'], 'order_purchase_timestamp', start, end)),
+        # 4.4
+        'reviews_by_state': reviews.reviews_in_window(derived['review_index'], start, end),
+        # 4.5
+        'top_sellers': sellers.top_k(seller_summary['review_score'], 10),
+        'review_counts': products.review_score_distribution(review_items),
+        'top_categories': products.top_categories(review_items),
+        'seller_revenue': sellers.top_k(seller_summary['Total prize'], 10),
+        'shipping_cost': products.shipping_cost_by_category(review_items),
+    }
+
+
+def build_sql_report(
+    engine: sql.DuckDBEngine,
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    predicates: tuple[filters.Predicate, ...] = (),
+) -> dict[str, pd.DataFrame | pd.Series]:
+    """Subconjunto de ``build_report`` resuelto en DuckDB (ver ``olist_analytics.sql``)."""
+    return {
+        'clientes_por_estado': engine.customers_by_state(start, end),
+        'city_summary': engine.city_summary(start, end),
+        'late_orders': engine.late_orders_by_city(start, end),
+        'late_over_time': engine.late_orders_by_month(start, end),
+        'late_by_state': engine.late_share_by_state(start, end),
+        'dispatch_means': engine.dispatch_time_by_lateness(start, end),
+        'reviews_by_state': engine.reviews_by_state(start, end),
+        'top_sellers': engine.top_sellers_by_score(predicates),
+        'review_counts': engine.review_score_distribution(predicates),
+        'top_categories': engine.top_categories(predicates),
+        'seller_revenue': engine.seller_revenue(predicates),
+        'shipping_cost': engine.shipping_cost_by_category(predicates),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        sys.exit("uso: python -m olist_analytics.report directorio_salida [inicio] [fin]")
+    out_dir = Path(argv[0])
+    if sql.is_enabled():
+        engine = sql.DuckDBEngine(DATA_DIR)
+        first, last = engine.purchase_range()
+    else:
+        tables = load_tables()
+        derived = build_derived(tables)
+        purchases = derived['order_facts']['order_purchase_timestamp']
+        first, last = purchases.min(), purchases.max()
+    # Como en la barra lateral: días completos, con el día final incluido. El
+    # cubo y el índice de reseñas van por días, así que un inicio a mitad de
+    # día dejaría fuera de ellos el primer día
+    start, end = warmup.day_window(argv[1] if len(argv) > 1 else first, argv[2] if len(argv) > 2 else last)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if sql.is_enabled():
+        results = build_sql_report(engine, start, end)
+    else:
+        results = build_report(tables, derived, start, end)
+    for name, result in results.items():
+        result.to_csv(out_dir / f"{name}.csv")
+        print(f"{name}: {len(result)} filas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Reseñas por estado del cliente (sección 4.4).
+
+``reviews_by_state`` agrega todas las reseñas. La app usa en su lugar el
+índice de sumas acumuladas de ``build_review_index``, que responde a
+cualquier rango de fechas sin reagrupar y permite excluir los pedidos con
+retraso.
+"""
+import numpy as np
+import pandas as pd
+
+
+def reviews_by_state(reviews, order_facts):
+    """Número de reseñas y puntuación media por ``customer_state``.
+
+    Columnas ``customer_state``, ``num_reviews`` y ``score_medio`` (redondeado
+    a 2 decimales), ordenado por ``num_reviews`` de mayor a menor.
+    """
+    reviewed = pd.merge(
+        reviews[['review_id', 'order_id', 'review_score']],
+        order_facts[['order_id', 'customer_state', 'is_late']],
+        on='order_id',
+        how='left',
+    )
+    by_state = reviewed.groupby('customer_state', observed=True).agg(
+        num_reviews=('review_id', 'count'),
+        score_medio=('review_score', 'mean'),
+    ).reset_index()
+    by_state['score_medio'] = by_state['score_medio'].round(2)
+    return by_state.sort_values(by='num_reviews', ascending=False)
+
+
+def build_review_index(reviews, order_facts):
+    """Sumas acumuladas de reseñas por estado, retraso y día de reseña.
+
+    Devuelve un diccionario con ``states`` (Index de ``customer_state``),
+    ``days`` (días de ``review_creation_date`` con alguna reseña, ordenados)
+    y dos arrays ``(estado, is_late, día + 1)``: ``counts`` (reseñas) y
+    ``score_sums`` (suma de ``review_score``), acumulados por día y con una
+    primera columna de ceros. Así cualquier rango de fechas se resuelve con
+    dos búsquedas y una resta (ver ``reviews_in_window``).
+    """
+    reviewed = pd.merge(
+        reviews[['review_id', 'order_id', 'review_score', 'review_creation_date']],
+        order_facts[['order_id', 'customer_state', 'is_late']],
+        on='order_id',
+        how='inner',
+    )
+    reviewed = reviewed[reviewed['review_id'].notna() & reviewed['customer_state'].notna()]
+    day = reviewed['review_creation_date'].dt.normalize()
+    reviewed = reviewed[day.notna()]
+    day = day[day.notna()]
+
+    state_codes, states = pd.factorize(reviewed['customer_state'], sort=True)
+    day_codes, days = pd.factorize(day, sort=True)
+    late_codes = reviewed['is_late'].to_numpy(dtype=np.int8)
+
+    shape = (len(states), 2, len(days))
+    flat = np.ravel_multi_index((state_codes, late_codes, day_codes), shape)
+    size = int(np.prod(shape))
+    counts = np.bincount(flat, minlength=size).reshape(shape)
+    score_sums = np.bincount(flat, weights=reviewed['review_score'].to_numpy(dtype=float), minlength=size).reshape(shape)
+
+    # Columna inicial de ceros: la suma de los días [lo, hi) es cum[hi] - cum[lo]
+    pad = ((0, 0), (0, 0), (1, 0))
+    return {
+        'states': pd.Index(np.asarray(states), name='customer_state'),
+        'days': np.asarray(days, dtype='datetime64[ns]'),
+        'counts': np.pad(counts.cumsum(axis=2), pad),
+        'score_sums': np.pad(score_sums.cumsum(axis=2), pad),
+    }
+
+
+def reviews_in_window(review_index, start, end, include_late=False):
+    """Como ``reviews_by_state`` pero solo con reseñas creadas en ``[start, end]``.
+
+    Por defecto excluye las reseñas de pedidos entregados con retraso. Solo
+    incluye estados con alguna reseña en el rango.
+    """
+    days = review_index['days']
+    lo = days.searchsorted(pd.Timestamp(start).to_datetime64(), side='left')
+    hi = days.searchsorted(pd.Timestamp(end).to_datetime64(), side='right')
+    late = slice(None) if include_late else slice(0, 1)
+
+    counts = review_index['counts'][:, late]
+    score_sums = review_index['score_sums'][:, late]
+    num_reviews = (counts[:, :, hi] - counts[:, :, lo]).sum(axis=1)
+    score_sum = (score_sums[:, :, hi] - score_sums[:, :, lo]).sum(axis=1)
+
+    by_state = pd.DataFrame({
+        'customer_state': review_index['states'],
+        'num_reviews': num_reviews,
+        'score_medio': np.round(score_sum / np.where(num_reviews > 0, num_reviews, 1), 2),
+    })
+    by_state = by_state[by_state['num_reviews'] > 0]
+    return by_state.sort_values(by='num_reviews', ascending=False).reset_index(drop=True)
+
+
+def review_kpis(by_state):
+    """``(num_reviews, score_mean)`` del informe a partir de ``reviews_by_state``.
+
+    Como en el informe original, ``num_reviews`` cuenta las filas de
+    ``by_state`` (estados con reseñas) y ``score_mean`` es la media de las
+    medias por estado.
+    """
+    return by_state['num_reviews'].count(), by_state['score_medio'].mean().round(2)
@@ -0,0 +1,145 @@
+"""Esquema de las tablas de Olist: columnas, tipos y formato de fechas.
+
+Los cargadores usan estas definiciones para ``dtype=``, ``usecols=`` y para
+parsear las fechas con un formato fijo en lugar de inferirlo fila a fila.
+"""
+import hashlib
+from dataclasses import dataclass
+
+# Todas las marcas de tiempo de Olist vienen como "2017-10-02 10:56:33"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+@dataclass(frozen=True)
+class TableSchema:
+    filename: str
+    columns: dict
+    dates: tuple = ()
+    # Columnas que no se cargan (texto libre que el informe no utiliza)
+    skip: tuple = ()
+    date_format: str = TIMESTAMP_FORMAT
+
+    @property
+    def usecols(self):
+        return [c for c in (*self.columns, *self.dates) if c not in self.skip]
+
+    @property
+    def dtypes(self):
+        return {c: t for c, t in self.columns.items() if c not in self.skip}
+
+    def signature(self):
+        """Huella del esquema: si cambia, los snapshots se regeneran."""
+        text = repr((self.usecols, sorted(self.dtypes.items()), self.dates, self.date_format))
+        return hashlib.sha1(text.encode()).hexdigest()[:12]
+
+
+ORDERS = TableSchema(
+    filename="olist_orders_dataset.csv",
+    columns={
+        "order_id": "str",
+        "customer_id": "str",
+        "order_status": "str",
+    },
+    dates=(
+        "order_purchase_timestamp",
+        "order_approved_at",
+        "order_delivered_carrier_date",
+        "order_delivered_customer_date",
+        "order_estimated_delivery_date",
+    ),
+)
+
+CUSTOMERS = TableSchema(
+    filename="olist_customers_dataset.csv",
+    columns={
+        "customer_id": "str",
+        "customer_unique_id": "str",
+        "customer_zip_code_prefix": "str",
+        "customer_city": "str",
+        "customer_state": "str",
+    },
+)
+
+ORDER_ITEMS = TableSchema(
+    filename="olist_order_items_dataset.csv",
+    columns={
+        "order_id": "str",
+        "order_item_id": "int16",
+        "product_id": "str",
+        "seller_id": "str",
+        "price": "float64",
+        "freight_value": "float64",
+    },
+    dates=("shipping_limit_date",),
+)
+
+ORDER_PAYMENTS = TableSchema(
+    filename="olist_order_payments_dataset.csv",
+    columns={
+        "order_id": "str",
+        "payment_sequential": "int16",
+        "payment_type": "str",
+        "payment_installments": "int16",
+        "payment_value": "float64",
+    },
+)
+
+ORDER_REVIEWS = TableSchema(
+    filename="olist_order_reviews_dataset.csv",
+    columns={
+        "review_id": "str",
+        "order_id": "str",
+        "review_score": "int8",
+        "review_comment_title": "str",
+        "review_comment_message": "str",
+    },
+    dates=("review_creation_date", "review_answer_timestamp"),
+    skip=("review_comment_title", "review_comment_message"),
+)
+
+PRODUCTS = TableSchema(
+    filename="olist_products_dataset.csv",
+    columns={
+        "product_id": "str",
+        "product_category_name": "str",
+        "product_name_lenght": "float32",
+        "product_description_lenght": "float32",
+        "product_photos_qty": "float32",
+        "product_weight_g": "float32",
+        "product_length_cm": "float32",
+        "product_height_cm": "float32",
+        "product_width_cm": "float32",
+    },
+)
+
+SELLERS = TableSchema(
+    filename="olist_sellers_dataset.csv",
+    columns={
+        "seller_id": "str",
+        "seller_zip_code_prefix": "str",
+        "seller_city": "str",
+        "seller_state": "str",
+    },
+)
+
+CATEGORY_TRANSLATION = TableSchema(
+    filename="product_category_name_translation.csv",
+    columns={
+        "product_category_name": "str",
+        "product_category_name_english": "str",
+    },
+)
+
+TABLES = {
+    schema.filename: schema
+    for schema in (
+        ORDERS,
+        CUSTOMERS,
+        ORDER_ITEMS,
+        ORDER_PAYMENTS,
+        ORDER_REVIEWS,
+        PRODUCTS,
+        SELLERS,
+        CATEGORY_TRANSLATION,
+    )
+}
@@ -0,0 +1,158 @@
+"""Resumen por vendedor en una sola pasada y rankings top-k (secciones 4.3 y 4.5).
+
+``seller_summary`` agrupa una vez por código de vendedor y devuelve todas las
+métricas a la vez (filas, reseñas y puntuación media, ingresos, envío,
+pedidos distintos y proporción de filas tardías). Los rankings se sacan del
+resumen con ``top_k``, que selecciona las ``k`` mejores sin ordenar el
+resto.
+
+``SellerSummary`` guarda el resumen de la tabla reseñas × ítems para la
+última máscara de filtros: al cambiar los filtros solo se recalculan los
+vendedores con alguna fila que entra o sale.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+SUM_COLUMNS = ('rows', 'reviews', 'score_sum', 'revenue', 'freight', 'late_rows')
+
+
+def _factorize(values):
+    """``(códigos, etiquetas)``; con una categórica, sus códigos y categorías."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), values.cat.categories
+    return pd.factorize(values)
+
+
+def late_flags(review_items, order_facts):
+    """``is_late`` del pedido de cada fila de ``review_items`` (False si no está en ``order_facts``)."""
+    positions = pd.Index(order_facts['order_id']).get_indexer(review_items['order_id'])
+    return np.append(order_facts['is_late'].to_numpy(dtype=bool), False)[positions]
+
+
+def _row_values(df, is_late=None):
+    """Lo que suma cada fila de ``df`` a cada columna de ``SUM_COLUMNS`` que se puede calcular."""
+    values = {'rows': np.ones(len(df))}
+    if 'review_score' in df.columns:
+        scores = df['review_score'].to_numpy(dtype=float)
+        values['reviews'] = (~np.isnan(scores)).astype(float)
+        values['score_sum'] = np.nan_to_num(scores)
+    if 'Total prize' in df.columns:
+        values['revenue'] = np.nan_to_num(df['Total prize'].to_numpy(dtype=float))
+    if 'freight_value' in df.columns:
+        values['freight'] = np.nan_to_num(df['freight_value'].to_numpy(dtype=float))
+    if is_late is None and 'is_late' in df.columns:
+        is_late = df['is_late'].to_numpy(dtype=bool)
+    if is_late is not None:
+        values['late_rows'] = np.asarray(is_late, dtype=float)
+    return values
+
+
+def _distinct_orders(seller_codes, order_codes, n_orders, n_sellers):
+    valid = (seller_codes >= 0) & (order_codes >= 0)
+    pairs = np.unique(seller_codes[valid].astype(np.int64) * max(n_orders, 1) + order_codes[valid])
+    return np.bincount(pairs // max(n_orders, 1), minlength=n_sellers)
+
+
+def _summary_frame(sellers, sums, orders):
+    """Una fila por vendedor con alguna fila, indexada por ``seller_id``."""
+    positions = np.flatnonzero(sums['rows'] > 0)
+    frame = pd.DataFrame(
+        {'rows': sums['rows'][positions].astype(np.int64)},
+        index=pd.Index(sellers.take(positions), name='seller_id'),
+    )
+    if 'score_sum' in sums:
+        reviews = sums['reviews'][positions]
+        frame['reviews'] = reviews.astype(np.int64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            frame['review_score'] = np.where(reviews > 0, sums['score_sum'][positions] / reviews, np.nan)
+    if 'revenue' in sums:
+        frame['Total prize'] = sums['revenue'][positions]
+    if 'freight' in sums:
+        frame['freight_value'] = sums['freight'][positions]
+    frame['orders'] = orders[positions].astype(np.int64)
+    if 'late_rows' in sums:
+        frame['late_rows'] = sums['late_rows'][positions].astype(np.int64)
+        frame['late_share'] = frame['late_rows'] / frame['rows']
+    return frame
+
+
+def seller_summary(df, row_mask=None, is_late=None):
+    """Métricas por vendedor de las filas de ``df`` (o de ``row_mask``) en una pasada.
+
+    Columnas: ``rows``, ``reviews`` y ``review_score`` (media) si hay
+    puntuaciones, ``Total prize`` (ingresos) y ``freight_value`` (suma) si
+    existen, ``orders`` (pedidos distintos) y ``late_rows``/``late_share`` si
+    hay ``is_late`` en ``df`` o se pasa aparte.
+    """
+    seller_codes, sellers = _factorize(df['seller_id'])
+    order_codes, orders = _factorize(df['order_id'])
+    if row_mask is not None:
+        seller_codes = np.where(row_mask, seller_codes, -1)
+    valid = seller_codes >= 0
+    sums = {
+        name: np.bincount(seller_codes[valid], weights=values[valid], minlength=len(sellers))
+        for name, values in _row_values(df, is_late).items()
+    }
+    return _summary_frame(sellers, sums, _distinct_orders(seller_codes, order_codes, len(orders), len(sellers)))
+
+
+def top_k(values, k):
+    """Las ``k`` entradas de mayor valor de la Serie ``values``, de mayor a menor.
+
+    Solo ordena las candidatas que llegan al ``k``-ésimo valor; los empates
+    se resuelven por orden de vendedor, como ``ORDER BY ... DESC, seller_id``.
+    """
+    values = values.dropna()
+    array = values.to_numpy()
+    positions = np.arange(len(array))
+    if len(array) > k > 0:
+        kth = np.partition(array, len(array) - k)[len(array) - k]
+        positions = np.flatnonzero(array >= kth)
+    positions = positions[np.lexsort((positions, -array[positions]))][:k]
+    return values.iloc[positions]
+
+
+class SellerSummary:
+    """Resumen por vendedor de ``df`` que se actualiza con cada máscara de filtros.
+
+    Las filas se agrupan por vendedor una vez; ``update`` compara la máscara
+    nueva con la anterior y recalcula solo los vendedores con filas que
+    cambian. Se comparte entre sesiones: las actualizaciones van con un lock
+    y el resultado solo depende de la máscara.
+    """
+
+    def __init__(self, df, is_late=None):
+        self.seller_codes, self.sellers = _factorize(df['seller_id'])
+        self.order_codes, orders = _factorize(df['order_id'])
+        self.n_orders = len(orders)
+        self.values = _row_values(df, is_late)
+
+        valid = np.flatnonzero(self.seller_codes >= 0)
+        self.rows_by_seller = valid[np.argsort(self.seller_codes[valid], kind='stable')]
+        counts = np.bincount(self.seller_codes[valid], minlength=len(self.sellers))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+        self.mask = np.zeros(len(df), dtype=bool)
+        self.sums = {name: np.zeros(len(self.sellers)) for name in self.values}
+        self.orders = np.zeros(len(self.sellers), dtype=np.int64)
+        self._lock = threading.Lock()
+
+    def update(self, row_mask):
+        """Resumen (como ``seller_summary``) de las filas de ``row_mask``."""
+        with self._lock:
+            touched = np.unique(self.seller_codes[row_mask != self.mask])
+            touched = touched[touched >= 0]
+            if len(touched):
+                counts = np.diff(self.offsets)[touched]
+                owners = np.repeat(np.arange(len(touched)), counts)
+                starts = self.offsets[touched] - np.cumsum(counts) + counts
+                rows = self.rows_by_seller[np.repeat(starts, counts) + np.arange(counts.sum())]
+                keep = row_mask[rows]
+                owners, rows = owners[keep], rows[keep]
+                for name, values in self.values.items():
+                    self.sums[name][touched] = np.bincount(owners, weights=values[rows], minlength=len(touched))
+                self.orders[touched] = _distinct_orders(owners, self.order_codes[rows], self.n_orders, len(touched))
+                self.mask = np.array(row_mask, dtype=bool)
+            return _summary_frame(self.sellers, self.sums, self.orders)
@@ -0,0 +1,49 @@
+"""Tablas compartidas de solo lectura entre sesiones.
+
+La app guarda las tablas base y las derivadas una sola vez por proceso
+(``st.cache_resource``) y todas las sesiones leen los mismos objetos.
+``freeze`` marca como de solo lectura los arrays que hay debajo de cada
+columna: una escritura in-place sobre una tabla compartida falla con
+``ValueError: assignment destination is read-only`` en lugar de cambiar los
+datos de todas las sesiones.
+
+Con ``pd.options.mode.copy_on_write`` activado (lo hace ``app_data``), los
+cortes y selecciones de una tabla congelada no copian nada hasta que se
+escriben; entonces se copia solo lo modificado y la tabla compartida no
+cambia.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _backing_arrays(array):
+    if isinstance(array, np.ndarray):
+        return [array]
+    # Fechas y categóricas (sus códigos) guardan un ndarray en _ndarray;
+    # los arrays con máscara (Int64, boolean) en _data y _mask
+    if isinstance(getattr(array, '_ndarray', None), np.ndarray):
+        return [array._ndarray]
+    return [a for a in (getattr(array, '_data', None), getattr(array, '_mask', None)) if isinstance(a, np.ndarray)]
+
+
+def freeze(obj):
+    """Marca ``obj`` como de solo lectura y lo devuelve.
+
+    Acepta DataFrames, Series, arrays de NumPy y diccionarios, tuplas o
+    listas de ellos (p. ej. el resultado de un builder que devuelve varias
+    tablas).
+    """
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        for array in obj._mgr.arrays:
+            for backing in _backing_arrays(array):
+                backing.flags.writeable = False
+    elif isinstance(obj, np.ndarray):
+        obj.flags.writeable = False
+    elif isinstance(obj, dict):
+        for value in obj.values():
+            freeze(value)
+    elif isinstance(obj, (tuple, list)):
+        for value in obj:
+            freeze(value)
+    return obj
+
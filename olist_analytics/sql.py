@@ -0,0 +1,395 @@
+"""Motor DuckDB opcional para agregar sin cargar las tablas en pandas.
+
+Registra cada tabla de Olist como una vista sobre sus ficheros (Parquet si
+existe, si no el CSV tipado según ``olist_analytics.schema``) y resuelve en
+SQL las consultas más pesadas del informe. DuckDB lee solo las columnas que
+usa cada consulta y puede volcar a disco las agregaciones que no caben en
+memoria; a pandas solo llegan los resultados, ya agregados.
+
+Cada tabla se busca en el directorio de datos como ``<nombre>.parquet``,
+``<nombre>/*.parquet`` (exportación particionada) o ``<nombre>.csv``. Los
+resultados tienen la misma forma que las funciones equivalentes de
+``customers``, ``delivery``, ``reviews`` y ``products``.
+
+Requiere ``pip install duckdb``. Se activa con ``OLIST_ENGINE=duckdb``.
+"""
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from olist_analytics import filters, schema
+
+ENV_VAR = "OLIST_ENGINE"
+
+# Nombre de la vista -> esquema de la tabla de Olist
+VIEWS = {
+    'orders': schema.ORDERS,
+    'customers': schema.CUSTOMERS,
+    'items': schema.ORDER_ITEMS,
+    'reviews': schema.ORDER_REVIEWS,
+    'sellers': schema.SELLERS,
+    'products': schema.PRODUCTS,
+    'category_translation': schema.CATEGORY_TRANSLATION,
+}
+
+SQL_TYPES = {
+    'str': 'VARCHAR',
+    'int8': 'TINYINT',
+    'int16': 'SMALLINT',
+    'float32': 'FLOAT',
+    'float64': 'DOUBLE',
+}
+
+# Mismas métricas por pedido que delivery.add_delivery_metrics
+# (.dt.days redondea hacia abajo, también los negativos)
+ORDER_FACTS_SQL = """
+CREATE OR REPLACE VIEW order_facts AS
+SELECT
+    o.*,
+    c.customer_unique_id,
+    c.customer_zip_code_prefix,
+    c.customer_city,
+    c.customer_state,
+    coalesce(o.order_delivered_customer_date > o.order_estimated_delivery_date, false) AS is_late,
+    floor(epoch(o.order_delivered_customer_date - o.order_estimated_delivery_date) / 86400) AS late_days,
+    epoch(o.order_approved_at - o.order_purchase_timestamp) / 3600 AS dispatch_time,
+    floor(epoch(o.order_delivered_customer_date - o.order_purchase_timestamp) / 86400) AS delivery_days
+FROM orders o
+JOIN customers c USING (customer_id)
+"""
+
+# Igual que facts.expand_review_items (filas distintas -> DISTINCT)
+REVIEW_ITEMS_SQL = """
+CREATE OR REPLACE VIEW review_items AS
+SELECT DISTINCT
+    r.order_id,
+    r.review_score,
+    i.product_id,
+    i.seller_id,
+    i.price,
+    i.freight_value,
+    round(i.price + i.freight_value, 2) AS "Total prize",
+    s.seller_zip_code_prefix,
+    s.seller_city,
+    s.seller_state,
+    t.product_category_name_english AS product_category_name
+FROM reviews r
+LEFT JOIN items i USING (order_id)
+LEFT JOIN sellers s USING (seller_id)
+LEFT JOIN products p USING (product_id)
+LEFT JOIN category_translation t ON p.product_category_name = t.product_category_name
+"""
+
+
+def is_enabled(value=None):
+    """True si ``value`` (o ``OLIST_ENGINE``) pide el motor DuckDB."""
+    value = os.environ.get(ENV_VAR) if value is None else value
+    return str(value).strip().lower() == "duckdb"
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _literal(text):
+    return "'" + text.replace("'", "''") + "'"
+
+
+def table_source(data_dir, table_schema):
+    """Expresión ``read_*`` de la tabla: Parquet si existe, si no el CSV."""
+    data_dir = Path(data_dir)
+    stem = Path(table_schema.filename).stem
+    columns = ", ".join(_quote(c) for c in table_schema.usecols)
+
+    parquet = data_dir / f"{stem}.parquet"
+    partitions = data_dir / stem
+    if parquet.exists():
+        return f"SELECT {columns} FROM read_parquet({_literal(str(parquet))})"
+    if partitions.is_dir():
+        return f"SELECT {columns} FROM read_parquet({_literal(str(partitions / '*.parquet'))}, union_by_name = true)"
+
+    types = {c: SQL_TYPES[t] for c, t in table_schema.dtypes.items()}
+    types.update({c: 'TIMESTAMP' for c in table_schema.dates})
+    types_sql = ", ".join(f"{_literal(c)}: {_literal(t)}" for c, t in types.items())
+    return (
+        f"SELECT {columns} FROM read_csv({_literal(str(data_dir / table_schema.filename))}, "
+        f"header = true, types = {{{types_sql}}}, "
+        f"timestampformat = {_literal(table_schema.date_format)})"
+    )
+
+
+def predicates_sql(predicates, source='review_items'):
+    """Consulta con las filas de ``source`` que cumplen los filtros de la barra lateral.
+
+    Igual que ``filters.combined_mask``: los predicados por fila van al
+    ``WHERE`` y ``SellerOrdersBetween`` cuenta pedidos distintos por vendedor
+    sobre las filas que ya los cumplen. Devuelve ``(sql, parámetros)``.
+    """
+    where, params, seller_orders = [], [], []
+    for predicate in predicates:
+        if isinstance(predicate, filters.IsIn):
+            where.append(f"list_contains(?::VARCHAR[], {_quote(predicate.column)})")
+            params.append([str(value) for value in predicate.values])
+        elif isinstance(predicate, filters.Between):
+            where.append(f"{_quote(predicate.column)} BETWEEN ? AND ?")
+            params.extend([predicate.low, predicate.high])
+        elif isinstance(predicate, filters.SellerOrdersBetween):
+            seller_orders.append(predicate)
+        else:
+            raise TypeError(f"predicado sin traducción a SQL: {predicate!r}")
+
+    sql = f"SELECT * FROM {source}" + (" WHERE " + " AND ".join(where) if where else "")
+    for predicate in seller_orders:
+        sql = (
+            f"SELECT * FROM ({sql}) WHERE seller_id IN ("
+            f"SELECT seller_id FROM ({sql}) GROUP BY seller_id "
+            f"HAVING count(DISTINCT order_id) BETWEEN ? AND ?)"
+        )
+        params = [*params, *params, predicate.low, predicate.high]
+    return sql, params
+
+
+class DuckDBEngine:
+    """Vistas de Olist sobre ``data_dir`` y las consultas de las secciones.
+
+    ``memory_limit`` (p. ej. ``"4GB"``) y ``temp_directory`` se pasan a
+    DuckDB: por encima del límite, las agregaciones usan ese directorio.
+    Se puede compartir entre hilos; cada consulta abre su propio cursor.
+    """
+
+    def __init__(self, data_dir, memory_limit=None, temp_directory=None):
+        try:
+            import duckdb
+        except ImportError as exc:
+            raise ImportError("el motor SQL requiere duckdb: pip install duckdb") from exc
+
+        self.data_dir = Path(data_dir)
+        self._con = duckdb.connect()
+        if memory_limit is not None:
+            self._con.execute(f"SET memory_limit = {_literal(memory_limit)}")
+        if temp_directory is not None:
+            self._con.execute(f"SET temp_directory = {_literal(str(temp_directory))}")
+        for name, table_schema in VIEWS.items():
+            self._con.execute(f"CREATE OR REPLACE VIEW {name} AS {table_source(self.data_dir, table_schema)}")
+        self._con.execute(ORDER_FACTS_SQL)
+        self._con.execute(REVIEW_ITEMS_SQL)
+
+    def query(self, sql, params=()):
+        """Ejecuta ``sql`` y devuelve el resultado como DataFrame."""
+        return self._con.cursor().execute(sql, list(params)).df()
+
+    def purchase_range(self):
+        """``(primera, última)`` fecha de compra."""
+        row = self.query(
+            "SELECT min(order_purchase_timestamp) AS lo, max(order_purchase_timestamp) AS hi FROM order_facts"
+        ).iloc[0]
+        return row['lo'], row['hi']
+
+    # ---- 4.1 ----
+    def customers_by_state(self, start, end):
+        """Como ``customers.customers_by_state`` sobre los pedidos del rango."""
+        result = self.query("""
+            SELECT customer_state, count(DISTINCT customer_unique_id) AS num_clientes
+            FROM order_facts
+            WHERE order_purchase_timestamp BETWEEN ? AND ? AND customer_state IS NOT NULL
+            GROUP BY customer_state
+            ORDER BY num_clientes DESC, customer_state
+        """, [start, end])
+        return result.set_index('customer_state')['num_clientes'].rename('customer_unique_id')
+
+    # ---- 4.2 ----
+    def city_summary(self, start, end):
+        """Como ``customers.city_summary``, directamente desde los pedidos del rango."""
+        result = self.query("""
+            WITH by_city AS (
+                SELECT
+                    customer_state,
+                    customer_city,
+                    count(DISTINCT customer_unique_id) AS num_clientes,
+                    count(*) AS num_pedidos,
+                    avg(delivery_days) AS entrega_prom_dias
+                FROM order_facts
+                WHERE order_purchase_timestamp BETWEEN ? AND ?
+                GROUP BY customer_state, customer_city
+            )
+            SELECT
+                customer_state,
+                customer_city,
+                num_clientes,
+                num_pedidos,
+                num_pedidos / sum(num_pedidos) OVER () * 100 AS porcentaje_pedidos,
+                num_pedidos / num_clientes AS ratio_pedidos_cliente,
+                entrega_prom_dias
+            FROM by_city
+            ORDER BY customer_state, customer_city
+        """, [start, end])
+        # round de DuckDB redondea los empates hacia fuera y pandas al par:
+        # se redondea aquí, con las mismas operaciones que customers.city_summary
+        return result.round({'porcentaje_pedidos': 2, 'ratio_pedidos_cliente': 2})
+
+    # ---- 4.3 ----
+    def late_orders_by_city(self, start, end):
+        """Como ``delivery.late_orders_by(pedidos, 'customer_city')``."""
+        result = self.query("""
+            SELECT
+                customer_city,
+                count(*) FILTER (WHERE is_late) AS late_orders,
+                avg(late_days) FILTER (WHERE is_late) AS avg_late_days,
+                count(*) AS total_orders,
+                count(*) FILTER (WHERE is_late) * 100.0 / count(*) AS late_percentage
+            FROM order_facts
+            WHERE order_purchase_timestamp BETWEEN ? AND ? AND customer_city IS NOT NULL
+            GROUP BY customer_city
+            HAVING count(*) FILTER (WHERE is_late) > 0
+            ORDER BY customer_city
+        """, [start, end])
+        return result.set_index('customer_city')
+
+    def late_orders_by_month(self, start, end):
+        """Como ``delivery.late_orders_by_month`` sobre los pedidos del rango."""
+        result = self.query("""
+            SELECT date_trunc('month', order_purchase_timestamp) AS order_purchase_timestamp, count(*) AS late_orders
+            FROM order_facts
+            WHERE order_purchase_timestamp BETWEEN ? AND ? AND is_late
+            GROUP BY 1
+            ORDER BY 1
+        """, [start, end])
+        return result.set_index('order_purchase_timestamp')
+
+    def late_share_by_state(self, start, end):
+        """Como ``delivery.late_share_by_state`` sobre los pedidos del rango."""
+        result = self.query("""
+            SELECT
+                customer_state,
+                count(*) AS late_orders,
+                count(*) / sum(count(*)) OVER () * 100 AS late_percentage
+            FROM order_facts
+            WHERE order_purchase_timestamp BETWEEN ? AND ? AND is_late AND customer_state IS NOT NULL
+            GROUP BY customer_state
+            ORDER BY customer_state
+        """, [start, end])
+        return result.set_index('customer_state')
+
+    def dispatch_time_by_lateness(self, start, end):
+        """Como ``delivery.dispatch_time_by_lateness`` sobre los pedidos del rango."""
+        row = self.query("""
+            SELECT
+                avg(dispatch_time) FILTER (WHERE NOT is_late) AS on_time,
+                avg(dispatch_time) FILTER (WHERE is_late) AS late
+            FROM order_facts
+            WHERE order_purchase_timestamp BETWEEN ? AND ? AND order_delivered_customer_date IS NOT NULL
+        """, [start, end]).iloc[0]
+        return pd.Series({'A Tiempo': row['on_time'], 'Tardío': row['late']}, name='dispatch_time', dtype=float)
+
+    # ---- 4.4 ----
+    def reviews_by_state(self, start, end):
+        """Como ``reviews.reviews_in_window``: reseñas creadas en el rango, sin pedidos tardíos."""
+        return self.query("""
+            SELECT
+                f.customer_state,
+                count(r.review_id) AS num_reviews,
+                round(avg(r.review_score), 2) AS score_medio
+            FROM reviews r
+            JOIN order_facts f USING (order_id)
+            WHERE date_trunc('day', r.review_creation_date) BETWEEN ? AND ?
+                AND NOT f.is_late
+                AND f.customer_state IS NOT NULL
+            GROUP BY f.customer_state
+            HAVING count(r.review_id) > 0
+            ORDER BY num_reviews DESC, f.customer_state
+        """, [start, end])
+
+    # ---- 4.5 ----
+    def filter_stats(self):
+        """Como ``filters.column_stats`` sobre la tabla reseñas × ítems completa."""
+        limits = self.query("""
+            SELECT
+                min(review_score) AS score_lo, max(review_score) AS score_hi,
+                min("Total prize") AS prize_lo, max("Total prize") AS prize_hi,
+                min(freight_value) AS freight_lo, max(freight_value) AS freight_hi
+            FROM review_items
+        """).iloc[0]
+        seller_orders = self.query("""
+            SELECT min(orders) AS lo, max(orders) AS hi
+            FROM (
+                SELECT count(DISTINCT order_id) AS orders
+                FROM review_items
+                WHERE seller_id IS NOT NULL AND order_id IS NOT NULL
+                GROUP BY seller_id
+            )
+        """).iloc[0]
+        states = self.query(
+            "SELECT DISTINCT seller_state FROM review_items WHERE seller_state IS NOT NULL ORDER BY seller_state"
+        )
+        return {
+            'seller_states': states['seller_state'].tolist(),
+            'review_score': (int(limits['score_lo']), int(limits['score_hi'])),
+            'Total prize': (float(limits['prize_lo']), float(limits['prize_hi'])),
+            'freight_value': (float(limits['freight_lo']), float(limits['freight_hi'])),
+            'seller_orders': (int(seller_orders['lo']), int(seller_orders['hi'])),
+        }
+
+    def top_sellers_by_score(self, predicates=(), n=10):
+        """Como ``products.top_sellers_by_score`` sobre la tabla filtrada."""
+        source, params = predicates_sql(predicates)
+        result = self.query(f"""
+            SELECT seller_id, avg(review_score) AS score
+            FROM ({source})
+            WHERE seller_id IS NOT NULL
+            GROUP BY seller_id
+            ORDER BY score DESC, seller_id
+            LIMIT {int(n)}
+        """, params)
+        return result.set_index('seller_id')['score'].rename('review_score')
+
+    def seller_revenue(self, predicates=(), n=10):
+        """Como ``products.seller_revenue`` sobre la tabla filtrada."""
+        source, params = predicates_sql(predicates)
+        result = self.query(f"""
+            SELECT seller_id, sum("Total prize") AS revenue
+            FROM ({source})
+            WHERE seller_id IS NOT NULL
+            GROUP BY seller_id
+            ORDER BY revenue DESC, seller_id
+            LIMIT {int(n)}
+        """, params)
+        return result.set_index('seller_id')['revenue'].rename('Total prize')
+
+    def review_score_distribution(self, predicates=()):
+        """Como ``products.review_score_distribution`` sobre la tabla filtrada."""
+        source, params = predicates_sql(predicates)
+        result = self.query(f"""
+            SELECT review_score, count(*) AS count
+            FROM ({source})
+            WHERE review_score IS NOT NULL
+            GROUP BY review_score
+            ORDER BY review_score
+        """, params)
+        return result.set_index('review_score')['count']
+
+    def top_categories(self, predicates=(), n=10):
+        """Como ``products.top_categories`` sobre la tabla filtrada."""
+        source, params = predicates_sql(predicates)
+        result = self.query(f"""
+            SELECT product_category_name, count(*) AS count
+            FROM ({source})
+            WHERE product_category_name IS NOT NULL
+            GROUP BY product_category_name
+            ORDER BY count DESC, product_category_name
+            LIMIT {int(n)}
+        """, params)
+        return result.set_index('product_category_name')['count']
+
+    def shipping_cost_by_category(self, predicates=(), n=10):
+        """Como ``products.shipping_cost_by_category`` sobre la tabla filtrada."""
+        source, params = predicates_sql(predicates)
+        result = self.query(f"""
+            SELECT product_category_name, avg(freight_value) AS freight_value
+            FROM ({source})
+            WHERE product_category_name IS NOT NULL
+            GROUP BY product_category_name
+            ORDER BY freight_value DESC, product_category_name
+            LIMIT {int(n)}
+        """, params)
+        return result.set_index('product_category_name')['freight_value']
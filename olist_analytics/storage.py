@@ -0,0 +1,122 @@
+"""Snapshots columnares (Arrow IPC) de los CSV de Olist.
+
+Cada CSV de ``Olist_Data/`` se convierte una vez en un fichero Arrow IPC sin
+comprimir dentro de ``Olist_Data/_snapshots/``, ya tipado según
+``olist_analytics.schema``. El snapshot guarda en sus metadatos la huella
+(mtime, tamaño y esquema) del CSV de origen y se reconstruye solo cuando esa
+huella cambia.
+
+Uso desde línea de comandos para pre-generar todos los snapshots::
+
+    python -m olist_analytics.storage [directorio_de_datos]
+"""
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+
+from olist_analytics import schema
+
+SNAPSHOT_DIRNAME = "_snapshots"
+FINGERPRINT_KEY = b"olist.source_fingerprint"
+
+
+def fingerprint(path):
+    path = Path(path)
+    stat = path.stat()
+    table_schema = schema.TABLES.get(path.name)
+    signature = table_schema.signature() if table_schema is not None else "-"
+    return f"{stat.st_mtime_ns}:{stat.st_size}:{signature}"
+
+
+def read_csv(csv_path):
+    """Lee un CSV de Olist aplicando tipos, columnas y formato de fecha del esquema."""
+    table_schema = schema.TABLES.get(Path(csv_path).name)
+    if table_schema is None:
+        return pd.read_csv(csv_path)
+
+    dtypes = dict(table_schema.dtypes)
+    dtypes.update({c: "str" for c in table_schema.dates})
+    df = pd.read_csv(csv_path, usecols=table_schema.usecols, dtype=dtypes)
+    for column in table_schema.dates:
+        df[column] = pd.to_datetime(df[column], format=table_schema.date_format)
+    return df
+
+
+def snapshot_path(csv_path):
+    csv_path = Path(csv_path)
+    return csv_path.parent / SNAPSHOT_DIRNAME / f"{csv_path.stem}.arrow"
+
+
+def _snapshot_fingerprint(path):
+    try:
+        with pa.memory_map(str(path), "r") as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    value = metadata.get(FINGERPRINT_KEY)
+    return value.decode() if value is not None else None
+
+
+def build_snapshot(csv_path):
+    """Lee el CSV y escribe su snapshot Arrow de forma atómica."""
+    csv_path = Path(csv_path)
+    target = snapshot_path(csv_path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    source_fingerprint = fingerprint(csv_path)
+    df = read_csv(csv_path)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[FINGERPRINT_KEY] = source_fingerprint.encode()
+    table = table.replace_schema_metadata(metadata)
+
+    # Escribir en un temporal y renombrar: otra sesión nunca ve un fichero a medias
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    with pa.OSFile(str(tmp), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, target)
+    return target
+
+
+def ensure_snapshot(csv_path):
+    """Devuelve la ruta del snapshot, reconstruyéndolo si el CSV ha cambiado."""
+    target = snapshot_path(csv_path)
+    if _snapshot_fingerprint(target) != fingerprint(csv_path):
+        build_snapshot(csv_path)
+    return target
+
+
+def read_snapshot(path):
+    # memory_map evita copiar el fichero a memoria al leer las columnas numéricas
+    with pa.memory_map(str(path), "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas()
+
+
+def load_table(csv_path):
+    """Carga una tabla de Olist desde su snapshot, generándolo si hace falta.
+
+    Si el snapshot no se puede escribir (p. ej. directorio de solo lectura) se
+    lee el CSV directamente.
+    """
+    try:
+        target = ensure_snapshot(csv_path)
+    except OSError:
+        return read_csv(csv_path)
+    return read_snapshot(target)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    data_dir = Path(argv[0]) if argv else Path(__file__).resolve().parent.parent / "Olist_Data"
+    for csv_path in sorted(data_dir.glob("*.csv")):
+        target = ensure_snapshot(csv_path)
+        print(f"{csv_path.name} -> {target.relative_to(data_dir)}")
+
+
+if __name__ == "__main__":
+    main()
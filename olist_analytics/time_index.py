@@ -0,0 +1,26 @@
+"""Acceso por rango de fechas sobre tablas ordenadas por una columna temporal.
+
+Las tablas se ordenan una vez al construirlas; a partir de ahí cualquier
+rango ``[start, end]`` se resuelve con dos búsquedas binarias y un
+``iloc`` por posición, que no copia los datos.
+"""
+import pandas as pd
+
+
+def sort_by_time(df, column):
+    """Ordena por ``column`` (estable, NaT al final) y reinicia el índice."""
+    return df.sort_values(column, kind='stable', na_position='last').reset_index(drop=True)
+
+
+def time_bounds(df, column, start, end):
+    """Posiciones ``(lo, hi)`` de las filas con ``start <= df[column] <= end``."""
+    values = df[column].to_numpy()
+    lo = values.searchsorted(pd.Timestamp(start).to_datetime64(), side='left')
+    hi = values.searchsorted(pd.Timestamp(end).to_datetime64(), side='right')
+    return int(lo), int(hi)
+
+
+def time_slice(df, column, start, end):
+    """Filas de ``df`` (ordenado por ``column``) dentro de ``[start, end]``."""
+    lo, hi = time_bounds(df, column, start, end)
+    return df.iloc[lo:hi]
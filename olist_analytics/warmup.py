@@ -0,0 +1,139 @@
+"""Calentamiento de cachés al arrancar el proceso.
+
+La app lanza una vez por proceso un hilo que llama a sus funciones cacheadas
+para la vista por defecto y para una lista de presets, de modo que el primer
+visitante (o el health check) no paga el camino en frío; ``serve.py`` lo
+lanza antes de que el servidor acepte sesiones. El resumen y los errores van
+al logger ``olist_analytics.warmup`` y, con ``OLIST_PROFILE=1``, cada paso se
+añade al log de perfilado (ver ``profiling``). Los presets se
+configuran con ``OLIST_WARMUP`` como una lista separada por comas:
+
+- ``full``: rango de fechas completo (la vista por defecto).
+- ``years``: cada año natural.
+- ``quarters``: cada trimestre.
+- ``states``: detalle por ciudad de los 5 estados con más clientes.
+
+Por defecto ``full,years,states``; ``OLIST_WARMUP=0`` lo desactiva.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+
+from olist_analytics import profiling
+
+ENV_VAR = "OLIST_WARMUP"
+DEFAULT_PRESETS = ("full", "years", "states")
+PRESETS = ("full", "years", "quarters", "states")
+_OFF = {"", "0", "off", "false", "no"}
+
+_logger = logging.getLogger(__name__)
+
+
+def parse_presets(value=None):
+    """Presets pedidos en ``value`` (o en ``OLIST_WARMUP``); vacío si está desactivado."""
+    value = os.environ.get(ENV_VAR) if value is None else value
+    if value is None:
+        return DEFAULT_PRESETS
+    if value.strip().lower() in _OFF:
+        return ()
+    presets = tuple(p.strip().lower() for p in value.split(",") if p.strip())
+    unknown = [p for p in presets if p not in PRESETS]
+    if unknown:
+        raise ValueError(f"presets de calentamiento desconocidos: {', '.join(unknown)} (válidos: {', '.join(PRESETS)})")
+    return presets
+
+
+def day_window(start_day, end_day):
+    """``(inicio, fin)`` tal como lo construye la barra lateral: el día final completo."""
+    start = pd.Timestamp(start_day).normalize()
+    end = pd.Timestamp(end_day).normalize() + pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')
+    return start, end
+
+
+def date_windows(first, last, presets):
+    """Rangos ``(etiqueta, inicio, fin)`` de los presets de fechas entre ``first`` y ``last``.
+
+    Cada periodo se recorta a los límites del selector de fechas, igual que
+    haría un usuario que elige ese año o trimestre.
+    """
+    first, last = pd.Timestamp(first).normalize(), pd.Timestamp(last).normalize()
+    windows = []
+    if "full" in presets:
+        windows.append(("completo", *day_window(first, last)))
+    for preset, freq in (("years", "Y"), ("quarters", "Q")):
+        if preset not in presets:
+            continue
+        for period in pd.period_range(first, last, freq=freq):
+            start = max(period.start_time.normalize(), first)
+            end = min(period.end_time.normalize(), last)
+            windows.append((str(period), *day_window(start, end)))
+    return windows
+
+
+class Warmup:
+    """Ejecuta ``steps`` (pares ``(etiqueta, función)``) y mide cada uno.
+
+    Un paso que falla se anota en ``errors`` y no detiene los siguientes.
+    """
+
+    def __init__(self, steps):
+        self.steps = list(steps)
+        self.timings = []
+        self.errors = []
+        self.seconds = None
+        self._thread = None
+        self._stopping = False
+
+    def run(self):
+        # Con OLIST_PROFILE, cada paso (con los bloques de las funciones que
+        # llama) se añade al log de perfilado como ejecución "calentamiento"
+        profiler = profiling.start("calentamiento") if self.steps and profiling.is_enabled() else None
+        started = time.perf_counter()
+        try:
+            for label, func in self.steps:
+                if self._stopping:
+                    break
+                t0 = time.perf_counter()
+                try:
+                    with profiling.block(label):
+                        func()
+                except Exception as exc:
+                    self.errors.append((label, repr(exc)))
+                    _logger.warning("calentamiento de cachés: error en %s: %r", label, exc)
+                    continue
+                self.timings.append((label, round(time.perf_counter() - t0, 3)))
+        finally:
+            if profiler is not None:
+                profiling.finish(profiler)
+        self.seconds = round(time.perf_counter() - started, 3)
+        if self.steps:
+            _logger.info(
+                "calentamiento de cachés: %d/%d pasos en %.1f s", len(self.timings), len(self.steps), self.seconds
+            )
+        return self
+
+    def start(self):
+        """Lanza ``run`` en un hilo en segundo plano y devuelve ``self``."""
+        self._thread = threading.Thread(target=self.run, name="olist-warmup", daemon=True)
+        self._thread.start()
+        # Al salir del proceso no se corta el hilo a mitad de un paso: cortado
+        # dentro de una consulta de DuckDB, el proceso aborta
+        atexit.register(self.stop)
+        return self
+
+    def stop(self):
+        """Salta los pasos pendientes y espera a que acabe el que está en curso."""
+        self._stopping = True
+        if self._thread is not None:
+            self._thread.join()
+
+    @property
+    def done(self):
+        return self.seconds is not None
+
+    def frame(self):
+        return pd.DataFrame(self.timings, columns=["paso", "seconds"])
@@ -0,0 +1,40 @@
+"""Arranca la app con el calentamiento de cachés ya en marcha.
+
+    python serve.py [opciones de streamlit run]
+
+Equivale a ``streamlit run main.py`` y acepta las mismas opciones (p. ej.
+``--server.port 8502``) y variables ``STREAMLIT_*``, pero antes de que el
+servidor acepte sesiones calcula la carga en frío (tablas, rango de fechas y
+límites de los filtros) y lanza el hilo de ``OLIST_WARMUP`` sobre las mismas
+funciones cacheadas de ``app_data`` que usa la app. El resumen del calentamiento sale
+en el log del servidor.
+"""
+import logging
+import sys
+from pathlib import Path
+
+from streamlit.web import cli
+
+from olist_analytics import warmup
+
+MAIN_SCRIPT = Path(__file__).resolve().parent / "main.py"
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    # Sin runtime todavía, st.cache_data avisa al registrar cada función de
+    # app_data de que guarda en memoria; es el mismo almacenamiento que usa el
+    # servidor sin persist
+    logging.getLogger("streamlit.runtime.caching.cache_data_api").setLevel(logging.ERROR)
+    import app_data
+    # La primera llamada calcula rango_y_filtros en este hilo y deja el resto
+    # de pasos en segundo plano; las sesiones reciben el mismo Warmup
+    app_data.iniciar_calentamiento(app_data.current_table_keys(), warmup.parse_presets())
+    # El servidor (streamlit run, que acaba en bootstrap.run) solo acepta
+    # sesiones a partir de aquí
+    cli.main(["run", str(MAIN_SCRIPT), *argv], prog_name="streamlit")
+
+
+if __name__ == "__main__":
+    main()
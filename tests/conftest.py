@@ -0,0 +1,89 @@
+"""Datos de prueba: una muestra sintética pequeña con los casos límite del dataset real.
+
+Las pruebas comparan las estructuras precalculadas de ``olist_analytics`` con
+los merges de pandas que hacía el informe original, leídos de los mismos CSV
+sin codificar (``storage.read_csv``).
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks import synthetic
+from olist_analytics import report, storage
+
+SCALE = 0.02
+SEED = 7
+
+
+def _with_edge_cases(tables):
+    """Añade a las tablas sintéticas los casos que los merges originales tratan aparte."""
+    rng = np.random.default_rng(SEED)
+    items = tables['olist_order_items_dataset.csv']
+    reviews = tables['olist_order_reviews_dataset.csv']
+    products = tables['olist_products_dataset.csv']
+
+    # Ítems repetidos con otro order_item_id: filas iguales tras el merge (drop_duplicates)
+    repeated = items.sample(40, random_state=SEED).assign(order_item_id=lambda df: df['order_item_id'] + 100)
+    # Ítems de un producto y de un vendedor que no existen
+    unknown = items.sample(10, random_state=SEED + 1).assign(
+        order_item_id=200, product_id='0' * 32, seller_id='f' * 32,
+    )
+    # Pedidos con reseña y sin ítems
+    without_items = reviews['order_id'].sample(15, random_state=SEED).to_numpy()
+    items = pd.concat([items[~items['order_id'].isin(without_items)], repeated, unknown], ignore_index=True)
+
+    # Reseñas repetidas (misma puntuación), reseñas con otra puntuación y una de un pedido desconocido
+    same_score = reviews.sample(20, random_state=SEED).assign(review_id=lambda df: df['review_id'].str[::-1])
+    other_score = reviews.sample(20, random_state=SEED + 1).assign(
+        review_id=lambda df: 'a' + df['review_id'].str[1:],
+        review_score=lambda df: df['review_score'] % 5 + 1,
+    )
+    orphan = reviews.head(1).assign(review_id='e' * 32, order_id='d' * 32)
+    reviews = pd.concat([reviews, same_score, other_score, orphan], ignore_index=True)
+
+    # Categorías sin traducción y productos sin categoría
+    products = products.copy()
+    untranslated = rng.choice(len(products), 15, replace=False)
+    products.loc[untranslated[:10], 'product_category_name'] = 'categoria_sem_traducao'
+    products.loc[untranslated[10:], 'product_category_name'] = np.nan
+
+    return {
+        **tables,
+        'olist_order_items_dataset.csv': items,
+        'olist_order_reviews_dataset.csv': reviews,
+        'olist_products_dataset.csv': products,
+    }
+
+
+@pytest.fixture(scope='session')
+def data_dir(tmp_path_factory):
+    out_dir = tmp_path_factory.mktemp('olist')
+    for filename, table in _with_edge_cases(synthetic.generate_tables(SCALE, SEED)).items():
+        table.to_csv(out_dir / filename, index=False)
+    pd.read_csv(synthetic.TRANSLATION_CSV).to_csv(out_dir / synthetic.TRANSLATION_CSV.name, index=False)
+    return out_dir
+
+
+@pytest.fixture(scope='session')
+def raw(data_dir):
+    """Tablas tipadas sin codificar, por nombre corto, como las leía el informe original."""
+    return {name: storage.read_csv(data_dir / filename) for name, filename in report.TABLE_FILES.items()}
+
+
+@pytest.fixture(scope='session')
+def tables(data_dir):
+    return report.load_tables(data_dir)
+
+
+@pytest.fixture(scope='session')
+def derived(tables):
+    return report.build_derived(tables)
+
+
+@pytest.fixture(scope='session')
+def merged_orders(raw):
+    """Pedidos ⋈ clientes con ``is_late``, el ``df`` del informe original."""
+    df = pd.merge(raw['orders'], raw['customers'], on='customer_id')
+    df['is_late'] = df['order_delivered_customer_date'] > df['order_estimated_delivery_date']
+    return df
+
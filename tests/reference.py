@@ -0,0 +1,163 @@
+"""Rutas de referencia: los merges de pandas del ``main.py`` original.
+
+Reciben las tablas sin codificar de ``storage.read_csv`` (fixture ``raw``) y
+el ``df`` de pedidos ⋈ clientes (fixture ``merged_orders``), y devuelven lo
+mismo que calculaba el informe antes de las tablas de hechos, los índices y
+los sketches.
+"""
+import pandas as pd
+
+from olist_analytics import encoding
+
+# Rangos de compra de las pruebas (días completos, ver ``warmup.day_window``):
+# todo el periodo, varios meses con extremos a mitad de mes, un mes justo y
+# dos semanas dentro de un mes
+WINDOWS = [
+    ('2016-09-04', '2018-09-03'),
+    ('2017-03-15', '2017-11-20'),
+    ('2017-06-01', '2017-06-30'),
+    ('2018-01-10', '2018-01-24'),
+]
+
+
+def sorted_rows(df):
+    """``df`` con columnas y filas en orden canónico, para comparar tablas como conjuntos de filas."""
+    df = df[sorted(df.columns)].reset_index(drop=True)
+    df = df.astype({c: object for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)})
+    return df.sort_values(list(df.columns), na_position='first', kind='stable').reset_index(drop=True)
+
+
+def decoded(results):
+    """Resultados de ``report.build_report`` sin categóricas, como los muestra la app."""
+    return {name: encoding.decode(result) for name, result in results.items()}
+
+
+def orders_in_window(merged_orders, start, end):
+    """``filtered_df``: pedidos comprados en ``[start, end]``."""
+    purchase = merged_orders['order_purchase_timestamp']
+    return merged_orders[(purchase >= start) & (purchase <= end)]
+
+
+def customers_by_state(orders):
+    """Clientes distintos por estado (sección 4.1)."""
+    return orders.groupby('customer_state')['customer_unique_id'].nunique().sort_values(ascending=False)
+
+
+def late_orders_by_city(orders):
+    """``late_orders`` por ciudad (sección 4.3)."""
+    late_df = orders[orders['order_delivered_customer_date'] > orders['order_estimated_delivery_date']]
+    late_orders = late_df.groupby('customer_city').size().rename('late_orders').to_frame()
+    late_orders['avg_late_days'] = (
+        (late_df['order_delivered_customer_date'] - late_df['order_estimated_delivery_date']).dt.days
+    ).groupby(late_df['customer_city']).mean()
+    late_orders['total_orders'] = orders.groupby('customer_city').size()
+    late_orders['late_percentage'] = (late_orders['late_orders'] / late_orders['total_orders']) * 100
+    return late_orders.dropna()
+
+
+def orders_with_products(orders, raw):
+    """``df_orders_with_items_products``: pedidos ⋈ ítems ⋈ productos (sección 4.3)."""
+    items_with_products = pd.merge(raw['items'], raw['products'], on='product_id', how='inner')
+    return pd.merge(orders, items_with_products, on='order_id', how='inner')
+
+
+def reviews_by_state(raw, merged_orders, start, end, include_late=False):
+    """``df_4`` (sección 4.4) con las reseñas creadas en ``[start, end]``.
+
+    Sin ``include_late`` quita las reseñas de pedidos entregados con retraso,
+    como hace la app.
+    """
+    reviewed = pd.merge(raw['reviews'], merged_orders[['order_id', 'customer_state', 'is_late']], on='order_id', how='left')
+    day = reviewed['review_creation_date'].dt.normalize()
+    reviewed = reviewed[(day >= start) & (day <= end)]
+    if not include_late:
+        reviewed = reviewed[reviewed['is_late'].eq(False)]
+    by_state = reviewed.groupby('customer_state').agg(
+        num_reviews=('review_id', 'count'),
+        score_medio=('review_score', 'mean'),
+    ).reset_index()
+    by_state['score_medio'] = by_state['score_medio'].round(2)
+    return by_state.sort_values(by='num_reviews', ascending=False)
+
+
+def review_items(raw):
+    """``df_5``: reseñas × ítems × vendedores × categorías (sección 4.5)."""
+    items_5 = raw['items'][['order_id', 'product_id', 'seller_id', 'price', 'freight_value']].copy()
+    items_5['Total prize'] = (items_5['price'].astype(float) + items_5['freight_value'].astype(float)).round(2)
+
+    product_category_5 = pd.merge(
+        raw['products'][['product_id', 'product_category_name']], raw['category_translation'],
+        on='product_category_name', how='left',
+    )
+    product_category_5 = product_category_5[['product_id', 'product_category_name_english']]
+    product_category_5 = product_category_5.rename(columns={'product_category_name_english': 'product_category_name'})
+
+    df_5 = pd.merge(raw['reviews'][['order_id', 'review_score']], items_5, on='order_id', how='left')
+    df_5 = pd.merge(df_5, raw['sellers'], on='seller_id', how='left')
+    df_5 = pd.merge(df_5, product_category_5, on='product_id', how='left')
+    return df_5.drop_duplicates()
+
+
+def first_items(raw):
+    """Primer ítem de cada pedido (por producto, vendedor, precio y envío) con su categoría en portugués."""
+    items = raw['items'].sort_values(['order_id', 'product_id', 'seller_id', 'price', 'freight_value'], kind='stable')
+    items = items.drop_duplicates('order_id')[['order_id', 'product_id', 'seller_id']]
+    return pd.merge(items, raw['products'][['product_id', 'product_category_name']], on='product_id', how='left')
+
+
+def primary_payments(raw):
+    """Pago de mayor importe de cada pedido (el primero en la tabla si empatan)."""
+    payments = raw['payments'].sort_values('payment_value', ascending=False, kind='stable')
+    return payments.drop_duplicates('order_id')[['order_id', 'payment_type']]
+
+
+def filter_review_items(df_5, states=None, score=None, price=None, freight=None, orders=None):
+    """Filtros de la barra lateral sobre ``df_5``, en el orden del informe original.
+
+    Cada filtro es un rango ``(mínimo, máximo)`` (o los estados del vendedor);
+    None lo deja sin aplicar. ``orders`` filtra por pedidos distintos del
+    vendedor en la tabla ya filtrada.
+    """
+    if states is not None:
+        df_5 = df_5[df_5['seller_state'].isin(states)]
+    for column, bounds in (('review_score', score), ('Total prize', price), ('freight_value', freight)):
+        if bounds is not None:
+            df_5 = df_5[(df_5[column] >= bounds[0]) & (df_5[column] <= bounds[1])]
+    if orders is not None:
+        order_count = df_5.groupby('seller_id')['order_id'].nunique()
+        kept = order_count[(order_count >= orders[0]) & (order_count <= orders[1])]
+        df_5 = df_5[df_5['seller_id'].isin(kept.index)]
+    return df_5
+
+
+def late_orders_by_seller(orders_with_items):
+    """``seller_analysis``: ítems tardíos y totales por vendedor (sección 4.3)."""
+    late = orders_with_items[
+        orders_with_items['order_delivered_customer_date'] > orders_with_items['order_estimated_delivery_date']
+    ]
+    seller_analysis = late.groupby('seller_id').size().rename('late_orders').to_frame().join(
+        orders_with_items.groupby('seller_id').size().rename('total_orders').to_frame(), how='inner',
+    )
+    seller_analysis['late_percentage'] = (seller_analysis['late_orders'] / seller_analysis['total_orders']) * 100
+    return seller_analysis.sort_values(by='late_percentage', ascending=False)
+
+
+def order_drivers(merged_orders, raw):
+    """Pedidos entregados ⋈ primer ítem ⋈ pago principal, con las etapas de la entrega (sección 4.3)."""
+    delivered = merged_orders[merged_orders['order_delivered_customer_date'].notna()]
+    drivers = delivered.assign(
+        dispatch_time=(delivered['order_approved_at'] - delivered['order_purchase_timestamp']).dt.total_seconds() / 3600,
+        handoff_time=(
+            (delivered['order_delivered_carrier_date'] - delivered['order_approved_at']).dt.total_seconds() / 3600
+        ),
+        transit_days=(
+            (delivered['order_delivered_customer_date'] - delivered['order_delivered_carrier_date'])
+            .dt.total_seconds() / 86400
+        ),
+        estimated_days=(
+            (delivered['order_estimated_delivery_date'] - delivered['order_purchase_timestamp'])
+            .dt.total_seconds() / 86400
+        ),
+    )
+    drivers = pd.merge(drivers, first_items(raw)[['order_id', 'seller_id', 'product_category_name']], on='order_id', how='left')
+    return pd.merge(drivers, primary_payments(raw), on='order_id', how='left')
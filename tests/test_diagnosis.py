@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import reference
+from olist_analytics import diagnosis, encoding, warmup
+from olist_analytics.time_index import time_slice
+
+COMPARED = [
+    'order_id', 'customer_city', 'is_late', 'dispatch_time', 'handoff_time', 'transit_days', 'estimated_days',
+    'seller_id', 'product_category_name', 'payment_type',
+]
+
+
+@pytest.fixture(scope='module')
+def expected_drivers(merged_orders, raw):
+    return reference.order_drivers(merged_orders, raw)
+
+
+@pytest.fixture(params=reference.WINDOWS, ids=lambda window: '_'.join(window))
+def window(request):
+    return warmup.day_window(*request.param)
+
+
+def _by_order(df):
+    return encoding.decode(df)[COMPARED].sort_values('order_id').reset_index(drop=True)
+
+
+def test_order_drivers_match_merge(derived, expected_drivers):
+    drivers = derived['order_drivers']
+    assert drivers['order_purchase_timestamp'].is_monotonic_increasing
+    # Hay pedidos entregados sin ítems y con un primer ítem de producto desconocido
+    assert expected_drivers['seller_id'].isna().any() and expected_drivers['product_category_name'].isna().any()
+    pd.testing.assert_frame_equal(_by_order(drivers), _by_order(expected_drivers), check_dtype=False)
+
+
+def test_diagnose_matches_groupbys(derived, expected_drivers, window):
+    start, end = window
+    result = encoding.decode(diagnosis.diagnose(time_slice(derived['order_drivers'], 'order_purchase_timestamp', start, end)))
+    purchase = expected_drivers['order_purchase_timestamp']
+    drivers = expected_drivers[(purchase >= start) & (purchase <= end)]
+    late = drivers[drivers['is_late']]
+
+    late_by_payment = drivers.groupby('payment_type')['is_late'].mean() * 100
+    pd.testing.assert_series_equal(
+        encoding.decode(result['late_by_payment']).sort_index(), late_by_payment.sort_index(),
+        check_names=False, check_index_type=False,
+    )
+    category_dispatch = late.groupby('product_category_name')['dispatch_time'].mean().sort_values(ascending=False).head(5)
+    pd.testing.assert_series_equal(
+        encoding.decode(result['category_dispatch']), category_dispatch, check_names=False, check_index_type=False,
+    )
+    stages = ['dispatch_time', 'handoff_time', 'transit_days', 'estimated_days']
+    stage_means = drivers.groupby('is_late')[stages].mean().rename(index={False: 'A Tiempo', True: 'Tardío'})
+    pd.testing.assert_frame_equal(result['stage_means'], stage_means)
+
+    causes = result['causes']
+    assert set(causes.index) == set(diagnosis.FACTORS.values())
+    assert ((causes >= 0) & (causes <= len(late))).all()
+
+
+def test_causes_by_city_counts_match_groupby(derived, expected_drivers):
+    drivers = derived['order_drivers']
+    by_city = encoding.decode(diagnosis.causes_by_city(drivers, diagnosis.exposures(drivers), min_late=1))
+    counts = expected_drivers.groupby('customer_city')['is_late'].agg(late_orders='sum', total_orders='size')
+    counts = counts[counts['late_orders'] >= 1]
+    pd.testing.assert_frame_equal(
+        by_city[['late_orders', 'total_orders']].sort_index(), counts.sort_index(),
+        check_dtype=False, check_index_type=False, check_names=False,
+    )
+    assert (by_city['retrasos_explicados'] <= by_city['late_orders']).all()
+    assert by_city['causa_principal'].isin([*diagnosis.FACTORS.values(), 'Sin causa dominante']).all()
+
+
+def test_explained_late_orders():
+    factors = list(diagnosis.FACTORS)
+    counts = pd.DataFrame({'total': [10, 10], 'late': [4, 8]}, index=['a', 'b'])
+    for factor in factors:
+        counts[factor] = 0
+        counts[f"{factor}_late"] = 0
+    # En 'a', 4 de 5 pedidos con despacho lento llegan tarde frente a 0 de 5 sin él
+    counts.loc['a', ['dispatch', 'dispatch_late']] = [5, 4]
+    # Todos los pedidos de 'b' son de un vendedor de riesgo: la tasa de
+    # referencia es la de los no expuestos de todo el rango (4 de 10)
+    counts.loc['b', ['seller', 'seller_late']] = [10, 8]
+    explained = diagnosis.explained_late_orders(counts)
+    np.testing.assert_allclose(explained.loc['a', diagnosis.FACTORS['dispatch']], 5 * (4 / 5 - 0 / 5))
+    assert (explained.drop(columns=diagnosis.FACTORS['dispatch']).loc['a'] == 0).all()
+    np.testing.assert_allclose(explained.loc['b', diagnosis.FACTORS['seller']], 10 * (8 / 10 - 4 / 10))
+    assert explained.loc['b'].sum() == explained.loc['b', diagnosis.FACTORS['seller']]
@@ -0,0 +1,24 @@
+import pandas as pd
+
+from olist_analytics import encoding
+
+
+def test_decoded_tables_match_csv(tables, raw):
+    for name, table in tables.items():
+        pd.testing.assert_frame_equal(encoding.decode(table), raw[name], check_dtype=False, obj=name)
+
+
+def test_shared_columns_have_one_dtype(tables):
+    dtypes = {}
+    for name, table in tables.items():
+        for column in encoding.ENCODED_COLUMNS:
+            if column in table.columns:
+                assert isinstance(table[column].dtype, pd.CategoricalDtype), (name, column)
+                assert dtypes.setdefault(column, table[column].dtype) == table[column].dtype, (name, column)
+
+
+def test_merge_on_codes_matches_merge_on_strings(tables, raw):
+    # Las claves categóricas con el mismo diccionario unen igual que las cadenas
+    encoded = pd.merge(tables['reviews'], tables['orders'], on='order_id', how='left')
+    expected = pd.merge(raw['reviews'], raw['orders'], on='order_id', how='left')
+    pd.testing.assert_frame_equal(encoding.decode(encoded), expected, check_dtype=False)
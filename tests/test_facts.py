@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+import reference
+from olist_analytics import delivery, encoding, facts, warmup
+from olist_analytics.time_index import time_slice
+from reference import sorted_rows
+
+
+def test_expand_review_items_matches_merge(derived, raw):
+    result = encoding.decode(facts.expand_review_items(derived['item_facts']))
+    expected = reference.review_items(raw)
+    # La muestra tiene pedidos sin ítems, ítems sin vendedor y categorías sin traducción
+    assert expected['product_id'].isna().any() and expected['seller_state'].isna().any()
+    assert expected['product_category_name'].isna().sum() > expected['product_id'].isna().sum()
+    assert sorted(result.columns) == sorted(expected.columns)
+    assert len(result) == len(expected)
+    pd.testing.assert_frame_equal(sorted_rows(result), sorted_rows(expected), check_dtype=False)
+
+
+@pytest.mark.parametrize('window', reference.WINDOWS, ids=lambda window: '_'.join(window))
+def test_order_items_match_merge(derived, raw, merged_orders, window):
+    start, end = warmup.day_window(*window)
+    orders = time_slice(derived['order_facts'], 'order_purchase_timestamp', start, end)
+    result = encoding.decode(facts.order_items(derived['item_facts'], orders))
+    expected = reference.orders_with_products(reference.orders_in_window(merged_orders, start, end), raw)
+    columns = ['order_id', *facts.ITEM_COLUMNS, 'product_category_name', 'is_late']
+    pd.testing.assert_frame_equal(sorted_rows(result[columns]), sorted_rows(expected[columns]), check_dtype=False)
+
+    by_category = encoding.decode(delivery.late_percentage_by_category(facts.order_items(derived['item_facts'], orders)))
+    expected_by_category = (
+        expected[expected['is_late']].groupby('product_category_name').size()
+        / expected.groupby('product_category_name').size()
+    ) * 100
+    pd.testing.assert_series_equal(
+        by_category.sort_index(), expected_by_category.sort_index(), check_names=False, check_index_type=False,
+    )
@@ -0,0 +1,40 @@
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+import reference
+from olist_analytics import report, warmup
+
+
+@pytest.fixture(scope='module', params=reference.WINDOWS, ids=lambda window: '_'.join(window))
+def window(request):
+    return warmup.day_window(*request.param)
+
+
+def test_report_does_not_import_streamlit():
+    code = "import sys, olist_analytics.report; sys.exit('streamlit' in sys.modules)"
+    assert subprocess.run([sys.executable, '-c', code]).returncode == 0
+
+
+def test_build_report_covers_every_section(tables, derived, window):
+    results = report.build_report(tables, derived, *window)
+    for name in ('clientes_por_estado', 'city_summary', 'late_orders', 'reviews_by_state', 'top_sellers'):
+        assert len(results[name]), name
+
+
+def test_customers_by_state_matches_merge(tables, derived, merged_orders, window):
+    results = reference.decoded(report.build_report(tables, derived, *window))
+    expected = reference.customers_by_state(reference.orders_in_window(merged_orders, *window))
+    pd.testing.assert_series_equal(
+        results['clientes_por_estado'].sort_index(), expected.sort_index(), check_index_type=False,
+    )
+
+
+def test_late_orders_match_merge(tables, derived, merged_orders, window):
+    results = reference.decoded(report.build_report(tables, derived, *window))
+    expected = reference.late_orders_by_city(reference.orders_in_window(merged_orders, *window))
+    pd.testing.assert_frame_equal(
+        results['late_orders'].sort_index(), expected.sort_index(), check_dtype=False, check_index_type=False,
+    )
@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+
+import reference
+from olist_analytics import encoding, reviews, warmup
+
+
+def _by_state(df):
+    return encoding.decode(df).sort_values('customer_state').reset_index(drop=True)
+
+
+@pytest.mark.parametrize('include_late', [False, True], ids=['a_tiempo', 'con_retrasos'])
+@pytest.mark.parametrize('window', reference.WINDOWS, ids=lambda window: '_'.join(window))
+def test_reviews_in_window_matches_merge(derived, raw, merged_orders, window, include_late):
+    start, end = warmup.day_window(*window)
+    result = reviews.reviews_in_window(derived['review_index'], start, end, include_late)
+    expected = reference.reviews_by_state(raw, merged_orders, start, end, include_late)
+    pd.testing.assert_frame_equal(_by_state(result), _by_state(expected), check_dtype=False)
+    assert result['num_reviews'].is_monotonic_decreasing
+
+
+def test_reviews_in_window_outside_data_is_empty(derived):
+    assert reviews.reviews_in_window(derived['review_index'], '2010-01-01', '2010-12-31').empty
+
+
+def test_reviews_by_state_matches_merge(tables, derived, raw, merged_orders):
+    result = reviews.reviews_by_state(tables['reviews'], derived['order_facts'])
+    expected = reference.reviews_by_state(raw, merged_orders, pd.Timestamp.min, pd.Timestamp.max, include_late=True)
+    pd.testing.assert_frame_equal(_by_state(result), _by_state(expected), check_dtype=False)
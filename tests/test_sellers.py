@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import reference
+from olist_analytics import delivery, encoding, facts, filters, sellers, warmup
+from olist_analytics.time_index import time_slice
+from reference import sorted_rows
+
+# Cambios sucesivos de la barra lateral: se añaden filtros y luego se quitan
+SIDEBAR_STEPS = [
+    {},
+    {'states': ('SP', 'RJ', 'MG')},
+    {'states': ('SP', 'RJ', 'MG'), 'score': (2, 5)},
+    {'states': ('SP', 'RJ', 'MG'), 'score': (2, 5), 'price': (20.0, 300.0), 'freight': (5.0, 40.0)},
+    {'states': ('SP', 'RJ', 'MG'), 'score': (2, 5), 'price': (20.0, 300.0), 'freight': (5.0, 40.0), 'orders': (2, 30)},
+    {'score': (1, 3), 'orders': (1, 5)},
+    {},
+]
+
+
+def _predicates(step):
+    predicates = []
+    if 'states' in step:
+        predicates.append(filters.IsIn('seller_state', step['states']))
+    for name, column in (('score', 'review_score'), ('price', 'Total prize'), ('freight', 'freight_value')):
+        if name in step:
+            predicates.append(filters.Between(column, *step[name]))
+    if 'orders' in step:
+        predicates.append(filters.SellerOrdersBetween(*step['orders']))
+    return tuple(predicates)
+
+
+def _by_seller(df_5):
+    grouped = df_5.groupby('seller_id')
+    return pd.DataFrame({
+        'rows': grouped.size(),
+        'review_score': grouped['review_score'].mean(),
+        'Total prize': grouped['Total prize'].sum(),
+        'freight_value': grouped['freight_value'].sum(),
+        'orders': grouped['order_id'].nunique(),
+    })
+
+
+def test_seller_summary_update_matches_groupby(derived):
+    review_items = derived['review_items']
+    decoded = encoding.decode(review_items)
+    index = filters.build_filter_index(review_items)
+    summary = sellers.SellerSummary(review_items)
+    for step in SIDEBAR_STEPS:
+        mask = filters.combined_mask(review_items, index, _predicates(step))
+        expected_rows = reference.filter_review_items(decoded, **step)
+        pd.testing.assert_frame_equal(sorted_rows(decoded[mask]), sorted_rows(expected_rows))
+
+        result = encoding.decode(summary.update(mask))
+        expected = _by_seller(expected_rows)
+        pd.testing.assert_frame_equal(
+            result[expected.columns].sort_index(), expected.sort_index(),
+            check_dtype=False, check_index_type=False, obj=str(step),
+        )
+        fresh = encoding.decode(sellers.seller_summary(review_items, mask))
+        pd.testing.assert_frame_equal(result, fresh, obj=str(step))
+
+
+@pytest.mark.parametrize('k', [1, 3, 10, 10_000])
+def test_top_k_breaks_ties_by_seller(derived, k):
+    summary = sellers.seller_summary(derived['review_items'])
+    for column in ('review_score', 'Total prize'):
+        values = summary[column]
+        expected = (
+            values.dropna().rename_axis('seller_id').reset_index()
+            .sort_values([column, 'seller_id'], ascending=[False, True], kind='stable').head(k)
+        )
+        result = sellers.top_k(values, k)
+        assert list(result.index) == list(expected['seller_id'])
+        np.testing.assert_array_equal(result.to_numpy(), expected[column].to_numpy())
+    # La muestra tiene empates (p. ej. vendedores con media 5.0)
+    assert summary['review_score'].duplicated().any()
+
+
+@pytest.mark.parametrize('window', reference.WINDOWS, ids=lambda window: '_'.join(window))
+def test_late_orders_by_seller_matches_merge(derived, raw, merged_orders, window):
+    start, end = warmup.day_window(*window)
+    orders = time_slice(derived['order_facts'], 'order_purchase_timestamp', start, end)
+    result = encoding.decode(
+        delivery.late_orders_by_seller(facts.order_items(derived['item_facts'], orders))
+    )
+    expected = reference.late_orders_by_seller(
+        reference.orders_with_products(reference.orders_in_window(merged_orders, start, end), raw)
+    )
+    pd.testing.assert_frame_equal(result.sort_index(), expected.sort_index(), check_dtype=False, check_index_type=False)
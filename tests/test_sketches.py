@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import reference
+from olist_analytics import encoding, sketches, warmup
+from olist_analytics.time_index import time_slice
+
+
+@pytest.fixture(scope='module')
+def customer_sketches(derived):
+    return sketches.build_customer_sketches(derived['order_facts'])
+
+
+@pytest.fixture(params=reference.WINDOWS, ids=lambda window: '_'.join(window))
+def window(request):
+    return warmup.day_window(*request.param)
+
+
+def test_distinct_customers_close_to_nunique(customer_sketches, derived, merged_orders, window):
+    result = encoding.decode(sketches.distinct_customers(customer_sketches, derived['order_facts'], *window))
+    expected = reference.customers_by_state(reference.orders_in_window(merged_orders, *window))
+    result, expected = result.sort_index(), expected.sort_index()
+    assert list(result.index) == list(expected.index)
+    # Error típico 1.04 / sqrt(2**precision); con pocos clientes por estado
+    # el recuento lineal es casi exacto
+    tolerance = 3 * 1.04 / np.sqrt(2 ** customer_sketches['precision'])
+    assert (np.abs(result - expected) <= np.maximum(2, tolerance * expected)).all()
+
+
+def test_distinct_customers_equals_sketch_of_window(customer_sketches, derived, window):
+    # Combinar celdas mensuales y días sueltos da los mismos registros que un
+    # sketch construido solo con los pedidos del rango
+    orders = time_slice(derived['order_facts'], 'order_purchase_timestamp', *window)
+    direct = sketches.build_customer_sketches(orders)
+    states = direct['cells']['customer_state'].to_numpy()
+    expected = pd.Series({
+        state: sketches.estimate(direct['registers'][states == state].max(axis=0, keepdims=True))[0]
+        for state in pd.unique(states)
+    })
+    result = sketches.distinct_customers(customer_sketches, derived['order_facts'], *window)
+    assert result.astype(int).to_dict() == expected.to_dict()
+
+
+def test_full_months():
+    assert sketches._full_months(*warmup.day_window('2017-06-01', '2017-06-30')) == (
+        pd.Timestamp('2017-06-01'), pd.Timestamp('2017-06-01'),
+    )
+    first, last = sketches._full_months(*warmup.day_window('2017-03-15', '2017-11-20'))
+    assert (first, last) == (pd.Timestamp('2017-04-01'), pd.Timestamp('2017-10-01'))
+    first, last = sketches._full_months(*warmup.day_window('2018-01-10', '2018-01-24'))
+    assert first > last
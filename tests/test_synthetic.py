@@ -0,0 +1,59 @@
+import json
+
+import pandas as pd
+import pytest
+
+from benchmarks import run, synthetic
+from olist_analytics import report
+
+
+@pytest.fixture(scope='module')
+def generated():
+    return synthetic.generate_tables(0.01, seed=3)
+
+
+def test_generate_refuses_olist_data(tmp_path):
+    with pytest.raises(ValueError):
+        synthetic.generate(synthetic.TRANSLATION_CSV.parent / '.', 0.001)
+    assert synthetic.generate(tmp_path / 'x', 0.001) == tmp_path / 'x'
+    assert sorted(p.name for p in (tmp_path / 'x').iterdir()) == sorted(report.TABLE_FILES.values())
+
+
+def test_generate_tables_is_deterministic(generated):
+    again = synthetic.generate_tables(0.01, seed=3)
+    for filename, table in generated.items():
+        pd.testing.assert_frame_equal(table, again[filename], obj=filename)
+
+
+def test_generate_tables_keeps_referential_integrity(generated):
+    orders = generated['olist_orders_dataset.csv']
+    items = generated['olist_order_items_dataset.csv']
+    assert orders['customer_id'].isin(generated['olist_customers_dataset.csv']['customer_id']).all()
+    assert items['seller_id'].isin(generated['olist_sellers_dataset.csv']['seller_id']).all()
+    assert items['product_id'].isin(generated['olist_products_dataset.csv']['product_id']).all()
+    for filename in ('olist_order_items_dataset.csv', 'olist_order_payments_dataset.csv', 'olist_order_reviews_dataset.csv'):
+        assert generated[filename]['order_id'].isin(orders['order_id']).all(), filename
+
+
+def test_benchmark_stages_run_on_full_days(data_dir):
+    ctx = {'data_dir': data_dir}
+    for name, stage in run.STAGES:
+        ctx.update(stage(ctx))
+    assert ctx['start'] == ctx['start'].normalize()
+    assert ctx['end'] == ctx['end'].normalize() + pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')
+
+
+def test_compare_ignores_noise():
+    baseline = {'x1': {'a': {'seconds': 1.0, 'peak_mb': 100.0}, 'b': {'seconds': 0.01, 'peak_mb': 1.0}}}
+    results = {'x1': {
+        'a': {'seconds': 1.5, 'peak_mb': 110.0},
+        'b': {'seconds': 0.05, 'peak_mb': 4.0},
+        'nueva': {'seconds': 9.0, 'peak_mb': 900.0},
+    }}
+    assert run.compare(results, baseline) == [('x1', 'a', 'seconds', 1.0, 1.5)]
+
+
+def test_baseline_covers_every_stage():
+    baseline = json.loads(run.BASELINE_PATH.read_text())
+    for scale in ('x1', 'x10'):
+        assert sorted(baseline[scale]) == sorted(name for name, _ in run.STAGES), scale